@@ -1,20 +1,39 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flasgger import Swagger # type: ignore
 from flask_cors import CORS # type: ignore
-from config import Config
+from config import get_config
 
 db = SQLAlchemy()
 
-def create_app():
+def create_app(config_class=None):
     app = Flask(__name__)
 
     
     
     CORS(app)
-    app.config.from_object(Config)
+    # Without an explicit class the NEX_SCORE_PROFILE environment variable picks one
+    app.config.from_object(config_class or get_config())
+
+    from .engine import prepare_engine_options, init_engine
+    prepare_engine_options(app)
     db.init_app(app)
-    Swagger(app)
+    init_engine(app)
+
+    from .snapshot import init_snapshot
+    from .versioning import init_versioning
+    from .response_cache import init_response_cache
+    from .fanout import init_fanout
+    from .compression import init_compression
+    from .metrics import init_metrics
+    init_snapshot(app)
+    init_versioning(app)
+    init_response_cache(app)
+    init_fanout(app)
+    init_compression(app)
+    init_metrics(app)
+
+    from .cli import nex_score_cli
+    app.cli.add_command(nex_score_cli)
 
     @app.route('/')
     def index():
@@ -23,11 +42,20 @@ def create_app():
     try:
         with app.app_context():
             
-            from .routes import nex_score_routes, market_region
+            from .routes import nex_score_routes, market_region, ops, metrics
             app.register_blueprint(nex_score_routes.bp)
             app.register_blueprint(market_region.bp)
-            
-            db.create_all()  # Create tables that do not exist
+            app.register_blueprint(ops.bp)
+            app.register_blueprint(metrics.bp)
+
+            # Swagger collects the views' specs, so it goes after the blueprints.
+            # The serverless profile turns it off to keep flasgger off cold starts.
+            if app.config.get('NEX_SCORE_SWAGGER', True):
+                from flasgger import Swagger # type: ignore
+                Swagger(app)
+
+            from .schema_stamp import ensure_schema
+            ensure_schema(app)  # Create tables that do not exist
     except Exception as e:
         print(f"Error during app initialization: {e}")
         # Handle the error (e.g., log it, display a message, etc.)
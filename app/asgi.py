@@ -0,0 +1,366 @@
+"""ASGI serving mode for the read endpoints.
+
+    uvicorn --factory app.asgi:create_asgi_app --workers 2
+
+Plain JSON GETs of the endpoints in app.native.NATIVE_ROUTES run as
+coroutines. Their queries go through SQLAlchemy's asyncio engine (aiomysql
+for MySQL, aiosqlite for a SQLite file), so a request waiting on the
+database holds no thread. The pandas work that follows runs on a bounded
+thread pool, off the event loop. Validators, 304s and the response cache
+are the same ones the Flask routes and the Functions handler use.
+
+Everything else (writes, /excel, columnar formats, Swagger, /ops) is handed
+to the Flask app through asgiref's WSGI adapter. With the snapshot backend
+the regular controllers run on the thread pool, since they read memory,
+not the database.
+"""
+import asyncio
+import functools
+import logging
+import ssl
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from .controller.dashboard_controller import dashboard_result
+from .controller.market_region_controller import dropdown_records_from_rows, dropdown_statement
+from .controller.nex_score_controller import (
+    PERC_BREAKDOWNS, PERIOD_MAP, TREND_COLUMNS, TYPE_PARAMS,
+    latest_statement, latest_views_from_rows, market_exists_statement, nex_score_plan, parse_month,
+    perc_breakdown_result, perc_breakdown_statement, perc_result, perc_statement, rollup_trend_records_from_frame,
+    row_filters, score_months_from_rows, score_result, score_statement, sql_trend_records_from_rows, sql_trend_statement, trend_result
+)
+from .engine import install_statement_timeout
+from .frames import frame_from_rows
+from .hierarchy import tree_statement, tree_views_from_rows
+from .latest import cached_latest_table, latest_table_probe, remember_latest_table
+from .models.nex_score import NexScore, db
+from .native import NativeExchange, native_route
+from .rollups import rollup_trend_frame_from_rows, rollup_trend_statement
+from .snapshot import snapshot_enabled
+from .versioning import DataVersion, cached_data_version, data_version_statement, remember_data_version
+
+logger = logging.getLogger(__name__)
+
+ASYNC_DRIVERS = {
+    'mysql': 'aiomysql',
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg'
+}
+
+# Engine options carried over from SQLALCHEMY_ENGINE_OPTIONS; pool sizing
+# has its own settings and connect_args are driver specific
+SHARED_ENGINE_OPTIONS = ['pool_timeout', 'pool_recycle', 'pool_pre_ping']
+
+
+def async_engine_arguments(app):
+    """URL and options for the asyncio engine matching the app's database."""
+    uri = app.config.get('NEX_SCORE_ASYNC_DATABASE_URI')
+    if not uri:
+        with app.app_context():
+            # Flask-SQLAlchemy has already resolved relative SQLite paths
+            url = db.engine.url
+        backend = url.get_backend_name()
+        if backend not in ASYNC_DRIVERS:
+            raise ValueError(f'No asyncio driver for {backend}; set NEX_SCORE_ASYNC_DATABASE_URI')
+        if backend == 'sqlite' and url.database in (None, '', ':memory:'):
+            raise ValueError('The ASGI mode needs a SQLite file, not an in-memory database')
+        url = url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+    else:
+        url = make_url(uri)
+
+    engine_options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+    options = {name: engine_options[name] for name in SHARED_ENGINE_OPTIONS if name in engine_options}
+    # aiosqlite would otherwise get a NullPool and reconnect per query
+    options['poolclass'] = AsyncAdaptedQueuePool
+    options['pool_size'] = app.config['NEX_SCORE_ASYNC_POOL_SIZE']
+    options['max_overflow'] = app.config['NEX_SCORE_ASYNC_MAX_OVERFLOW']
+
+    connect_args = {}
+    if url.get_backend_name() == 'mysql':
+        if 'ssl_ca' in url.query:
+            # aiomysql takes an SSLContext rather than PyMySQL's ssl_ca
+            connect_args['ssl'] = ssl.create_default_context(cafile=url.query['ssl_ca'])
+            url = url.difference_update_query(['ssl_ca'])
+        timeout = engine_options.get('connect_args', {}).get('connection_timeout')
+        if timeout:
+            connect_args['connect_timeout'] = timeout
+    elif url.get_backend_name() == 'sqlite':
+        connect_args.update(engine_options.get('connect_args', {}))
+    if connect_args:
+        options['connect_args'] = connect_args
+    return url, options
+
+
+class AsyncReads:
+    """Async engine, sessions and the worker pool of one ASGI app."""
+
+    def __init__(self, app):
+        self.app = app
+        self.engine = None
+        self.sessionmaker = None
+        self.executor = None
+
+    def start(self):
+        if self.engine is not None:
+            return
+        url, options = async_engine_arguments(self.app)
+        self.engine = create_async_engine(url, **options)
+        if self.app.config.get('NEX_SCORE_STATEMENT_TIMEOUT_MS'):
+            install_statement_timeout(self.engine.sync_engine, self.app.config['NEX_SCORE_STATEMENT_TIMEOUT_MS'])
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.app.config['NEX_SCORE_ASGI_WORKERS'],
+            thread_name_prefix='nex-score-asgi'
+        )
+
+    async def close(self):
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.executor.shutdown(wait=False)
+            self.engine = None
+
+    @property
+    def dialect_name(self):
+        return self.engine.dialect.name
+
+    async def rows(self, statement):
+        async with self.sessionmaker() as session:
+            return (await session.execute(statement)).all()
+
+    def _in_context(self, function, *args):
+        with self.app.app_context():
+            return function(*args)
+
+    async def offload(self, function, *args):
+        """Run CPU-bound work (pandas) on the worker pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(self._in_context, function, *args))
+
+    async def data_version(self):
+        version = cached_data_version(self.app)
+        if version is None:
+            version = DataVersion(*(await self.rows(data_version_statement()))[0])
+            remember_data_version(self.app, version)
+        return version
+
+    async def latest_table(self):
+        ready = cached_latest_table(self.app)
+        if ready is None:
+            try:
+                ready = bool(await self.rows(latest_table_probe()))
+            except DBAPIError:
+                # Not migrated yet
+                ready = False
+            remember_latest_table(self.app, ready)
+        return ready
+
+
+async def _latest_views(reads, type_params, region):
+    rows = await reads.rows(latest_statement(type_params, region, await reads.latest_table()))
+    return await reads.offload(latest_views_from_rows, rows, type_params)
+
+
+async def _tree_views(reads, type_params, region):
+    rows = await reads.rows(tree_statement(type_params, region, reads.dialect_name, await reads.latest_table()))
+    return await reads.offload(tree_views_from_rows, [row._mapping for row in rows], type_params)
+
+
+def trend_statement(region, market):
+    # The rows get_trend_data loads for the pandas trend path
+    return select(*TREND_COLUMNS).where(*row_filters(region, market)).order_by(NexScore.update_date.asc())
+
+
+async def _trend_data(reads, region, market, timeframe):
+    if timeframe not in PERIOD_MAP:
+        return {'error': 'Invalid period parameter', 'status': 400}
+
+    trend_source = current_app.config.get('NEX_SCORE_TREND_SOURCE')
+    if trend_source == 'rollup':
+        rows = await reads.rows(rollup_trend_statement(region, market, timeframe))
+        data = await reads.offload(
+            lambda: rollup_trend_records_from_frame(rollup_trend_frame_from_rows(rows), timeframe))
+    elif trend_source == 'sql':
+        rows = await reads.rows(sql_trend_statement(region, market, timeframe))
+        data = await reads.offload(sql_trend_records_from_rows, rows, timeframe)
+    else:
+        rows = await reads.rows(trend_statement(region, market))
+        return await reads.offload(lambda: trend_result(frame_from_rows(rows, TREND_COLUMNS), timeframe))
+
+    if not data:
+        return {'message': 'No data found', 'status': 404}
+    return {'data': data, 'status': 200}
+
+
+async def _perc_data(reads, region, breakdown=None):
+    if breakdown and breakdown not in PERC_BREAKDOWNS:
+        return {'error': 'Invalid breakdown parameter', 'status': 400}
+
+    statement = perc_breakdown_statement(region) if breakdown else perc_statement(region)
+    rows = [row._mapping for row in await reads.rows(statement)]
+    return perc_breakdown_result(rows) if breakdown else perc_result(rows)
+
+
+async def _dropdown_records(reads):
+    return dropdown_records_from_rows(await reads.rows(dropdown_statement()))
+
+
+async def _nex_score(reads, args):
+    type_param = args.get('type') or 'influencer'
+    view = args.get('view') or 'flat'
+    try:
+        type_params, keyed = nex_score_plan(type_param, view)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+
+    views = await (_tree_views if view == 'tree' else _latest_views)(reads, type_params, args.get('region'))
+    return {'data': views if keyed else views[type_param], 'type': type_param}, 200
+
+
+async def _trends(reads, args):
+    result = await _trend_data(reads, args.get('region'), args.get('market'), args.get('timeframe', 'monthly'))
+    return result, result.pop('status')
+
+
+async def _percentage(reads, args):
+    result = await _perc_data(reads, args.get('region'), args.get('breakdown'))
+    return result, result.pop('status')
+
+
+async def _score(reads, args):
+    for name in ('region', 'market', 'month'):
+        if not args.get(name):
+            return {'error': f'{name.capitalize()} is required'}, 400
+
+    try:
+        month = parse_month(args['month'])
+    except ValueError:
+        return {'error': 'Invalid month parameter'}, 400
+
+    months = score_months_from_rows(await reads.rows(score_statement(args['region'], args['market'], month)))
+    if 'current' not in months and not await reads.rows(market_exists_statement(args['region'], args['market'])):
+        months = None
+    result = score_result(months, month)
+    return result, result.pop('status')
+
+
+async def _dashboard(reads, args):
+    region = args.get('region')
+    timeframe = args.get('timeframe', 'monthly')
+    if timeframe not in PERIOD_MAP:
+        return {'error': 'Invalid period parameter'}, 400
+
+    # Independent reads, each on its own session and pooled connection
+    latest, percentage, trends, market_region = await asyncio.gather(
+        _latest_views(reads, TYPE_PARAMS, region),
+        _perc_data(reads, region),
+        _trend_data(reads, region, args.get('market'), timeframe),
+        _dropdown_records(reads)
+    )
+    result = dashboard_result(latest, percentage, trends, market_region)
+    return result, result.pop('status')
+
+
+async def _dropdown(reads, args):
+    return {'data': await _dropdown_records(reads)}, 200
+
+
+# path -> coroutine handler; endpoints and routing come from NATIVE_ROUTES
+ASYNC_HANDLERS = {
+    '/nex-score/': _nex_score,
+    '/nex-score/trends': _trends,
+    '/nex-score/percentage': _percentage,
+    '/nex-score/score-comparison': _score,
+    '/nex-score/dashboard': _dashboard,
+    '/market-region/': _dropdown
+}
+
+
+def _query_args(query_string):
+    # First value wins, as with request.args.get()
+    args = {}
+    for name, value in parse_qsl(query_string.decode('latin-1'), keep_blank_values=True):
+        args.setdefault(name, value)
+    return args
+
+
+class NexScoreASGI:
+    """ASGI application wrapping a Flask app created by create_app()."""
+
+    def __init__(self, app):
+        from asgiref.wsgi import WsgiToAsgi # type: ignore
+
+        self.app = app
+        self.reads = AsyncReads(app)
+        self.wsgi = WsgiToAsgi(app)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+
+        if scope['type'] == 'http':
+            args = _query_args(scope.get('query_string', b''))
+            headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+            route = native_route(scope['method'], scope['path'], args, headers)
+            if route is not None and scope['path'] in ASYNC_HANDLERS:
+                status, response_headers, body = await self.respond(scope['path'], route, args, headers)
+                response_headers['Content-Length'] = len(body)
+                await send({
+                    'type': 'http.response.start',
+                    'status': status,
+                    'headers': [(name.encode('latin-1'), str(value).encode('latin-1'))
+                                for name, value in response_headers.items()]
+                })
+                await send({'type': 'http.response.body', 'body': body})
+                return
+
+        await self.wsgi(scope, receive, send)
+
+    async def respond(self, path, route, args, headers):
+        endpoint, handler = route
+        self.reads.start()
+
+        with self.app.app_context():
+            try:
+                version = await self.reads.data_version()
+            except Exception:
+                logger.exception('Could not read the nex_score data version')
+                version = None
+
+            exchange = NativeExchange(self.app, endpoint, args, headers, version)
+            early = exchange.early_response()
+            if early is not None:
+                return early
+
+            try:
+                if snapshot_enabled():
+                    body, status = await self.reads.offload(handler, args)
+                else:
+                    body, status = await ASYNC_HANDLERS[path](self.reads, args)
+            except Exception as e:
+                body, status = {'error': str(e)}, 500
+            return exchange.response(body, status)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.reads.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.reads.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_asgi_app(app=None):
+    if app is None:
+        from . import create_app
+        app = create_app()
+    return NexScoreASGI(app)
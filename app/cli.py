@@ -0,0 +1,85 @@
+import click
+from flask.cli import AppGroup
+from .models.nex_score import db
+
+nex_score_cli = AppGroup('nex-score', help='Maintain nex_score data and its derived tables.')
+
+
+@nex_score_cli.command('refresh-latest')
+@click.option('--date', 'update_date', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Fold only this update_date batch in (YYYY-MM-DD). Rebuilds everything when omitted.')
+def refresh_latest_command(update_date):
+    """Bring nex_score_latest up to date after a load."""
+    from .latest import refresh_latest
+
+    rows = refresh_latest(update_date.date() if update_date else None)
+    db.session.commit()
+    click.echo(f'nex_score_latest: {rows} rows written')
+
+
+@nex_score_cli.command('refresh-rollups')
+@click.option('--date', 'update_date', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Recompute only the periods containing this update_date (YYYY-MM-DD). Rebuilds everything when omitted.')
+def refresh_rollups_command(update_date):
+    """Bring the monthly/quarterly/yearly trend rollups up to date."""
+    from .rollups import refresh_rollups, rebuild_rollups
+
+    if update_date:
+        rebuilt = refresh_rollups(update_date.date())
+        if rebuilt is None:
+            message = f'nex_score_rollup: refreshed periods containing {update_date.date()}'
+        else:
+            message = f'nex_score_rollup: was empty, rebuilt {rebuilt} periods'
+    else:
+        message = f'nex_score_rollup: rebuilt {rebuild_rollups()} periods'
+    db.session.commit()
+    click.echo(message)
+
+
+@nex_score_cli.command('check-rollups')
+@click.option('--region', default=None)
+@click.option('--market', default=None)
+@click.option('--timeframe', type=click.Choice(['monthly', 'quarterly', 'yearly']), default=None,
+              help='Check a single timeframe. All three are checked when omitted.')
+def check_rollups_command(region, market, timeframe):
+    """Compare rollup averages with the pandas trend computation."""
+    from .rollups import check_rollups, TIMEFRAMES
+
+    failed = False
+    for name in [timeframe] if timeframe else TIMEFRAMES:
+        mismatches = check_rollups(region, market, name)
+        for mismatch in mismatches:
+            click.echo(f'{name}: {mismatch}')
+        click.echo(f'{name}: {"OK" if not mismatches else f"{len(mismatches)} mismatches"}')
+        failed = failed or bool(mismatches)
+
+    if failed:
+        raise SystemExit(1)
+
+
+@nex_score_cli.command('ingest')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'xlsx']), default=None,
+              help='Input format. Taken from the file extension when omitted.')
+@click.option('--date-format', default='%m/%d/%Y', show_default=True, help='strptime format of update_date.')
+@click.option('--chunk-size', default=50_000, show_default=True, help='Rows parsed and inserted per batch.')
+@click.option('--no-refresh', is_flag=True,
+              help='Skip refreshing nex_score_latest and the rollups (run refresh-latest/refresh-rollups afterwards).')
+def ingest_command(path, file_format, date_format, chunk_size, no_refresh):
+    """Upsert a CSV/XLSX batch into nex_score and refresh the derived tables."""
+    from .ingest import format_from_filename, ingest, invalidate_caches
+
+    file_format = file_format or format_from_filename(path)
+    if file_format is None:
+        raise click.BadParameter('cannot tell the format from the extension; pass --format', param_hint='PATH')
+
+    with open(path, 'rb') as source:
+        try:
+            result = ingest(source, file_format, date_format, chunk_size, refresh=not no_refresh)
+        except RuntimeError as e:
+            db.session.rollback()
+            raise click.ClickException(str(e))
+    db.session.commit()
+    invalidate_caches()
+    dates = ', '.join(str(update_date) for update_date in result.update_dates) or 'none'
+    click.echo(f'nex_score: {result.rows} rows upserted (update_date: {dates})')
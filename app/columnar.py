@@ -0,0 +1,174 @@
+"""Column-oriented encodings for bulk consumers.
+
+Three forms are offered next to the regular row-oriented JSON:
+
+* ``columns`` - JSON of the shape ``{"columns": [...], "data": [[...], ...]}``
+  where ``data[i]`` holds every value of ``columns[i]``, so keys are not
+  repeated per row;
+* ``arrow`` - an Arrow IPC stream;
+* ``parquet`` - a Parquet file.
+
+pyarrow is imported on first use so it stays off the cold-start path.
+"""
+import json
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+
+from flask import Response, current_app, request
+from sqlalchemy import Date, Float, Integer, String
+
+from .models.nex_score import NexScore
+
+COLUMNAR_MIMETYPES = {
+    'columns': 'application/vnd.nex-score.columns+json',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+# What the row-list read endpoints (/nex-score/trends, /market-region/) offer.
+# /nex-score/ (markets nested under regions) and /nex-score/percentage (one
+# object, or national plus regions) are not row lists, so they stay JSON only.
+READ_MIMETYPES = {
+    'json': 'application/json',
+    **COLUMNAR_MIMETYPES
+}
+
+
+def negotiate_format(mimetypes, default='json'):
+    """Pick a format from ?format= or, failing that, the Accept header.
+
+    `mimetypes` maps format names to their media types in order of
+    preference; the first one is what a bare */* gets.
+    """
+    requested = request.args.get('format')
+    if requested:
+        return requested.lower()
+
+    best = request.accept_mimetypes.best_match(list(mimetypes.values()))
+    for name, mimetype in mimetypes.items():
+        if mimetype == best:
+            return name
+    return default
+
+
+def arrow_type(column):
+    import pyarrow as pa # type: ignore
+
+    if isinstance(column.type, Integer):
+        return pa.int32()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, Date):
+        return pa.date32()
+    if isinstance(column.type, String):
+        # market/region repeat heavily; dictionary encoding stores each once
+        return pa.dictionary(pa.int32(), pa.string())
+    raise TypeError(f'No Arrow type for column {column.key} ({column.type})')
+
+
+def nex_score_arrow_schema(names):
+    import pyarrow as pa # type: ignore
+
+    table = NexScore.__table__
+    return pa.schema([pa.field(name, arrow_type(table.c[name]), nullable=table.c[name].nullable) for name in names])
+
+
+def record_batch(rows, schema):
+    import pyarrow as pa # type: ignore
+
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    return pa.record_batch([pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema)
+
+
+def arrow_stream_chunks(row_chunks, schema):
+    import pyarrow as pa # type: ignore
+
+    sink = BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for rows in row_chunks:
+            writer.write_batch(record_batch(rows, schema))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+
+def parquet_chunks(row_chunks, schema):
+    import pyarrow.parquet as pq # type: ignore
+
+    # Parquet writes its footer last, so it is spooled like the xlsx export;
+    # each chunk becomes its own row group.
+    with SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        with pq.ParquetWriter(spool, schema) as writer:
+            for rows in row_chunks:
+                writer.write_batch(record_batch(rows, schema))
+        spool.seek(0)
+        while True:
+            data = spool.read(64 * 1024)
+            if not data:
+                break
+            yield data
+
+
+def columns_json(row_chunks, names):
+    columns = [[] for _ in names]
+    for rows in row_chunks:
+        for index, values in enumerate(zip(*rows)):
+            columns[index].extend(values)
+    return {'columns': names, 'data': columns}
+
+
+def columns_json_chunks(row_chunks, names):
+    """The columns_json() body as bytes, without holding every value at once.
+
+    Rows arrive row by row but the body is column-major, so each column's
+    values are encoded into a spool file of their own (in memory while
+    small) and the files are sent one after the other once the rows end.
+    Values must already be JSON-ready.
+    """
+    spools = [SpooledTemporaryFile(max_size=1024 * 1024) for _ in names]
+    try:
+        for rows in row_chunks:
+            for spool, values in zip(spools, zip(*rows)):
+                if spool.tell():
+                    spool.write(b', ')
+                spool.write(json.dumps(list(values))[1:-1].encode('utf-8'))
+
+        yield f'{{"columns": {json.dumps(names)}, "data": ['.encode('utf-8')
+        for index, spool in enumerate(spools):
+            yield b', [' if index else b'['
+            spool.seek(0)
+            while True:
+                data = spool.read(64 * 1024)
+                if not data:
+                    break
+                yield data
+            yield b']'
+        yield b']}'
+    finally:
+        for spool in spools:
+            spool.close()
+
+
+def records_response(records, columnar_format):
+    """Encode a list of row dicts from a read endpoint in a columnar form."""
+    names = list(records[0].keys()) if records else []
+
+    if columnar_format == 'columns':
+        body = {'columns': names, 'data': [[record[name] for record in records] for name in names]}
+        return current_app.response_class(
+            current_app.json.dumps(body),
+            mimetype=COLUMNAR_MIMETYPES['columns']
+        )
+
+    import pyarrow as pa # type: ignore
+
+    table = pa.Table.from_pylist(records)
+    sink = BytesIO()
+    if columnar_format == 'arrow':
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        import pyarrow.parquet as pq # type: ignore
+        pq.write_table(table, sink)
+    return Response(sink.getvalue(), mimetype=COLUMNAR_MIMETYPES[columnar_format])
@@ -0,0 +1,144 @@
+"""Negotiated gzip/deflate/brotli compression of the read responses.
+
+The encoding is picked from Accept-Encoding (q-values first, then the order
+of NEX_SCORE_COMPRESSION_ENCODINGS) before the view runs, because it is part
+of the response cache key and of the ETag: a cached entry holds the body
+already compressed, so a hit costs no compression at all. Bodies smaller
+than NEX_SCORE_COMPRESSION_MIN_BYTES are sent as they are. Streamed exports
+(csv, Arrow) are compressed chunk by chunk; xlsx and Parquet are compressed
+containers already and are left alone.
+
+br is only offered when the Brotli package is installed.
+"""
+import zlib
+
+from flask import current_app, g, request
+from werkzeug.http import parse_accept_header
+
+from .metrics import phase
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/vnd.nex-score.columns+json',
+    'application/vnd.apache.arrow.stream',
+    'text/csv'
+}
+
+# zlib wbits per encoding: gzip container, zlib container ("deflate" in HTTP)
+ZLIB_WBITS = {'gzip': 31, 'deflate': 15}
+
+
+def _brotli():
+    try:
+        import brotli # type: ignore
+    except ImportError:
+        return None
+    return brotli
+
+
+def init_compression(app):
+    app.config.setdefault('NEX_SCORE_COMPRESSION_ENCODINGS', 'br,gzip,deflate')
+    app.config.setdefault('NEX_SCORE_COMPRESSION_MIN_BYTES', 1024)
+    app.config.setdefault('NEX_SCORE_COMPRESSION_LEVEL', 6)
+    app.config.setdefault('NEX_SCORE_BROTLI_QUALITY', 5)
+
+    encodings = [name.strip() for name in app.config['NEX_SCORE_COMPRESSION_ENCODINGS'].split(',') if name.strip()]
+    unknown = [name for name in encodings if name not in ('br', *ZLIB_WBITS)]
+    if unknown:
+        raise ValueError(f'Unknown NEX_SCORE_COMPRESSION_ENCODINGS entries: {", ".join(unknown)}')
+    if 'br' in encodings and _brotli() is None:
+        encodings.remove('br')
+    app.extensions['nex_score_compression'] = encodings
+
+
+def compression_enabled(app=None):
+    return bool((app or current_app).extensions.get('nex_score_compression'))
+
+
+def negotiate_encoding(app, accept_encoding):
+    """Content-Encoding to use for a request, '' for identity."""
+    offered = app.extensions.get('nex_score_compression')
+    if not offered or not accept_encoding:
+        return ''
+    return parse_accept_header(accept_encoding).best_match(offered) or ''
+
+
+def request_encoding():
+    """negotiate_encoding() for the current request, computed once."""
+    if 'content_encoding' not in g:
+        g.content_encoding = negotiate_encoding(current_app, request.headers.get('Accept-Encoding'))
+    return g.content_encoding
+
+
+class _Compressor:
+    def __init__(self, app, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._brotli = _brotli().Compressor(quality=app.config['NEX_SCORE_BROTLI_QUALITY'])
+        else:
+            self._zlib = zlib.compressobj(app.config['NEX_SCORE_COMPRESSION_LEVEL'], zlib.DEFLATED, ZLIB_WBITS[encoding])
+
+    def compress(self, data):
+        # Flushed per chunk so a streamed export still reaches the client progressively
+        if self.encoding == 'br':
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def compress_body(app, body, encoding):
+    """`body` encoded with `encoding`, or unchanged when it is too small to bother."""
+    if not encoding or len(body) < app.config['NEX_SCORE_COMPRESSION_MIN_BYTES']:
+        return body, ''
+    if encoding == 'br':
+        return _brotli().compress(body, quality=app.config['NEX_SCORE_BROTLI_QUALITY']), encoding
+    compressor = zlib.compressobj(app.config['NEX_SCORE_COMPRESSION_LEVEL'], zlib.DEFLATED, ZLIB_WBITS[encoding])
+    return compressor.compress(body) + compressor.flush(), encoding
+
+
+def _compressed_chunks(chunks, compressor):
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def _compress_response(response):
+    if not compression_enabled() or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+
+    # HEAD is encoded like GET (werkzeug drops the body afterwards), so its
+    # Content-Encoding and Content-Length agree with the encoding-suffixed
+    # ETag it carries
+    encoding = request_encoding()
+    if not encoding or response.status_code != 200 or 'Content-Encoding' in response.headers:
+        # Cache hits come back with their stored Content-Encoding
+        return response
+
+    if response.is_streamed:
+        response.response = _compressed_chunks(response.response, _Compressor(current_app, encoding))
+        response.headers.pop('Content-Length', None)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    with phase('encode'):
+        body, used = compress_body(current_app, response.get_data(), encoding)
+    if used:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = used
+    return response
+
+
+def register_compression(bp):
+    """Compress the GET responses of a blueprint.
+
+    Must be registered after register_response_cache: after_request hooks
+    run in reverse order, so the body is compressed before it is cached.
+    """
+    bp.after_request(_compress_response)
@@ -0,0 +1,40 @@
+from .market_region_controller import get_dropdown_records
+from .nex_score_controller import PERIOD_MAP, TYPE_PARAMS, get_latest_views, get_perc_data, get_trend_data
+from ..fanout import run_parallel
+
+
+def _body(result):
+    # Same body as the standalone endpoint; non-200 sections keep their status
+    if result.get('status') == 200:
+        result.pop('status')
+    return result
+
+
+def get_dashboard_data(region, market, timeframe):
+    """Everything the dashboard page loads, in one response.
+
+    The three type views share one latest-per-market scan; that scan, the
+    percentage average, the trend series and the market/region list run
+    concurrently on the fan-out pool.
+    """
+    if timeframe not in PERIOD_MAP:
+        return {'error': 'Invalid period parameter', 'status': 400}
+
+    results = run_parallel({
+        'latest': lambda: get_latest_views(TYPE_PARAMS, region),
+        'percentage': lambda: get_perc_data(region),
+        'trends': lambda: get_trend_data(region, market, timeframe),
+        'market_region': get_dropdown_records
+    })
+    return dashboard_result(**results)
+
+
+def dashboard_result(latest, percentage, trends, market_region):
+    """Assemble the section results (as the controllers return them)."""
+    data = {type_param: {'data': dataset, 'type': type_param} for type_param, dataset in latest.items()}
+    data.update({
+        'percentage': _body(percentage),
+        'trends': _body(trends),
+        'market_region': {'data': market_region}
+    })
+    return {**data, 'status': 200}
@@ -0,0 +1,68 @@
+import hmac
+from tempfile import SpooledTemporaryFile
+
+from flask import current_app, request
+
+from ..models.nex_score import db
+from ..exports import XLSX_MIMETYPE
+from ..ingest import DEFAULT_DATE_FORMAT, format_from_filename, ingest, invalidate_caches
+
+BODY_FORMATS = {'text/csv': 'csv', XLSX_MIMETYPE: 'xlsx'}
+
+
+def _authorized():
+    token = current_app.config.get('NEX_SCORE_INGEST_TOKEN')
+    supplied = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode())
+
+
+def _upload():
+    """The uploaded file and its format, from a multipart 'file' part or the raw body."""
+    upload = request.files.get('file')
+    if upload is not None:
+        return upload.stream, request.args.get('format') or format_from_filename(upload.filename)
+
+    file_format = request.args.get('format') or BODY_FORMATS.get(request.mimetype)
+    if file_format == 'csv':
+        return request.stream, file_format
+
+    # openpyxl needs a seekable file; small bodies stay in memory
+    spool = SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    while True:
+        data = request.stream.read(64 * 1024)
+        if not data:
+            break
+        spool.write(data)
+    spool.seek(0)
+    return spool, file_format
+
+
+def ingest_upload():
+    if not current_app.config.get('NEX_SCORE_INGEST_TOKEN'):
+        return {'error': 'Ingestion is disabled', 'status': 403}
+    if not _authorized():
+        return {'error': 'Unauthorized', 'status': 401}
+
+    source, file_format = _upload()
+    if file_format not in ('csv', 'xlsx'):
+        return {'error': 'Invalid format parameter', 'status': 400}
+
+    date_format = request.args.get('date_format') or DEFAULT_DATE_FORMAT
+    try:
+        result = ingest(source, file_format, date_format)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return {'error': str(e), 'status': 400}
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        source.close()
+
+    invalidate_caches()
+    return {
+        'rows': result.rows,
+        'update_dates': [update_date.isoformat() for update_date in result.update_dates],
+        'status': 200
+    }
@@ -1,14 +1,37 @@
 from ..models.nex_score import NexScore
 from flask import jsonify
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
+from ..metrics import timed_phase
+from ..snapshot import snapshot_enabled, get_snapshot
+from ..columnar import COLUMNAR_MIMETYPES, READ_MIMETYPES, negotiate_format, records_response
+
+def dropdown_statement():
+    return select(NexScore.market, NexScore.region).distinct()
+
+
+@timed_phase('serialize')
+def dropdown_records_from_rows(distinct_values):
+    return [{'region': region, 'market': market} for market, region in distinct_values]
+
+
+def get_dropdown_records():
+    # Query distinct market and region values
+    if snapshot_enabled():
+        distinct_values = get_snapshot().market_regions()
+    else:
+        distinct_values = NexScore.query.with_entities(NexScore.market, NexScore.region).distinct().all()
+
+    return dropdown_records_from_rows(distinct_values)
+
 
 def get_dropdown_val():
     try:
-        # Query distinct market and region values
-        distinct_values = NexScore.query.with_entities(NexScore.market, NexScore.region).distinct().all()
-        
-        # Create a list to store the data
-        data = [{'region': region, 'market': market} for market, region in distinct_values]
+        data = get_dropdown_records()
+
+        columnar_format = negotiate_format(READ_MIMETYPES)
+        if columnar_format in COLUMNAR_MIMETYPES:
+            return records_response(data, columnar_format)
         
         # Construct the response object
         response = {'data': data}
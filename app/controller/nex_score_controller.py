@@ -1,15 +1,78 @@
-from sqlalchemy import func, and_
+from datetime import date, datetime
+
+from flask import current_app
+from sqlalchemy import select, func, and_, case, null, union_all
 from ..models.nex_score import NexScore, db
+from ..models.nex_score_latest import NexScoreLatest
 from ..utils import organize_data_by_region
-import pandas as pd # type: ignore
-from ..schemas import nex_score_schema
+from ..frames import load_frame
+from ..latest import latest_table_ready
+from ..metrics import timed_phase
+from ..rollups import rollup_trend_frame
+from ..hierarchy import get_tree_views
+from ..sql_functions import period_start
+from ..snapshot import snapshot_enabled, get_snapshot, as_float64, PERC_COLUMNS
+
+
+PERC_FIELDS = [NexScore.influencer_perc, NexScore.detractor_perc, NexScore.neutral_perc]
+TREND_COLUMNS = [NexScore.update_date] + PERC_FIELDS
+COUNT_FIELDS = [NexScore.influencer_count, NexScore.detractor_count, NexScore.neutral_count]
+SCORE_FIELDS = PERC_FIELDS + COUNT_FIELDS
+SCORE_COLUMNS = TREND_COLUMNS + COUNT_FIELDS
+
+PERIOD_MAP = {
+    'monthly': 'M',
+    'quarterly': 'Q',
+    'yearly': 'Y'
+}
+
+TYPE_PARAMS = ['influencer', 'detractor', 'neutral']
+VIEWS = ['flat', 'tree']
+
 
+def _type_key(type_param):
+    return 'neutral' if type_param == 'neutral' else 'influencer' if type_param == 'influencer' else 'detractor'
 
 
+@timed_phase('dataframe')
+def _widen(df):
+    # Snapshot frames hold float32 percentages; aggregate them as float64 so
+    # the rounded output matches the database path.
+    df = df.copy()
+    for column in PERC_COLUMNS:
+        df[column] = as_float64(df[column])
+    return df
+
+
+def _latest_fields(model, type_params):
+    fields = [
+        model.market,
+        model.region,
+        model.update_date
+    ]
+
+    for type_param in type_params:
+        if type_param and type_param.lower() in TYPE_PARAMS:
+            key = type_param.lower()
+            fields.extend([
+                getattr(model, f'{key}_count'),
+                getattr(model, f'{key}_perc')
+            ])
+    return fields
 
-def get_nex_score_data(type_param, region):
+
+def _latest_table_statement(type_params, region):
+    stmt = select(*_latest_fields(NexScoreLatest, type_params))
+
+    if region and region != 'ALL REGIONS':
+        stmt = stmt.where(NexScoreLatest.region == region)
+
+    return stmt
+
+
+def _latest_join_statement(type_params, region):
     subquery = (
-        db.session.query(
+        select(
             NexScore.market,
             NexScore.region,
             func.max(NexScore.update_date).label('latest_update')
@@ -18,29 +81,7 @@ def get_nex_score_data(type_param, region):
         .subquery()
     )
 
-    fields = [
-        NexScore.market,
-        NexScore.region,
-        NexScore.update_date
-    ]
-
-    if type_param and type_param.lower() == 'influencer':
-        fields.extend([
-            NexScore.influencer_count,
-            NexScore.influencer_perc
-        ])
-    if type_param and type_param.lower() == 'detractor':
-        fields.extend([
-            NexScore.detractor_count,
-            NexScore.detractor_perc
-        ])
-    if type_param and type_param.lower() == 'neutral':
-        fields.extend([
-            NexScore.neutral_count,
-            NexScore.neutral_perc
-        ])
-
-    query = db.session.query(*fields).join(
+    stmt = select(*_latest_fields(NexScore, type_params)).join(
         subquery,
         and_(
             NexScore.market == subquery.c.market,
@@ -50,12 +91,27 @@ def get_nex_score_data(type_param, region):
     )
 
     if region and region != 'ALL REGIONS':
-        query = query.filter(NexScore.region == region)
+        stmt = stmt.where(NexScore.region == region)
+
+    return stmt
 
-    result = query.all()
 
+def latest_statement(type_params, region, latest_table):
+    """The latest-per-market read: nex_score_latest when `latest_table`, else the self-join."""
+    if latest_table:
+        return _latest_table_statement(type_params, region)
+    # nex_score_latest has not been populated yet (or is disabled)
+    return _latest_join_statement(type_params, region)
+
+
+def _latest_rows_from_db(type_params, region):
+    return db.session.execute(latest_statement(type_params, region, latest_table_ready())).all()
+
+
+@timed_phase('serialize')
+def _entries_from_rows(rows, type_param):
     data = []
-    for row in result:
+    for row in rows:
         entry = {
             'label': row.market,
             'value': row.neutral_perc if type_param == 'neutral' else row.influencer_perc if type_param == 'influencer' else row.detractor_perc,
@@ -64,53 +120,112 @@ def get_nex_score_data(type_param, region):
             'count': row.neutral_count if type_param == 'neutral' else row.influencer_count if type_param == 'influencer' else row.detractor_count
         }
         data.append(entry)
+    return data
+
+
+@timed_phase('serialize')
+def _entries_from_snapshot(latest, type_param):
+    key = _type_key(type_param)
+
+    return [
+        {
+            'label': market,
+            'value': value,
+            'region': region_name,
+            'update_date': update_date,
+            'count': count
+        }
+        for market, value, region_name, update_date, count in zip(
+            latest['market'].astype(str).tolist(),
+            as_float64(latest[f'{key}_perc']).tolist(),
+            latest['region'].astype(str).tolist(),
+            latest['update_date'].dt.strftime('%Y-%m-%d').tolist(),
+            latest[f'{key}_count'].tolist()
+        )
+    ]
 
+
+@timed_phase('aggregate')
+def _organize(data):
     dataset = []
     if data:
         distinct_regions = set(entry['region'] for entry in data)
         organized_dataset = organize_data_by_region(distinct_regions, data)
         dataset = organized_dataset
+    return dataset
 
-    return dataset, type_param
 
-def get_trend_data(region, market, timeframe):
-    query = NexScore.query
-    
-    if region:
-        query = query.filter(NexScore.region == region)
-    if market:
-        query = query.filter(NexScore.market == market)
-    
-    records = query.order_by(NexScore.update_date.asc()).all()
-    
-    if not records:
-        return {'message': 'No data found', 'status': 404}
-    
-    data = nex_score_schema.dump(records)
-    df = pd.DataFrame(data)
+def get_latest_views(type_params, region):
+    """get_nex_score_data() for several types off one latest-per-market scan.
 
-    if df.empty:
-        return {'message': 'No data found', 'status': 404}
-    
-    df['update_date'] = pd.to_datetime(df['update_date'])
+    Returns a dict of type -> organized dataset.
+    """
+    if snapshot_enabled():
+        latest = get_snapshot().latest_rows(None if region == 'ALL REGIONS' else region)
+        return {type_param: _organize(_entries_from_snapshot(latest, type_param)) for type_param in type_params}
 
-    period_map = {
-        'monthly': 'M',
-        'quarterly': 'Q',
-        'yearly': 'Y'
-    }
+    return latest_views_from_rows(_latest_rows_from_db(type_params, region), type_params)
 
-    if timeframe not in period_map:
-        return {'error': 'Invalid period parameter', 'status': 400}
 
-    df['timeframe'] = df['update_date'].dt.to_period(period_map[timeframe]).dt.to_timestamp()
+def latest_views_from_rows(rows, type_params):
+    return {type_param: _organize(_entries_from_rows(rows, type_param)) for type_param in type_params}
+
+
+def parse_type_param(type_param):
+    """The types a `type` value asks for, or None for a single type.
+
+    'all' means every type; a comma list names several. A single type keeps
+    the original response shape, so it is not validated here.
+    """
+    if type_param.lower() == 'all':
+        return list(TYPE_PARAMS)
+    if ',' not in type_param:
+        return None
+
+    type_params = list(dict.fromkeys(part.strip().lower() for part in type_param.split(',') if part.strip()))
+    invalid = [part for part in type_params if part not in TYPE_PARAMS]
+    if invalid or not type_params:
+        raise ValueError(f'Invalid type parameter: {type_param}')
+    return type_params
+
+
+def nex_score_plan(type_param, view):
+    """Validate type/view; returns the types to read and whether the
+    response is keyed by type (type=all or a comma list)."""
+    if view not in VIEWS:
+        raise ValueError(f'Invalid view parameter: {view}')
+
+    type_params = parse_type_param(type_param)
+    if type_params is None:
+        if view == 'tree' and type_param not in TYPE_PARAMS:
+            raise ValueError(f'Invalid type parameter: {type_param}')
+        return [type_param], False
+    return type_params, True
 
-    trend_data = df.groupby('timeframe').agg({
-        'influencer_perc': lambda x: round(x.mean(), 1),
-        'detractor_perc': lambda x: round(x.mean(), 1),
-        'neutral_perc': lambda x: round(x.mean(), 1)
-    }).reset_index()
 
+def get_nex_score_data(type_param, region, view='flat'):
+    """Latest-per-market tree for one type, or a dict of trees for several.
+
+    Several types (type=all or a comma list) are read in one query. The
+    'flat' view lists market entries per region; 'tree' nests them under
+    region and national nodes carrying count-weighted aggregates.
+    """
+    type_params, keyed = nex_score_plan(type_param, view)
+    views = (get_tree_views if view == 'tree' else get_latest_views)(type_params, region)
+    return (views if keyed else views[type_param]), type_param
+
+
+def row_filters(region, market=None):
+    filters = []
+    if region:
+        filters.append(NexScore.region == region)
+    if market:
+        filters.append(NexScore.market == market)
+    return filters
+
+
+@timed_phase('serialize')
+def _label_trends(trend_data, timeframe):
     trend_data = trend_data.sort_values(by='timeframe', ascending=True)
 
     if timeframe == 'monthly':
@@ -120,5 +235,311 @@ def get_trend_data(region, market, timeframe):
     elif timeframe == 'yearly':
         trend_data['label'] = trend_data['timeframe'].dt.strftime('%Y')
 
-    trend_dict = trend_data.to_dict(orient='records')
-    return {'data': trend_dict, 'status': 200}
+    return trend_data.to_dict(orient='records')
+
+
+@timed_phase('aggregate')
+def _trend_records(df, timeframe):
+    df['timeframe'] = df['update_date'].dt.to_period(PERIOD_MAP[timeframe]).dt.to_timestamp()
+
+    trend_data = df.groupby('timeframe').agg({
+        'influencer_perc': lambda x: round(x.mean(), 1),
+        'detractor_perc': lambda x: round(x.mean(), 1),
+        'neutral_perc': lambda x: round(x.mean(), 1)
+    }).reset_index()
+
+    return _label_trends(trend_data, timeframe)
+
+
+def rollup_trend_records_from_frame(trend_data, timeframe):
+    for column in ('influencer_perc', 'detractor_perc', 'neutral_perc'):
+        trend_data[column] = trend_data[column].map(lambda x: round(x, 1))
+    return _label_trends(trend_data, timeframe)
+
+
+def _rollup_trend_records(region, market, timeframe):
+    return rollup_trend_records_from_frame(rollup_trend_frame(region, market, timeframe), timeframe)
+
+
+def sql_trend_statement(region, market, timeframe):
+    # Bucket and average inside the database so only one row per period
+    # crosses the wire. Grouping happens over a subquery column because
+    # PostgreSQL will not match a GROUP BY expression with its own bind
+    # parameters against the same expression in the select list.
+    stmt = select(
+        period_start(NexScore.update_date, timeframe).label('period'),
+        NexScore.influencer_perc,
+        NexScore.detractor_perc,
+        NexScore.neutral_perc
+    ).where(*row_filters(region, market))
+
+    buckets = stmt.subquery()
+    return select(
+        buckets.c.period,
+        func.avg(buckets.c.influencer_perc),
+        func.avg(buckets.c.detractor_perc),
+        func.avg(buckets.c.neutral_perc)
+    ).group_by(buckets.c.period)
+
+
+@timed_phase('dataframe')
+def sql_trend_records_from_rows(rows, timeframe):
+    import pandas as pd # type: ignore
+
+    trend_data = pd.DataFrame(rows, columns=['timeframe', 'influencer_perc', 'detractor_perc', 'neutral_perc'])
+    trend_data['timeframe'] = pd.to_datetime(trend_data['timeframe'])
+    for column in ('influencer_perc', 'detractor_perc', 'neutral_perc'):
+        trend_data[column] = trend_data[column].astype(float).map(lambda x: round(x, 1))
+    return _label_trends(trend_data, timeframe)
+
+
+def _sql_trend_records(region, market, timeframe):
+    rows = db.session.execute(sql_trend_statement(region, market, timeframe)).all()
+    return sql_trend_records_from_rows(rows, timeframe)
+
+
+# Trend sources that aggregate outside pandas; 'pandas' (the default) is
+# handled inline in get_trend_data
+TREND_SOURCES = {
+    'rollup': _rollup_trend_records,
+    'sql': _sql_trend_records
+}
+
+
+def get_trend_data(region, market, timeframe):
+    if timeframe not in PERIOD_MAP:
+        return {'error': 'Invalid period parameter', 'status': 400}
+
+    trend_source = TREND_SOURCES.get(current_app.config.get('NEX_SCORE_TREND_SOURCE'))
+
+    if snapshot_enabled():
+        df = _widen(get_snapshot().rows(region, market))
+    elif trend_source:
+        data = trend_source(region, market, timeframe)
+        if not data:
+            return {'message': 'No data found', 'status': 404}
+        return {'data': data, 'status': 200}
+    else:
+        query = NexScore.query.filter(*row_filters(region, market))
+
+        df = load_frame(query.order_by(NexScore.update_date.asc()), TREND_COLUMNS)
+
+    return trend_result(df, timeframe)
+
+
+def trend_result(df, timeframe):
+    if df.empty:
+        return {'message': 'No data found', 'status': 404}
+
+    return {'data': _trend_records(df, timeframe), 'status': 200}
+
+
+PERC_BREAKDOWNS = ['region']
+
+
+def get_perc_data(region, breakdown=None):
+    """Average percentages on the latest update_date of `region` (of all
+    regions without one). breakdown='region' adds every region, each on its
+    own latest date, next to the national figures."""
+    if breakdown and breakdown not in PERC_BREAKDOWNS:
+        return {'error': 'Invalid breakdown parameter', 'status': 400}
+
+    rows = load_perc_rows(region, breakdown)
+    return perc_breakdown_result(rows) if breakdown else perc_result(rows)
+
+
+def load_perc_rows(region, breakdown=None):
+    """Aggregate rows (mappings) for get_perc_data; the averages come from SQL."""
+    if snapshot_enabled():
+        return _perc_rows_from_snapshot(region, breakdown)
+
+    statement = perc_breakdown_statement(region) if breakdown else perc_statement(region)
+    return [row._mapping for row in db.session.execute(statement)]
+
+
+def _latest_update(region):
+    return select(func.max(NexScore.update_date)).where(*row_filters(region)).scalar_subquery()
+
+
+def _perc_aggregates():
+    return [func.avg(column).label(column.key) for column in PERC_FIELDS] + [func.max(NexScore.update_date).label('update_date')]
+
+
+def perc_statement(region):
+    """One row: the averages on the latest update_date of `region`, NULLs without rows."""
+    return select(*_perc_aggregates()).where(*row_filters(region), NexScore.update_date == _latest_update(region))
+
+
+def perc_breakdown_statement(region=None):
+    """A row per region on that region's latest date, plus the national row (region NULL)."""
+    latest_dates = (
+        select(NexScore.region, func.max(NexScore.update_date).label('latest_update'))
+        .where(*row_filters(region))
+        .group_by(NexScore.region)
+        .subquery()
+    )
+    regions = (
+        select(NexScore.region, *_perc_aggregates())
+        .join(latest_dates, and_(
+            NexScore.region == latest_dates.c.region,
+            NexScore.update_date == latest_dates.c.latest_update
+        ))
+        .group_by(NexScore.region)
+    )
+    national = select(null().label('region'), *_perc_aggregates()).where(NexScore.update_date == _latest_update(None))
+    return union_all(regions, national)
+
+
+def _perc_rows_from_snapshot(region, breakdown):
+    snapshot = get_snapshot()
+
+    def averages(df):
+        if df.empty:
+            return {**{column.key: None for column in PERC_FIELDS}, 'update_date': None}
+        df = _widen(df[df['update_date'] == df['update_date'].max()])
+        return {**{column.key: df[column.key].mean() for column in PERC_FIELDS}, 'update_date': df['update_date'].max().date()}
+
+    if not breakdown:
+        return [averages(snapshot.rows(region))]
+
+    rows = [{'region': None, **averages(snapshot.rows())}]
+    scoped = snapshot.rows(region)
+    for name in sorted(scoped['region'].astype(str).unique()):
+        rows.append({'region': name, **averages(scoped[(scoped['region'] == name).to_numpy()])})
+    return rows
+
+
+def _perc_body(row):
+    return {
+        'influencer_perc': round(float(row['influencer_perc']), 1),
+        'detractor_perc': round(float(row['detractor_perc']), 1),
+        'neutral_perc': round(float(row['neutral_perc']), 1),
+        'update_date': row['update_date'].strftime('%Y-%m-%d')
+    }
+
+
+def perc_result(rows):
+    if not rows or rows[0]['update_date'] is None:
+        return {'message': 'No data found', 'status': 404}
+
+    return {**_perc_body(rows[0]), 'status': 200}
+
+
+def perc_breakdown_result(rows):
+    national = next((row for row in rows if row['region'] is None), None)
+    regions = sorted((row for row in rows if row['region'] is not None), key=lambda row: row['region'])
+    if national is None or national['update_date'] is None or not regions:
+        return {'message': 'No data found', 'status': 404}
+
+    return {
+        'national': _perc_body(national),
+        'regions': [{'region': row['region'], **_perc_body(row)} for row in regions],
+        'status': 200
+    }
+
+
+def parse_month(month_query):
+    """First day of the month named by "MMM'YY" (e.g. APR'24, any case)."""
+    return datetime.strptime(month_query.strip(), "%b'%y").date()
+
+
+def shift_month(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def get_score_data(region, market, month_query):
+    try:
+        month = parse_month(month_query)
+    except ValueError:
+        return {'error': 'Invalid month parameter', 'status': 400}
+
+    return score_result(load_score_months(region, market, month), month)
+
+
+def load_score_months(region, market, month):
+    """Averages of `month` and the calendar month before it for one market.
+
+    Returns {'current': row, 'previous': row} with the months that have data,
+    or None when the market has no rows at all.
+    """
+    if snapshot_enabled():
+        return _score_months_from_snapshot(region, market, month)
+
+    months = score_months_from_rows(db.session.execute(score_statement(region, market, month)).all())
+    if 'current' not in months and db.session.execute(market_exists_statement(region, market)).first() is None:
+        return None
+    return months
+
+
+def score_statement(region, market, month):
+    """Two grouped rows at most, read through the (market, region, update_date) index."""
+    # Labelled in a subquery and grouped by its column, as in
+    # sql_trend_statement, so the CASE with its bound month is not repeated
+    # in the GROUP BY
+    stmt = select(
+        case((NexScore.update_date >= month, 'current'), else_='previous').label('month'),
+        *SCORE_FIELDS
+    ).where(
+        NexScore.region == region,
+        NexScore.market == market,
+        NexScore.update_date >= shift_month(month, -1),
+        NexScore.update_date < shift_month(month, 1)
+    )
+
+    months = stmt.subquery()
+    return (
+        select(months.c.month, *[func.avg(months.c[column.key]).label(column.key) for column in SCORE_FIELDS])
+        .group_by(months.c.month)
+    )
+
+
+def market_exists_statement(region, market):
+    return select(NexScore.id).where(NexScore.region == region, NexScore.market == market).limit(1)
+
+
+def score_months_from_rows(rows):
+    return {row.month: row._mapping for row in rows}
+
+
+@timed_phase('aggregate')
+def _score_months_from_snapshot(region, market, month):
+    import numpy as np
+    import pandas as pd # type: ignore
+
+    df = get_snapshot().rows(region, market)
+    if df.empty:
+        return None
+
+    dates = df['update_date']
+    df = _widen(df[(dates >= pd.Timestamp(shift_month(month, -1))) & (dates < pd.Timestamp(shift_month(month, 1)))])
+    labels = np.where(df['update_date'] >= pd.Timestamp(month), 'current', 'previous')
+    return df.groupby(labels)[[column.key for column in SCORE_FIELDS]].mean().to_dict('index')
+
+
+def _month_averages(row, month):
+    averages = {'timeframe': month.strftime("%b'%y").upper()}
+    for column in SCORE_FIELDS:
+        value = float(row[column.key])
+        averages[column.key] = round(value, 1) if column.key.endswith('_perc') else round(value)
+    return averages
+
+
+def score_result(months, month):
+    if months is None:
+        return {'message': 'No data found', 'status': 404}
+    if 'current' not in months:
+        return {'message': 'Month not found in data', 'status': 404}
+
+    current_month = _month_averages(months['current'], month)
+    differences = None
+    if 'previous' in months:
+        prev_month = _month_averages(months['previous'], shift_month(month, -1))
+        differences = {
+            'timeframe': current_month['timeframe'],
+            'influencer_perc_diff': round(current_month['influencer_perc'] - prev_month['influencer_perc'], 2),
+            'detractor_perc_diff': round(current_month['detractor_perc'] - prev_month['detractor_perc'], 2),
+            'neutral_perc_diff': round(current_month['neutral_perc'] - prev_month['neutral_perc'], 2)
+        }
+
+    return {'data': {'current_month': current_month, 'differences': differences}, 'status': 200}
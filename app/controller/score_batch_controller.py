@@ -0,0 +1,151 @@
+from sqlalchemy import select, func
+
+from .nex_score_controller import SCORE_FIELDS, _widen, parse_month, shift_month
+from ..metrics import timed_phase
+from ..models.nex_score import NexScore, db
+from ..snapshot import snapshot_enabled, get_snapshot
+from ..sql_functions import month_start
+
+SCORE_NAMES = [column.key for column in SCORE_FIELDS]
+PERC_NAMES = [name for name in SCORE_NAMES if name.endswith('_perc')]
+GROUP_NAMES = ['region', 'market', 'month']
+
+
+def split_list(value):
+    """Distinct, non-empty entries of a comma list; [] means no filter."""
+    return list(dict.fromkeys(part.strip() for part in (value or '').split(',') if part.strip()))
+
+
+def parse_month_range(start, end):
+    try:
+        start_month = parse_month(start)
+        end_month = parse_month(end) if end else start_month
+    except ValueError:
+        raise ValueError('Invalid month parameter')
+    if end_month < start_month:
+        raise ValueError('Invalid month range')
+    return start_month, end_month
+
+
+def _months(start, end):
+    # The month before `start` is read too, as the previous month of `start`
+    count = (end.year - start.year) * 12 + end.month - start.month + 2
+    return [shift_month(start, offset - 1) for offset in range(count)]
+
+
+def batch_statement(regions, markets, start, end):
+    """Monthly averages per region/market over [start - 1 month, end] in one grouped read."""
+    # Bucketed in a subquery and grouped by its month column, as in
+    # sql_trend_statement, so no expression with bind parameters is grouped on
+    stmt = select(NexScore.region, NexScore.market, month_start(NexScore.update_date).label('month'), *SCORE_FIELDS)
+    stmt = stmt.where(NexScore.update_date >= shift_month(start, -1), NexScore.update_date < shift_month(end, 1))
+    if regions:
+        stmt = stmt.where(NexScore.region.in_(regions))
+    if markets:
+        stmt = stmt.where(NexScore.market.in_(markets))
+
+    buckets = stmt.subquery()
+    groups = [buckets.c[name] for name in GROUP_NAMES]
+    return (
+        select(*groups, *[func.avg(buckets.c[name]).label(name) for name in SCORE_NAMES])
+        .group_by(*groups)
+    )
+
+
+@timed_phase('dataframe')
+def batch_frame_from_rows(rows):
+    import pandas as pd # type: ignore
+
+    frame = pd.DataFrame.from_records(rows, columns=GROUP_NAMES + SCORE_NAMES)
+    return frame.astype({name: 'float64' for name in SCORE_NAMES})
+
+
+def _batch_frame_from_snapshot(regions, markets, start, end):
+    import pandas as pd # type: ignore
+
+    df = get_snapshot().rows()
+    mask = (df['update_date'] >= pd.Timestamp(shift_month(start, -1))) & (df['update_date'] < pd.Timestamp(shift_month(end, 1)))
+    if regions:
+        mask &= df['region'].isin(regions)
+    if markets:
+        mask &= df['market'].isin(markets)
+    df = _widen(df[mask])
+    df = df.assign(
+        region=df['region'].astype(str),
+        market=df['market'].astype(str),
+        month=df['update_date'].dt.strftime('%Y-%m-01')
+    )
+    return df.groupby(GROUP_NAMES)[SCORE_NAMES].mean().reset_index()
+
+
+def load_batch_frame(regions, markets, start, end):
+    if snapshot_enabled():
+        return _batch_frame_from_snapshot(regions, markets, start, end)
+    return batch_frame_from_rows(db.session.execute(batch_statement(regions, markets, start, end)).all())
+
+
+@timed_phase('aggregate')
+def batch_result(frame, start, end):
+    """Month-over-month comparison for every region/market/month in the frame.
+
+    The frame is pivoted to one row per region/market and one column per
+    (field, month) over the whole range, so a month without data is NaN
+    rather than missing and the previous calendar month is always the
+    neighbouring column. Differences are one vectorized diff along months.
+    """
+    import numpy as np
+
+    if frame.empty:
+        return {'message': 'No data found', 'status': 404}
+
+    months = _months(start, end)
+    month_keys = [month.isoformat() for month in months]
+    wide = frame.pivot(index=['region', 'market'], columns='month', values=SCORE_NAMES)
+    wide = wide.reindex(columns=[(name, key) for name in SCORE_NAMES for key in month_keys])
+    # (pair, field, month)
+    cube = wide.to_numpy().reshape(len(wide), len(SCORE_NAMES), len(months))
+    perc_positions = [SCORE_NAMES.index(name) for name in PERC_NAMES]
+    cube[:, perc_positions] = np.round(cube[:, perc_positions], 1)
+    count_positions = [position for position in range(len(SCORE_NAMES)) if position not in perc_positions]
+    cube[:, count_positions] = np.round(cube[:, count_positions])
+    differences = np.round(np.diff(cube[:, perc_positions], axis=2), 2)
+
+    data = []
+    keys = wide.index.tolist()
+    # The first month only serves as the previous month of `start`
+    pairs, offsets = np.nonzero(~np.isnan(cube[:, 0, 1:]))
+    for pair, offset in zip(pairs.tolist(), offsets.tolist()):
+        region, market = keys[pair]
+        timeframe = months[offset + 1].strftime("%b'%y").upper()
+        current_month = {'timeframe': timeframe}
+        for position, name in enumerate(SCORE_NAMES):
+            value = cube[pair, position, offset + 1]
+            current_month[name] = float(value) if name in PERC_NAMES else int(value)
+
+        change = differences[pair, :, offset]
+        data.append({
+            'region': region,
+            'market': market,
+            'current_month': current_month,
+            'differences': None if np.isnan(change).any() else {
+                'timeframe': timeframe,
+                **{f'{name}_diff': float(value) for name, value in zip(PERC_NAMES, change)}
+            }
+        })
+
+    if not data:
+        # Only the month before `start` had rows
+        return {'message': 'No data found', 'status': 404}
+    return {'data': data, 'status': 200}
+
+
+def get_score_batch_data(region, market, start, end):
+    """Score comparison for comma lists of regions and markets over a month range."""
+    try:
+        start_month, end_month = parse_month_range(start, end)
+    except ValueError as e:
+        return {'error': str(e), 'status': 400}
+
+    regions, markets = split_list(region), split_list(market)
+    frame = load_batch_frame(regions, markets, start_month, end_month)
+    return batch_result(frame, start_month, end_month)
@@ -0,0 +1,172 @@
+"""Engine setup on top of the SQLALCHEMY_ENGINE_OPTIONS of the active profile.
+
+Adds two things Flask-SQLAlchemy does not do on its own: a per-connection
+statement timeout, and a QueuePool that records how long checkouts take,
+how often they had to wait for a connection and how far into overflow the
+pool went, so pool_size/max_overflow can be sized against the waitress
+thread count.
+"""
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+from .models.nex_score import db
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_seconds_total = 0.0
+        self.checkout_seconds_max = 0.0
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.overflow_checkouts = 0
+        self.overflow_peak = 0
+        self.timeouts = 0
+        self.connects = 0
+
+    def record_checkout(self, seconds, waited, overflow):
+        with self.lock:
+            self.checkouts += 1
+            self.checkout_seconds_total += seconds
+            self.checkout_seconds_max = max(self.checkout_seconds_max, seconds)
+            if waited:
+                self.waits += 1
+                self.wait_seconds_total += seconds
+                self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if overflow > 0:
+                self.overflow_checkouts += 1
+                self.overflow_peak = max(self.overflow_peak, overflow)
+
+    def record_timeout(self, seconds):
+        with self.lock:
+            self.timeouts += 1
+            self.waits += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def record_connect(self):
+        with self.lock:
+            self.connects += 1
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'checkouts': self.checkouts,
+                'checkout_seconds_avg': self.checkout_seconds_total / self.checkouts if self.checkouts else 0.0,
+                'checkout_seconds_max': self.checkout_seconds_max,
+                'waits': self.waits,
+                'wait_seconds_total': self.wait_seconds_total,
+                'wait_seconds_max': self.wait_seconds_max,
+                'overflow_checkouts': self.overflow_checkouts,
+                'overflow_peak': self.overflow_peak,
+                'timeouts': self.timeouts,
+                'connects': self.connects
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times every checkout into a PoolMetrics."""
+
+    def __init__(self, creator, pool_size=5, max_overflow=10, **kw):
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kw)
+        self.max_overflow = max_overflow
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        # dispose() swaps in a fresh pool; keep counting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        # Nothing idle and no overflow headroom: this checkout has to wait
+        # for another thread to return a connection
+        waited = self.checkedin() == 0 and self.max_overflow > -1 and self.overflow() >= self.max_overflow
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout(time.perf_counter() - started)
+            raise
+        self.metrics.record_checkout(time.perf_counter() - started, waited, self.overflow())
+        return record
+
+    def _create_connection(self):
+        self.metrics.record_connect()
+        return super()._create_connection()
+
+
+def prepare_engine_options(app):
+    """Swap in InstrumentedQueuePool for profiles that configure a QueuePool.
+
+    Must run before db.init_app(), which creates the engine.
+    """
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if app.config['SQLALCHEMY_DATABASE_URI'] in ('sqlite://', 'sqlite:///:memory:'):
+        # Flask-SQLAlchemy puts in-memory SQLite on a StaticPool, which takes no sizing
+        for name in ('pool_size', 'max_overflow', 'pool_timeout'):
+            options.pop(name, None)
+    if 'pool_size' in options and app.config.get('NEX_SCORE_POOL_METRICS', True):
+        options.setdefault('poolclass', InstrumentedQueuePool)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def _statement_timeout_sql(dialect_name, timeout_ms):
+    if dialect_name == 'mysql':
+        # Applies to read-only SELECTs, which is what the API runs
+        return f'SET SESSION max_execution_time = {int(timeout_ms)}'
+    if dialect_name == 'postgresql':
+        return f'SET statement_timeout = {int(timeout_ms)}'
+    return None
+
+
+def init_engine(app):
+    timeout_ms = app.config.get('NEX_SCORE_STATEMENT_TIMEOUT_MS')
+    if not timeout_ms:
+        return
+
+    with app.app_context():
+        install_statement_timeout(db.engine, timeout_ms)
+
+
+def install_statement_timeout(engine, timeout_ms):
+    """Run the dialect's statement timeout on every new connection of `engine`.
+
+    For an AsyncEngine pass its sync_engine.
+    """
+    sql = _statement_timeout_sql(engine.dialect.name, timeout_ms)
+    if sql is None:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_statement_timeout(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(sql)
+        finally:
+            cursor.close()
+
+
+def pool_stats(app=None):
+    app = app or current_app
+    with app.app_context():
+        pool = db.engine.pool
+
+    stats = {'profile': app.config.get('NEX_SCORE_PROFILE'), 'pool_class': type(pool).__name__, 'status': pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0)
+        })
+    metrics = getattr(pool, 'metrics', None)
+    if metrics is not None:
+        stats['metrics'] = metrics.as_dict()
+    return stats
@@ -0,0 +1,230 @@
+import csv
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date
+from io import StringIO
+from tempfile import SpooledTemporaryFile
+
+from flask import Response, current_app, stream_with_context
+from sqlalchemy import Date, and_, or_, select
+
+from .columnar import (
+    COLUMNAR_MIMETYPES, arrow_stream_chunks, columns_json, columns_json_chunks, nex_score_arrow_schema, parquet_chunks
+)
+from .metrics import timed_phase
+from .models.nex_score import NexScore, db
+
+EXPORT_COLUMNS = [column.key for column in NexScore.__table__.columns]
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Offered formats in order of preference for content negotiation
+EXPORT_MIMETYPES = {
+    'json': 'application/json',
+    'csv': 'text/csv',
+    'xlsx': XLSX_MIMETYPE,
+    **COLUMNAR_MIMETYPES
+}
+EXPORT_FORMATS = list(EXPORT_MIMETYPES)
+# Formats whose body can carry the next page's cursor
+PAGED_FORMATS = ['json', 'columns']
+
+
+def parse_fields(fields):
+    """Columns named by a comma separated `fields` value; all columns when empty."""
+    if not fields:
+        return list(EXPORT_COLUMNS)
+    names = list(dict.fromkeys(part.strip() for part in fields.split(',') if part.strip()))
+    if not names or any(name not in EXPORT_COLUMNS for name in names):
+        raise ValueError('Invalid fields parameter')
+    return names
+
+
+def encode_cursor(update_date, row_id):
+    return urlsafe_b64encode(f'{update_date.isoformat()},{row_id}'.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(update_date, id) of the last row of the previous page."""
+    try:
+        update_date, row_id = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('ascii').split(',')
+        return date.fromisoformat(update_date), int(row_id)
+    except ValueError:
+        raise ValueError('Invalid cursor parameter')
+
+
+def parse_page(limit, cursor):
+    """(limit, after) for a paged export, or None when neither is given.
+
+    limit is capped at NEX_SCORE_EXPORT_MAX_PAGE_SIZE, which is also the
+    page size when only a cursor is given.
+    """
+    if limit is None and cursor is None:
+        return None
+
+    max_page_size = current_app.config.get('NEX_SCORE_EXPORT_MAX_PAGE_SIZE', 10000)
+    if limit is None:
+        page_size = max_page_size
+    else:
+        try:
+            page_size = int(limit)
+        except ValueError:
+            raise ValueError('Invalid limit parameter')
+        if page_size < 1:
+            raise ValueError('Invalid limit parameter')
+    return min(page_size, max_page_size), decode_cursor(cursor) if cursor else None
+
+
+def _filter(stmt, region, market):
+    table = NexScore.__table__
+    if region:
+        stmt = stmt.where(table.c.region == region)
+    if market:
+        stmt = stmt.where(table.c.market == market)
+    return stmt
+
+
+def export_statement(region=None, market=None, names=EXPORT_COLUMNS):
+    table = NexScore.__table__
+    stmt = select(*[table.c[name] for name in names]).order_by(table.c.id)
+    return _filter(stmt, region, market)
+
+
+def page_statement(names, region, market, limit, after=None):
+    """One keyset page ordered by (update_date, id).
+
+    The ordering columns are appended after `names` and one extra row is
+    fetched to tell whether another page follows. The predicate on the last
+    (update_date, id) seen walks the update_date index, so every page costs
+    the same however deep it is.
+    """
+    table = NexScore.__table__
+    stmt = select(
+        *[table.c[name] for name in names],
+        table.c.update_date.label('page_update_date'),
+        table.c.id.label('page_id')
+    )
+    if after is not None:
+        update_date, row_id = after
+        stmt = stmt.where(or_(
+            table.c.update_date > update_date,
+            and_(table.c.update_date == update_date, table.c.id > row_id)
+        ))
+    return _filter(stmt, region, market).order_by(table.c.update_date, table.c.id).limit(limit + 1)
+
+
+def _json_values(row, date_positions):
+    values = list(row)
+    for position in date_positions:
+        values[position] = values[position].isoformat()
+    return values
+
+
+def _date_positions(names):
+    table = NexScore.__table__
+    return [position for position, name in enumerate(names) if isinstance(table.c[name].type, Date)]
+
+
+@timed_phase('serialize')
+def json_records(rows, names):
+    """Row dicts as the JSON export returns them (dates as YYYY-MM-DD)."""
+    date_positions = _date_positions(names)
+    return [dict(zip(names, _json_values(row, date_positions))) for row in rows]
+
+
+def export_page(export_format, names, region, market, limit, after):
+    """A page of rows as JSON records or columns, with the cursor of the next page."""
+    rows = db.session.connection().execute(page_statement(names, region, market, limit, after)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].page_update_date, rows[-1].page_id)
+    rows = [row[:len(names)] for row in rows]
+
+    if export_format == 'columns':
+        date_positions = _date_positions(names)
+        body = columns_json([[_json_values(row, date_positions) for row in rows]], names)
+        body['next_cursor'] = next_cursor
+        return current_app.response_class(current_app.json.dumps(body), mimetype=EXPORT_MIMETYPES['columns'])
+    return current_app.response_class(
+        current_app.json.dumps({'data': json_records(rows, names), 'next_cursor': next_cursor}),
+        mimetype=EXPORT_MIMETYPES['json']
+    )
+
+
+def iter_row_chunks(stmt, chunk_size):
+    """Yield lists of rows from a server-side cursor, chunk_size at a time."""
+    connection = db.session.connection()
+    result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+    for partition in result.partitions():
+        yield partition
+
+
+def _csv_chunks(stmt, chunk_size, names):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+
+    # The header goes out before the query runs so clients see bytes at once
+    writer.writerow(names)
+    yield buffer.getvalue().encode('utf-8')
+
+    for rows in iter_row_chunks(stmt, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _xlsx_chunks(stmt, chunk_size, names):
+    from openpyxl import Workbook # type: ignore
+
+    # Write-only mode keeps one row in memory at a time; the zip container can
+    # only be finished once every row is in, so it is spooled to a temp file
+    # (in memory while small) and streamed out from there.
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('nex_score')
+    sheet.append(names)
+    for rows in iter_row_chunks(stmt, chunk_size):
+        for row in rows:
+            sheet.append(list(row))
+
+    with SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while True:
+            data = spool.read(64 * 1024)
+            if not data:
+                break
+            yield data
+
+
+def _columns_export(stmt, chunk_size, names):
+    date_positions = _date_positions(names)
+    row_chunks = (
+        [_json_values(row, date_positions) for row in rows]
+        for rows in iter_row_chunks(stmt, chunk_size)
+    )
+    return Response(stream_with_context(columns_json_chunks(row_chunks, names)), mimetype=EXPORT_MIMETYPES['columns'])
+
+
+def stream_export(export_format, region=None, market=None, names=EXPORT_COLUMNS):
+    chunk_size = current_app.config.get('NEX_SCORE_EXPORT_CHUNK_SIZE', 5000)
+    stmt = export_statement(region, market, names)
+
+    if export_format == 'columns':
+        return _columns_export(stmt, chunk_size, names)
+
+    if export_format == 'csv':
+        body = _csv_chunks(stmt, chunk_size, names)
+    elif export_format == 'xlsx':
+        body = _xlsx_chunks(stmt, chunk_size, names)
+    elif export_format == 'arrow':
+        body = arrow_stream_chunks(iter_row_chunks(stmt, chunk_size), nex_score_arrow_schema(names))
+    else:
+        body = parquet_chunks(iter_row_chunks(stmt, chunk_size), nex_score_arrow_schema(names))
+
+    extension = {'arrow': 'arrows'}.get(export_format, export_format)
+    return Response(
+        stream_with_context(body),
+        mimetype=EXPORT_MIMETYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename=nex_score.{extension}'}
+    )
@@ -0,0 +1,81 @@
+"""Run independent read queries of one request side by side.
+
+Each task runs in its own app context on a shared, bounded thread pool, so
+it gets its own Flask-SQLAlchemy session (sessions are scoped to the app
+context) and its own pooled connection. The pool never runs more tasks at
+once than the connection pool can hand out next to the connection the
+request itself holds; with a single shared connection (in-memory SQLite on
+a StaticPool) the tasks simply run one after the other.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from sqlalchemy.pool import QueuePool
+
+from .metrics import current_timer, use_timer
+from .models.nex_score import db
+
+
+class _FanoutState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executor = None
+        self.workers = None
+
+
+def init_fanout(app):
+    app.config.setdefault('NEX_SCORE_FANOUT_WORKERS', 4)
+    app.extensions['nex_score_fanout'] = _FanoutState()
+
+
+def fanout_workers(app):
+    workers = app.config['NEX_SCORE_FANOUT_WORKERS']
+    with app.app_context():
+        pool = db.engine.pool
+    if not isinstance(pool, QueuePool):
+        return 1
+    # QueuePool's own default when a profile does not set it; -1 is unbounded
+    max_overflow = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}).get('max_overflow', 10)
+    if max_overflow > -1:
+        # Leave one connection for the request that fanned out
+        workers = min(workers, pool.size() + max_overflow - 1)
+    return max(workers, 1)
+
+
+def _executor(app):
+    state = app.extensions['nex_score_fanout']
+    if state.workers is None:
+        with state.lock:
+            if state.workers is None:
+                workers = fanout_workers(app)
+                if workers > 1:
+                    state.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='nex-score-fanout')
+                state.workers = workers
+    return state.executor
+
+
+def _run_in_context(app, task, timer=None):
+    # Phases of the task count towards the request that fanned out
+    with app.app_context(), use_timer(timer):
+        return task()
+
+
+def run_parallel(tasks):
+    """Run a dict of name -> zero-argument callable; return name -> result.
+
+    Exceptions raised by a task propagate to the caller once every task has
+    finished.
+    """
+    app = current_app._get_current_object()
+    timer = current_timer()
+    executor = _executor(app)
+    if executor is None:
+        return {name: _run_in_context(app, task, timer) for name, task in tasks.items()}
+
+    futures = {name: executor.submit(_run_in_context, app, task, timer) for name, task in tasks.items()}
+    errors = [future.exception() for future in futures.values()]
+    for error in errors:
+        if error is not None:
+            raise error
+    return {name: future.result() for name, future in futures.items()}
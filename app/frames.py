@@ -0,0 +1,66 @@
+from datetime import date
+
+from sqlalchemy import Date, DateTime, Float, Integer
+
+from .metrics import timed_phase
+from .models.nex_score import db
+
+# NumPy dtype per SQLAlchemy column type; anything else stays an object column.
+# Named as strings so NumPy/pandas are only imported when a frame is built.
+DEFAULT_DTYPES = [
+    (Integer, 'int64'),
+    (Float, 'float64'),
+    (DateTime, 'datetime64[ns]'),
+    (Date, 'datetime64[D]')
+]
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _dtype_for(column):
+    for sql_type, dtype in DEFAULT_DTYPES:
+        if isinstance(column.type, sql_type):
+            return dtype
+    return object
+
+
+def _to_array(values, dtype):
+    import numpy as np
+
+    if dtype is object:
+        return np.array(values, dtype=object)
+    if np.dtype(dtype) == np.dtype('datetime64[D]'):
+        # date objects become day numbers via toordinal(), which is far
+        # cheaper than letting NumPy parse each object; no ISO string round trip
+        days = np.fromiter((value.toordinal() for value in values), dtype=np.int64, count=len(values))
+        return (days - EPOCH_ORDINAL).astype('datetime64[D]').astype('datetime64[ns]')
+    if np.dtype(dtype).kind == 'M':
+        return np.array(values, dtype=dtype)
+    return np.fromiter(values, dtype=dtype, count=len(values))
+
+
+def load_frame(query, columns, dtypes=None):
+    """Load only `columns` of an ORM query straight into a typed DataFrame.
+
+    The query is narrowed to the requested columns and its statement is run
+    on the session's connection as a plain Core select, so no ORM instances
+    or ORM row loading are involved and nothing goes through
+    nex_score_schema. Cursor rows are transposed once and every column
+    becomes a NumPy array of its SQL type (dates as datetime64). `dtypes`
+    overrides the dtype per column name.
+    """
+    result = db.session.connection().execute(query.with_entities(*columns).statement)
+    return frame_from_rows(result.fetchall(), columns, dtypes)
+
+
+@timed_phase('dataframe')
+def frame_from_rows(rows, columns, dtypes=None):
+    """Typed DataFrame from already fetched rows of `columns` (see load_frame)."""
+    import pandas as pd # type: ignore
+
+    names = [column.key for column in columns]
+    dtypes = {name: (dtypes or {}).get(name, _dtype_for(column)) for name, column in zip(names, columns)}
+
+    values = list(zip(*rows)) if rows else [()] * len(names)
+
+    return pd.DataFrame({name: _to_array(column_values, dtypes[name]) for name, column_values in zip(names, values)})
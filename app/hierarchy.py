@@ -0,0 +1,182 @@
+"""National -> region -> market tree of the latest nex scores.
+
+The flat /nex-score/ view only has market leaves. The tree adds a node per
+region and a national root, each carrying count-weighted percentages
+(sum(perc * total) / sum(total)) and summed counts. All three levels come
+from one grouped query over the latest rows: GROUP BY ROLLUP on PostgreSQL
+and MySQL, a UNION ALL of the three groupings elsewhere (SQLite). The rows
+are then put into the tree in a single pass.
+"""
+from sqlalchemy import select, func, and_, null, union_all
+
+from .latest import latest_table_ready
+from .metrics import timed_phase
+from .models.nex_score import NexScore, db
+from .models.nex_score_latest import NexScoreLatest
+from .snapshot import snapshot_enabled, get_snapshot, as_float64
+from .sql_functions import rollup, ROLLUP_DIALECTS
+
+NATIONAL_LABEL = 'NATIONAL'
+SOURCE_COLUMNS = ['market', 'region', 'update_date', 'total',
+                  'influencer_count', 'detractor_count', 'neutral_count',
+                  'influencer_perc', 'detractor_perc', 'neutral_perc']
+
+
+def _filter_region(stmt, column, region):
+    if region and region != 'ALL REGIONS':
+        stmt = stmt.where(column == region)
+    return stmt
+
+
+def _latest_from_table(region):
+    source = NexScoreLatest.__table__
+    stmt = select(*[source.c[name] for name in SOURCE_COLUMNS])
+    return _filter_region(stmt, source.c.region, region).subquery()
+
+
+def _latest_from_join(region):
+    source = NexScore.__table__
+    latest_dates = (
+        select(source.c.market, source.c.region, func.max(source.c.update_date).label('latest_update'))
+        .group_by(source.c.market, source.c.region)
+        .subquery()
+    )
+    stmt = select(*[source.c[name] for name in SOURCE_COLUMNS]).join(latest_dates, and_(
+        source.c.market == latest_dates.c.market,
+        source.c.region == latest_dates.c.region,
+        source.c.update_date == latest_dates.c.latest_update
+    ))
+    return _filter_region(stmt, source.c.region, region).subquery()
+
+
+def _aggregates(source, type_params):
+    columns = [func.max(source.c.update_date).label('update_date'), func.sum(source.c.total).label('total')]
+    for type_param in type_params:
+        columns.extend([
+            func.sum(source.c[f'{type_param}_count']).label(f'{type_param}_count'),
+            func.sum(source.c[f'{type_param}_perc'] * source.c.total).label(f'{type_param}_weighted'),
+            # Market rows aggregate a single row; this is its own percentage
+            func.max(source.c[f'{type_param}_perc']).label(f'{type_param}_perc')
+        ])
+    return columns
+
+
+def rollup_statement(source, type_params, dialect_name):
+    """One statement returning market, region and national rows.
+
+    Region rows have a NULL market and the national row a NULL region too.
+    """
+    aggregates = _aggregates(source, type_params)
+    if dialect_name in ROLLUP_DIALECTS:
+        return select(source.c.region, source.c.market, *aggregates).group_by(rollup(source.c.region, source.c.market))
+
+    return union_all(
+        select(source.c.region, source.c.market, *aggregates).group_by(source.c.region, source.c.market),
+        select(source.c.region, null().label('market'), *aggregates).group_by(source.c.region),
+        select(null().label('region'), null().label('market'), *aggregates)
+    )
+
+
+def tree_statement(type_params, region, dialect_name, latest_table):
+    """Rollup over nex_score_latest when `latest_table`, else over the self-join."""
+    if latest_table:
+        return rollup_statement(_latest_from_table(region), type_params, dialect_name)
+    # nex_score_latest has not been populated yet (or is disabled)
+    return rollup_statement(_latest_from_join(region), type_params, dialect_name)
+
+
+def _rollup_rows_from_db(type_params, region):
+    statement = tree_statement(type_params, region, db.session.get_bind().dialect.name, latest_table_ready())
+    return [row._mapping for row in db.session.execute(statement).all()]
+
+
+def _rollup_rows_from_snapshot(type_params, region):
+    import pandas as pd # type: ignore
+
+    latest = get_snapshot().latest_rows(None if region == 'ALL REGIONS' else region)
+    frame = pd.DataFrame({
+        'region': latest['region'].astype(str).to_numpy(),
+        'market': latest['market'].astype(str).to_numpy(),
+        'update_date': latest['update_date'].to_numpy(),
+        'total': latest['total'].astype('int64').to_numpy()
+    })
+    aggregations = {'update_date': 'max', 'total': 'sum'}
+    for type_param in type_params:
+        perc = as_float64(latest[f'{type_param}_perc'])
+        frame[f'{type_param}_count'] = latest[f'{type_param}_count'].astype('int64').to_numpy()
+        frame[f'{type_param}_weighted'] = perc * frame['total'].to_numpy()
+        frame[f'{type_param}_perc'] = perc
+        aggregations.update({f'{type_param}_count': 'sum', f'{type_param}_weighted': 'sum', f'{type_param}_perc': 'max'})
+
+    if frame.empty:
+        return []
+    markets = frame.groupby(['region', 'market']).agg(aggregations).reset_index()
+    regions = frame.groupby('region').agg(aggregations).reset_index().assign(market=None)
+    national = {'region': None, 'market': None, **frame.agg(aggregations).to_dict()}
+    return markets.to_dict('records') + regions.to_dict('records') + [national]
+
+
+def _weighted(row, type_param):
+    if not row['total']:
+        return None
+    return round(row[f'{type_param}_weighted'] / row['total'], 2)
+
+
+def _node(label, level, row, type_param):
+    return {
+        'label': label,
+        'level': level,
+        'value': _weighted(row, type_param),
+        'count': int(row[f'{type_param}_count']),
+        'total': int(row['total']),
+        'update_date': row['update_date'].strftime('%Y-%m-%d'),
+        'children': []
+    }
+
+
+@timed_phase('aggregate')
+def build_tree(rows, type_param):
+    """Assemble rollup rows into the national -> region -> market tree.
+
+    Market leaves look like the flat /nex-score/ entries. Regions and markets
+    are ordered by label. Returns None when there are no market rows.
+    """
+    national = None
+    regions = {}
+    leaves = []
+    for row in rows:
+        if row['total'] is None:
+            # The ungrouped national select of the UNION form over no rows
+            continue
+        if row['region'] is None:
+            national = _node(NATIONAL_LABEL, 'national', row, type_param)
+        elif row['market'] is None:
+            regions[row['region']] = _node(row['region'], 'region', row, type_param)
+        else:
+            leaves.append({
+                'label': row['market'],
+                'value': row[f'{type_param}_perc'],
+                'region': row['region'],
+                'update_date': row['update_date'].strftime('%Y-%m-%d'),
+                'count': int(row[f'{type_param}_count'])
+            })
+
+    if not leaves:
+        return None
+    for leaf in sorted(leaves, key=lambda leaf: leaf['label']):
+        regions[leaf['region']]['children'].append(leaf)
+    national['children'] = [regions[name] for name in sorted(regions)]
+    return national
+
+
+def get_tree_views(type_params, region):
+    """Tree per type, all from one grouped read. Returns type -> tree."""
+    if snapshot_enabled():
+        rows = _rollup_rows_from_snapshot(type_params, region)
+    else:
+        rows = _rollup_rows_from_db(type_params, region)
+    return tree_views_from_rows(rows, type_params)
+
+
+def tree_views_from_rows(rows, type_params):
+    return {type_param: build_tree(rows, type_param) for type_param in type_params}
@@ -0,0 +1,92 @@
+import logging
+import zlib
+
+from flask import current_app, g, request
+from werkzeug.http import http_date, quote_etag
+
+from .compression import compression_enabled, request_encoding
+from .models.nex_score import db
+from .versioning import current_data_version
+
+logger = logging.getLogger(__name__)
+
+
+def etag_for(version, accept, encoding=''):
+    # Representations differ by Accept (JSON vs Arrow vs Parquet) and by the
+    # negotiated Content-Encoding, so both are folded into the tag alongside
+    # the data version.
+    etag = f'{version.token}-{zlib.crc32(accept.encode()):08x}'
+    return f'{etag}-{encoding}' if encoding else etag
+
+
+def _etag(version):
+    return etag_for(version, request.headers.get('Accept', ''), request_encoding())
+
+
+def not_modified(version, etag, if_none_match, if_modified_since):
+    """Evaluate parsed If-None-Match (an ETags) / If-Modified-Since (a datetime)."""
+    if if_none_match:
+        return if_none_match.contains_weak(etag)
+    if if_modified_since and version.last_modified:
+        return version.last_modified <= if_modified_since
+    return False
+
+
+def validator_headers(version, accept, encoding=''):
+    """ETag, Last-Modified, Cache-Control and Vary as plain header strings."""
+    max_age = current_app.config.get('NEX_SCORE_CACHE_MAX_AGE', 60)
+    headers = {
+        'ETag': quote_etag(etag_for(version, accept, encoding)),
+        'Cache-Control': f'public, max-age={max_age}, must-revalidate',
+        'Vary': 'Accept, Accept-Encoding' if compression_enabled() else 'Accept'
+    }
+    if version.last_modified:
+        headers['Last-Modified'] = http_date(version.last_modified)
+    return headers
+
+
+def _set_validators(response, version):
+    for name, value in validator_headers(version, request.headers.get('Accept', ''), request_encoding()).items():
+        if name == 'Vary':
+            response.vary.update(part.strip() for part in value.split(','))
+        else:
+            response.headers[name] = value
+
+
+def _check_conditional():
+    if request.method not in ('GET', 'HEAD'):
+        return None
+
+    try:
+        version = current_data_version()
+    except Exception:
+        # Without a version we cannot validate; let the view run (and fail) as usual
+        logger.exception('Could not read the nex_score data version')
+        db.session.rollback()
+        return None
+
+    g.data_version = version
+
+    if not_modified(version, _etag(version), request.if_none_match, request.if_modified_since):
+        response = current_app.response_class(status=304)
+        _set_validators(response, version)
+        return response
+    return None
+
+
+def _add_validators(response):
+    version = g.get('data_version')
+    if version is not None and response.status_code == 200:
+        _set_validators(response, version)
+    return response
+
+
+def register_conditional_requests(bp):
+    """Give every GET route of a blueprint ETag/Last-Modified and 304 handling.
+
+    The check runs before the view, so a matching If-None-Match or
+    If-Modified-Since is answered without any query beyond the (cached)
+    data version.
+    """
+    bp.before_request(_check_conditional)
+    bp.after_request(_add_validators)
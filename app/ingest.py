@@ -0,0 +1,209 @@
+"""Bulk loading of nex_score batches from CSV or XLSX.
+
+Replaces the hand-run nex_score_temp + STR_TO_DATE SQL in README.md. Input
+is read in chunks, dates are parsed per chunk with pandas (not row by row),
+and every chunk goes to the database as one executemany of an upsert keyed
+on (market, region, update_date), so re-loading a file is harmless. The
+whole load, including the refresh of nex_score_latest and the rollups, runs
+in the caller's transaction.
+"""
+from collections import namedtuple
+from itertools import islice
+
+from .models.nex_score import NexScore, db
+from .versioning import bump_data_version
+
+KEY_COLUMNS = ['market', 'region', 'update_date']
+COUNT_COLUMNS = ['detractor_count', 'neutral_count', 'influencer_count', 'total']
+PERC_COLUMNS = ['detractor_perc', 'neutral_perc', 'influencer_perc']
+INGEST_COLUMNS = ['market', 'region'] + COUNT_COLUMNS + PERC_COLUMNS + ['update_date']
+
+# Header spellings from the nex_score_temp layout
+COLUMN_ALIASES = {'update_date_str': 'update_date'}
+
+INGEST_FORMATS = ['csv', 'xlsx']
+DEFAULT_DATE_FORMAT = '%m/%d/%Y'
+
+# Past this many distinct dates in one load, rebuilding the derived tables
+# is cheaper than refreshing them date by date
+REBUILD_THRESHOLD = 12
+
+IngestResult = namedtuple('IngestResult', ['rows', 'update_dates'])
+
+UPSERT_DIALECTS = ['mysql', 'postgresql', 'sqlite']
+
+
+def upsert_statement(dialect_name):
+    from importlib import import_module
+
+    table = NexScore.__table__
+    values = COUNT_COLUMNS + PERC_COLUMNS
+    if dialect_name not in UPSERT_DIALECTS:
+        raise ValueError(f'Upsert is not supported on {dialect_name}')
+
+    stmt = import_module(f'sqlalchemy.dialects.{dialect_name}').insert(table)
+    if dialect_name == 'mysql':
+        return stmt.on_duplicate_key_update({name: stmt.inserted[name] for name in values})
+    return stmt.on_conflict_do_update(index_elements=KEY_COLUMNS, set_={name: stmt.excluded[name] for name in values})
+
+
+def has_upsert_key(connection):
+    """Whether nex_score has the unique (market, region, update_date) key the upsert relies on."""
+    from sqlalchemy import inspect
+
+    inspector = inspect(connection)
+    key = set(KEY_COLUMNS)
+    unique_columns = [constraint['column_names'] for constraint in inspector.get_unique_constraints(NexScore.__tablename__)]
+    unique_columns += [index['column_names'] for index in inspector.get_indexes(NexScore.__tablename__) if index['unique']]
+    return any(set(columns) == key for columns in unique_columns)
+
+
+def check_upsert_key(connection):
+    """Fail before the first upsert when the key is missing; checked once per process.
+
+    db.create_all() does not add a constraint to an existing table. Without
+    it ON DUPLICATE KEY UPDATE never fires and a re-load silently inserts
+    duplicate rows, which every average then counts twice.
+    """
+    from flask import current_app
+
+    if current_app.extensions.get('nex_score_upsert_key'):
+        return
+    if not has_upsert_key(connection):
+        raise RuntimeError(
+            'nex_score has no unique key on (market, region, update_date), so re-loads would insert duplicates. '
+            'Add it first (see the ALTER TABLE ... uq_nex_score_market_region_date in README.md).'
+        )
+    current_app.extensions['nex_score_upsert_key'] = True
+
+
+def read_csv_chunks(source, chunk_size):
+    import pandas as pd # type: ignore
+
+    yield from pd.read_csv(source, chunksize=chunk_size, skipinitialspace=True)
+
+
+def read_xlsx_chunks(source, chunk_size):
+    import pandas as pd # type: ignore
+    from openpyxl import load_workbook # type: ignore
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        workbook.close()
+
+
+def prepare_chunk(frame, date_format=DEFAULT_DATE_FORMAT):
+    """Validate one chunk and turn it into executemany parameters.
+
+    Returns the parameter dicts and the set of update_dates in the chunk.
+    """
+    import pandas as pd # type: ignore
+
+    frame = frame.rename(columns=lambda name: COLUMN_ALIASES.get(str(name).strip().lower(), str(name).strip().lower()))
+    missing = [name for name in INGEST_COLUMNS if name not in frame.columns]
+    if missing:
+        raise ValueError(f'Missing columns: {", ".join(missing)}')
+
+    frame = frame[INGEST_COLUMNS].dropna(how='all')
+    empty = [name for name in INGEST_COLUMNS if frame[name].isna().any()]
+    if empty:
+        raise ValueError(f'Empty values in columns: {", ".join(empty)}')
+
+    dates = frame['update_date']
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates.astype(str), format=date_format)
+
+    columns = {
+        'market': frame['market'].astype(str),
+        'region': frame['region'].astype(str),
+        **{name: pd.to_numeric(frame[name]).astype('int64') for name in COUNT_COLUMNS},
+        **{name: pd.to_numeric(frame[name]).astype('float64') for name in PERC_COLUMNS},
+        'update_date': dates.dt.date
+    }
+    # A repeated key inside a file keeps its last row, as a re-load would
+    prepared = pd.DataFrame(columns).drop_duplicates(KEY_COLUMNS, keep='last')
+
+    values = [prepared[name].tolist() for name in INGEST_COLUMNS]
+    records = [dict(zip(INGEST_COLUMNS, row)) for row in zip(*values)]
+    return records, set(values[-1])
+
+
+def refresh_derived(update_dates):
+    """Bring nex_score_latest and the rollups up to date for the loaded dates.
+
+    Both refreshes rebuild a table that is still empty, as it is after the
+    history was loaded with the README SQL.
+    """
+    from .latest import rebuild_latest, refresh_latest
+    from .rollups import rebuild_rollups, refresh_rollups
+
+    if len(update_dates) > REBUILD_THRESHOLD:
+        rebuild_latest()
+        rebuild_rollups()
+        return
+
+    for update_date in sorted(update_dates):
+        refresh_latest(update_date)
+        refresh_rollups(update_date)
+
+
+def ingest(source, file_format='csv', date_format=DEFAULT_DATE_FORMAT, chunk_size=50_000, refresh=True):
+    """Upsert every row of a CSV/XLSX file-like object into nex_score.
+
+    With refresh=False the derived tables are left alone, for staged
+    backfills that run refresh-latest/refresh-rollups once at the end. The
+    caller owns the transaction and should call invalidate_caches() after
+    committing.
+    """
+    if file_format not in INGEST_FORMATS:
+        raise ValueError(f'Unsupported format: {file_format}')
+
+    connection = db.session.connection()
+    upsert = upsert_statement(connection.dialect.name)
+    check_upsert_key(connection)
+    reader = read_csv_chunks if file_format == 'csv' else read_xlsx_chunks
+
+    rows = 0
+    update_dates = set()
+    for frame in reader(source, chunk_size):
+        records, dates = prepare_chunk(frame, date_format)
+        if records:
+            connection.execute(upsert, records)
+        rows += len(records)
+        update_dates |= dates
+
+    # Corrections to dates already loaded leave max(update_date) and the row
+    # count alone, so the load is counted in nex_score_version as well
+    bump_data_version(connection)
+
+    if refresh:
+        refresh_derived(update_dates)
+    return IngestResult(rows, sorted(update_dates))
+
+
+def invalidate_caches(app=None):
+    """Make the snapshot, data version, response cache and latest table probe pick up a load now."""
+    from .latest import invalidate_latest_table
+    from .response_cache import invalidate_response_cache
+    from .snapshot import invalidate_snapshot
+    from .versioning import invalidate_data_version
+
+    invalidate_snapshot(app)
+    invalidate_data_version(app)
+    invalidate_response_cache(app)
+    invalidate_latest_table(app)
+
+
+def format_from_filename(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+    return extension if extension in INGEST_FORMATS else None
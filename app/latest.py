@@ -0,0 +1,157 @@
+import time
+
+from flask import current_app
+from sqlalchemy import select, delete, insert, func, and_, exists, literal, tuple_
+from sqlalchemy.exc import DBAPIError
+from .models.nex_score import NexScore, db
+from .models.nex_score_latest import NexScoreLatest
+
+VALUE_COLUMNS = [
+    'detractor_count', 'neutral_count', 'influencer_count', 'total',
+    'detractor_perc', 'neutral_perc', 'influencer_perc', 'update_date'
+]
+LATEST_COLUMNS = ['region', 'market', 'nex_score_id'] + VALUE_COLUMNS
+
+
+def _rows_by_id(ids):
+    source = NexScore.__table__
+    return select(
+        source.c.region,
+        source.c.market,
+        source.c.id,
+        *[source.c[name] for name in VALUE_COLUMNS]
+    ).where(source.c.id.in_(ids))
+
+
+def rebuild_latest():
+    """Recompute nex_score_latest from the full history.
+
+    Used for backfills; the caller owns the transaction.
+    """
+    source = NexScore.__table__
+    latest = NexScoreLatest.__table__
+
+    latest_dates = (
+        select(source.c.market, source.c.region, func.max(source.c.update_date).label('latest_update'))
+        .group_by(source.c.market, source.c.region)
+        .subquery()
+    )
+    # Ties on the newest date resolve to the highest id
+    newest_ids = (
+        select(func.max(source.c.id))
+        .join(latest_dates, and_(
+            source.c.market == latest_dates.c.market,
+            source.c.region == latest_dates.c.region,
+            source.c.update_date == latest_dates.c.latest_update
+        ))
+        .group_by(source.c.market, source.c.region)
+    )
+
+    db.session.execute(delete(latest))
+    result = db.session.execute(insert(latest).from_select(LATEST_COLUMNS, _rows_by_id(newest_ids)))
+    return result.rowcount
+
+
+def latest_table_empty():
+    return db.session.execute(select(literal(1)).select_from(NexScoreLatest.__table__).limit(1)).first() is None
+
+
+def refresh_latest(update_date=None):
+    """Fold one loaded update_date batch into nex_score_latest.
+
+    Only the market/region pairs present in the batch are touched, and an
+    entry is replaced only when the batch is at least as new as what the table
+    already holds, so loading an older backfill never regresses it. Without an
+    update_date, or while the table is empty (never built, so a batch alone
+    would leave out every other market), the table is rebuilt. The caller
+    owns the transaction.
+    """
+    if update_date is None or latest_table_empty():
+        return rebuild_latest()
+
+    source = NexScore.__table__
+    latest = NexScoreLatest.__table__
+
+    batch_pairs = select(source.c.region, source.c.market).where(source.c.update_date == update_date)
+    db.session.execute(
+        delete(latest).where(
+            tuple_(latest.c.region, latest.c.market).in_(batch_pairs),
+            latest.c.update_date <= update_date
+        )
+    )
+
+    batch_ids = (
+        select(func.max(source.c.id))
+        .where(source.c.update_date == update_date)
+        .group_by(source.c.market, source.c.region)
+    )
+    rows = _rows_by_id(batch_ids).where(
+        ~exists().where(latest.c.region == source.c.region, latest.c.market == source.c.market)
+    )
+    result = db.session.execute(insert(latest).from_select(LATEST_COLUMNS, rows))
+    return result.rowcount
+
+
+class _LatestTableState:
+    def __init__(self):
+        self.ready = None
+        self.checked_at = 0.0
+
+
+def _latest_table_state(app):
+    return app.extensions.setdefault('nex_score_latest_table', _LatestTableState())
+
+
+def latest_table_probe():
+    return select(NexScoreLatest.__table__.c.region).limit(1)
+
+
+def cached_latest_table(app):
+    """Whether nex_score_latest can be read, or None when it should be probed.
+
+    A populated table is remembered until invalidate_latest_table(); an
+    empty or missing one is probed again after NEX_SCORE_VERSION_CHECK_INTERVAL,
+    so a table filled by another process is picked up.
+    """
+    if not app.config.get('NEX_SCORE_LATEST_TABLE'):
+        return False
+    state = _latest_table_state(app)
+    if state.ready or (state.ready is False and
+                       time.monotonic() - state.checked_at < app.config.get('NEX_SCORE_VERSION_CHECK_INTERVAL', 5)):
+        return state.ready
+    return None
+
+
+def remember_latest_table(app, ready):
+    # For callers that run the probe themselves (the ASGI mode)
+    state = _latest_table_state(app)
+    state.ready = ready
+    state.checked_at = time.monotonic()
+
+
+def latest_table_ready():
+    """Whether latest-per-market reads should use nex_score_latest.
+
+    Only an empty or missing table sends reads to the max(update_date)
+    self-join; a filtered read that finds nothing in a populated table (an
+    unknown region, say) is an empty answer, not a reason to scan the history.
+    A non-empty table is a complete one, since refresh_latest() rebuilds an
+    empty table instead of filling it with one batch.
+    """
+    app = current_app._get_current_object()
+    ready = cached_latest_table(app)
+    if ready is None:
+        try:
+            ready = db.session.execute(latest_table_probe()).first() is not None
+        except DBAPIError:
+            # Not migrated yet
+            db.session.rollback()
+            ready = False
+        remember_latest_table(app, ready)
+    return ready
+
+
+def invalidate_latest_table(app=None):
+    state = (app or current_app).extensions.get('nex_score_latest_table')
+    if state is not None:
+        state.ready = None
@@ -0,0 +1,281 @@
+"""Per-request phase timing, exposed as Prometheus histograms and Server-Timing.
+
+With NEX_SCORE_METRICS on, every request gets a PhaseTimer and its time is
+booked to the phase that is open: 'db' (cursor execution, from engine
+events), 'dataframe' (pandas frames built from rows), 'aggregate'
+(groupby, pivots, trees, region grouping), 'serialize' (rows and frames
+turned into response records) and 'encode' (JSON encoding through app.json
+and compression). Phases are exclusive: a query run while a frame is being
+loaded counts as db, not twice. Work done by the dashboard's fan-out
+threads is added to the request that started it, so phases can add up to
+more than the wall time.
+
+Per route, the request duration, every phase and the response size go into
+histograms that GET /metrics renders in the Prometheus text format. They
+are per process, like /ops/cache. Each response also carries a
+Server-Timing header (NEX_SCORE_SERVER_TIMING). Streamed exports are timed
+up to the point their body starts streaming.
+
+When metrics are off nothing is registered, and phase()/timed_phase cost
+one ContextVar lookup.
+"""
+import contextvars
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+
+from .models.nex_score import db
+
+PHASES = ['db', 'dataframe', 'aggregate', 'serialize', 'encode']
+
+DURATION_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+SIZE_BUCKETS = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216]
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_current_timer = contextvars.ContextVar('nex_score_phase_timer', default=None)
+_NOT_TIMED = nullcontext()
+
+
+class PhaseTimer:
+    """Exclusive seconds per phase for one request, across its threads."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def enter(self, name):
+        # [phase, started, seconds spent in phases opened inside it]
+        self._stack().append([name, time.perf_counter(), 0.0])
+
+    def exit(self, name):
+        stack = self._stack()
+        if not stack or stack[-1][0] != name:
+            return
+        _, started, nested = stack.pop()
+        elapsed = time.perf_counter() - started
+        if stack:
+            stack[-1][2] += elapsed
+        with self.lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + elapsed - nested
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+
+def current_timer():
+    return _current_timer.get()
+
+
+@contextmanager
+def use_timer(timer):
+    """Book phases of the enclosed code to `timer` (for work on other threads)."""
+    token = _current_timer.set(timer)
+    try:
+        yield
+    finally:
+        _current_timer.reset(token)
+
+
+@contextmanager
+def _timed(timer, name):
+    timer.enter(name)
+    try:
+        yield
+    finally:
+        timer.exit(name)
+
+
+def phase(name):
+    """Context manager booking the enclosed block to phase `name`."""
+    timer = _current_timer.get()
+    if timer is None:
+        return _NOT_TIMED
+    return _timed(timer, name)
+
+
+def timed_phase(name):
+    """Decorator booking every call of the function to phase `name`."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            timer = _current_timer.get()
+            if timer is None:
+                return function(*args, **kwargs)
+            timer.enter(name)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timer.exit(name)
+        return wrapper
+    return decorator
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        # labels -> [count per bucket (last one +Inf), sum]
+        self.series = {}
+
+    def observe(self, labels, value):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def samples(self):
+        with self.lock:
+            return [(labels, list(counts), total) for labels, (counts, total) in sorted(self.series.items())]
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.phases = Histogram(DURATION_BUCKETS)
+        self.sizes = Histogram(SIZE_BUCKETS)
+
+    def record(self, route, method, status, seconds, total, size):
+        with self.lock:
+            key = (route, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+        self.duration.observe((route, method), total)
+        for name, value in seconds.items():
+            self.phases.observe((route, name), value)
+        if size is not None:
+            self.sizes.observe((route,), size)
+
+    def _render_histogram(self, lines, metric, help_text, histogram, names):
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        bounds = [repr(float(bound)) if isinstance(bound, float) else str(bound) for bound in histogram.buckets] + ['+Inf']
+        for labels, counts, total in histogram.samples():
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{_labels(names, labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{metric}_sum{_labels(names, labels)} {total}')
+            lines.append(f'{metric}_count{_labels(names, labels)} {cumulative}')
+
+    def render(self):
+        lines = [
+            '# HELP nex_score_requests_total Requests handled, by route, method and status.',
+            '# TYPE nex_score_requests_total counter'
+        ]
+        with self.lock:
+            requests = sorted(self.requests.items())
+        for labels, count in requests:
+            lines.append(f'nex_score_requests_total{_labels(("route", "method", "status"), labels)} {count}')
+        self._render_histogram(lines, 'nex_score_request_duration_seconds',
+                               'Request wall time, by route and method.', self.duration, ('route', 'method'))
+        self._render_histogram(lines, 'nex_score_request_phase_seconds',
+                               'Time spent per request in each phase (db, dataframe, aggregate, serialize, encode).',
+                               self.phases, ('route', 'phase'))
+        self._render_histogram(lines, 'nex_score_response_size_bytes',
+                               'Response body size, by route; streamed bodies are not counted.', self.sizes, ('route',))
+        return '\n'.join(lines) + '\n'
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """app.json that books its encoding to the 'encode' phase."""
+
+    def dumps(self, obj, **kwargs):
+        with phase('encode'):
+            return super().dumps(obj, **kwargs)
+
+
+def server_timing(seconds, total):
+    entries = [f'{name};dur={seconds[name] * 1000:.2f}' for name in PHASES if name in seconds]
+    entries.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(entries)
+
+
+def _start_timer():
+    _current_timer.set(PhaseTimer())
+
+
+def _finish_timer(response):
+    timer = _current_timer.get()
+    if timer is None:
+        return response
+    total = timer.total()
+    if current_app.config['NEX_SCORE_SERVER_TIMING']:
+        response.headers['Server-Timing'] = server_timing(timer.seconds, total)
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    size = None if response.is_streamed else response.calculate_content_length()
+    current_app.extensions['nex_score_metrics'].record(route, request.method, response.status_code, timer.seconds, total, size)
+    return response
+
+
+def _clear_timer(error=None):
+    _current_timer.set(None)
+
+
+def _install_db_timing(engine):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_statement(*args):
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.enter('db')
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def end_statement(*args):
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.exit('db')
+
+    @event.listens_for(engine, 'handle_error')
+    def failed_statement(context):
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.exit('db')
+
+
+def init_metrics(app):
+    app.config.setdefault('NEX_SCORE_METRICS', False)
+    app.config.setdefault('NEX_SCORE_SERVER_TIMING', True)
+    if not app.config['NEX_SCORE_METRICS']:
+        return
+
+    app.extensions['nex_score_metrics'] = RequestMetrics()
+    app.json = TimedJSONProvider(app)
+    with app.app_context():
+        _install_db_timing(db.engine)
+    app.before_request(_start_timer)
+    app.after_request(_finish_timer)
+    app.teardown_request(_clear_timer)
+
+
+def metrics_enabled(app=None):
+    return 'nex_score_metrics' in (app or current_app).extensions
+
+
+def render_metrics(app=None):
+    return (app or current_app).extensions['nex_score_metrics'].render()
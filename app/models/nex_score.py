@@ -2,6 +2,10 @@ from .. import db
 
 class NexScore(db.Model):
     __tablename__ = 'nex_score'
+    # One row per market/region batch; the bulk ingest upserts on this key
+    __table_args__ = (
+        db.UniqueConstraint('market', 'region', 'update_date', name='uq_nex_score_market_region_date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     market = db.Column(db.String(50), nullable=False)
@@ -13,7 +17,7 @@ class NexScore(db.Model):
     detractor_perc = db.Column(db.Float, nullable=False)
     neutral_perc = db.Column(db.Float, nullable=False)
     influencer_perc = db.Column(db.Float, nullable=False)
-    update_date = db.Column(db.Date, nullable=False)
+    update_date = db.Column(db.Date, nullable=False, index=True)
 
     def __repr__(self):
         return f'<NexScore {self.market} - {self.region} - {self.update_date}>'
\ No newline at end of file
@@ -0,0 +1,25 @@
+from .. import db
+
+class NexScoreLatest(db.Model):
+    """Newest nex_score row for every market/region.
+
+    Maintained by the ingest path (see app/latest.py) so the default dashboard
+    view is a primary-key read instead of a max(update_date) self-join over the
+    full history. The key leads with region so region filters use it too.
+    """
+    __tablename__ = 'nex_score_latest'
+
+    region = db.Column(db.String(50), primary_key=True)
+    market = db.Column(db.String(50), primary_key=True)
+    nex_score_id = db.Column(db.Integer, nullable=False)
+    detractor_count = db.Column(db.Integer, nullable=False)
+    neutral_count = db.Column(db.Integer, nullable=False)
+    influencer_count = db.Column(db.Integer, nullable=False)
+    total = db.Column(db.Integer, nullable=False)
+    detractor_perc = db.Column(db.Float, nullable=False)
+    neutral_perc = db.Column(db.Float, nullable=False)
+    influencer_perc = db.Column(db.Float, nullable=False)
+    update_date = db.Column(db.Date, nullable=False)
+
+    def __repr__(self):
+        return f'<NexScoreLatest {self.market} - {self.region} - {self.update_date}>'
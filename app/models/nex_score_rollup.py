@@ -0,0 +1,29 @@
+from .. import db
+
+class NexScoreRollup(db.Model):
+    """Per-period sums behind /nex-score/trends.
+
+    One row per timeframe (monthly/quarterly/yearly), level (national, region
+    or market) and period. National rows carry '' for region and market,
+    region rows '' for market, so the whole key stays NOT NULL. Averages are
+    the sums divided by row_count, which lets periods be recombined (e.g. one
+    market across regions) without going back to nex_score.
+    """
+    __tablename__ = 'nex_score_rollup'
+
+    timeframe = db.Column(db.String(10), primary_key=True)
+    level = db.Column(db.String(10), primary_key=True)
+    region = db.Column(db.String(50), primary_key=True, default='')
+    market = db.Column(db.String(50), primary_key=True, default='')
+    period_start = db.Column(db.Date, primary_key=True)
+    row_count = db.Column(db.Integer, nullable=False)
+    detractor_count_sum = db.Column(db.BigInteger, nullable=False)
+    neutral_count_sum = db.Column(db.BigInteger, nullable=False)
+    influencer_count_sum = db.Column(db.BigInteger, nullable=False)
+    total_sum = db.Column(db.BigInteger, nullable=False)
+    detractor_perc_sum = db.Column(db.Float, nullable=False)
+    neutral_perc_sum = db.Column(db.Float, nullable=False)
+    influencer_perc_sum = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f'<NexScoreRollup {self.timeframe} {self.level} {self.region} {self.market} {self.period_start}>'
@@ -0,0 +1,19 @@
+from .. import db
+
+class NexScoreVersion(db.Model):
+    """Single row (id 1) counting the loads made through app.ingest.
+
+    An upsert that corrects values for dates already loaded changes neither
+    max(update_date) nor the row count, so the ingest bumps this row in its
+    own transaction and the data version includes it. Every process sees
+    the bump on its next version check, including servers that did not run
+    the load (e.g. after `flask nex-score ingest`).
+    """
+    __tablename__ = 'nex_score_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    ingest_count = db.Column(db.Integer, nullable=False, default=0)
+    loaded_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<NexScoreVersion {self.ingest_count} - {self.loaded_at}>'
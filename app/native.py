@@ -0,0 +1,197 @@
+"""Serve the hot read endpoints without going through WSGI.
+
+The Azure Functions entry point (run.py) normally hands every request to
+func.WsgiMiddleware, which builds a WSGI environ, runs the full Flask
+request cycle and copies the response back. For the hot GET endpoints
+with their default JSON representation, handle_native() calls the same
+controllers directly inside an app context and applies the same data-version
+validators, 304 handling and response cache as the blueprint hooks. Anything
+else (other routes or methods, ?format=, a columnar Accept type) returns None
+so the caller falls back to WSGI.
+"""
+import logging
+
+from flask_cors.core import get_cors_headers, get_cors_options  # type: ignore
+from werkzeug.datastructures import Headers, MIMEAccept
+from werkzeug.http import parse_accept_header, parse_date, parse_etags
+
+from .columnar import READ_MIMETYPES
+from .controller.dashboard_controller import get_dashboard_data
+from .controller.market_region_controller import get_dropdown_records
+from .controller.nex_score_controller import get_nex_score_data, get_perc_data, get_score_data, get_trend_data
+from .compression import compress_body, compression_enabled, negotiate_encoding
+from .http_cache import etag_for, not_modified, validator_headers
+from .models.nex_score import db
+from .response_cache import CachedResponse, get_response_cache, make_cache_key
+from .versioning import current_data_version
+
+logger = logging.getLogger(__name__)
+
+
+def _nex_score(args):
+    try:
+        dataset, type_param = get_nex_score_data(args.get('type') or 'influencer', args.get('region'),
+                                                 args.get('view') or 'flat')
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    return {'data': dataset, 'type': type_param}, 200
+
+
+def _trends(args):
+    result = get_trend_data(args.get('region'), args.get('market'), args.get('timeframe', 'monthly'))
+    return result, result.pop('status')
+
+
+def _percentage(args):
+    result = get_perc_data(args.get('region'), args.get('breakdown'))
+    return result, result.pop('status')
+
+
+def _dropdown(args):
+    return {'data': get_dropdown_records()}, 200
+
+
+def _score(args):
+    for name in ('region', 'market', 'month'):
+        if not args.get(name):
+            return {'error': f'{name.capitalize()} is required'}, 400
+    result = get_score_data(args['region'], args['market'], args['month'])
+    return result, result.pop('status')
+
+
+def _dashboard(args):
+    result = get_dashboard_data(args.get('region'), args.get('market'), args.get('timeframe', 'monthly'))
+    return result, result.pop('status')
+
+
+# path -> (Flask endpoint, handler, whether the route negotiates columnar formats)
+NATIVE_ROUTES = {
+    '/nex-score/': ('nex_score.get_nex_score', _nex_score, False),
+    '/nex-score/trends': ('nex_score.get_trend', _trends, True),
+    '/nex-score/percentage': ('nex_score.get_perc', _percentage, False),
+    '/nex-score/score-comparison': ('nex_score.get_score', _score, False),
+    '/nex-score/dashboard': ('nex_score.get_dashboard', _dashboard, False),
+    '/market-region/': ('market_region.get_dropdown_values', _dropdown, True)
+}
+
+
+def _wants_columnar(args, accept):
+    if args.get('format'):
+        return True
+    best = MIMEAccept(parse_accept_header(accept)).best_match(list(READ_MIMETYPES.values()))
+    return best not in (None, READ_MIMETYPES['json'])
+
+
+def _add_cors_headers(response_headers, app, headers):
+    """Add what CORS(app) would send for this GET, merging Vary."""
+    options = app.extensions.get('nex_score_cors_options')
+    if options is None:
+        # CORS(app) is created without arguments, so its options are the
+        # flask-cors defaults plus any CORS_* settings in app.config
+        options = app.extensions['nex_score_cors_options'] = get_cors_options(app)
+    for name, value in get_cors_headers(options, Headers(headers), 'GET').items():
+        if name == 'Vary' and response_headers.get('Vary'):
+            value = f"{response_headers['Vary']}, {value}"
+        response_headers[name] = value
+    return response_headers
+
+
+def native_route(method, path, args, headers):
+    """(endpoint, handler) when the request can skip WSGI, else None."""
+    route = NATIVE_ROUTES.get(path)
+    if method != 'GET' or route is None:
+        return None
+    endpoint, handler, negotiates = route
+    if negotiates and _wants_columnar(args, headers.get('accept', '')):
+        return None
+    return endpoint, handler
+
+
+class NativeExchange:
+    """Validators, 304 handling and response cache around one request.
+
+    Shared by the Functions handler below and the ASGI mode (app.asgi);
+    must be created inside an app context.
+    """
+
+    def __init__(self, app, endpoint, args, headers, version):
+        self.app = app
+        self.headers = headers
+        self.version = version
+        self.accept = headers.get('accept', '')
+        self.encoding = negotiate_encoding(app, headers.get('accept-encoding'))
+        self.response_headers = {}
+        if version is not None:
+            self.response_headers.update(validator_headers(version, self.accept, self.encoding))
+        _add_cors_headers(self.response_headers, app, headers)
+
+        self.cache = get_response_cache(app)
+        self.key = None
+        if self.cache is not None and version:
+            self.key = make_cache_key(endpoint, args.items(), self.accept, version, self.encoding)
+
+    def early_response(self):
+        """A 304 or a cached response, or None when the handler has to run."""
+        if self.version is not None and not_modified(
+                self.version, etag_for(self.version, self.accept, self.encoding),
+                parse_etags(self.headers.get('if-none-match')), parse_date(self.headers.get('if-modified-since'))):
+            return 304, self.response_headers, b''
+
+        entry = self.cache.get(self.key) if self.key else None
+        if entry is not None:
+            return entry.status, {**dict(entry.headers), **self.response_headers}, entry.body
+        return None
+
+    def response(self, body, status):
+        # The bytes jsonify() produces, so the response cache and ETags hold the
+        # same body whichever path answered first
+        content = self.app.json.response(body).get_data()
+        content_headers = [('Content-Type', 'application/json')]
+        if status == 200:
+            # Cached already compressed, as the Flask routes do
+            content, encoding = compress_body(self.app, content, self.encoding)
+            if encoding:
+                content_headers.append(('Content-Encoding', encoding))
+            if self.key:
+                self.cache.set(self.key, CachedResponse(status, content_headers, content))
+
+        response_headers = self.response_headers
+        if status != 200:
+            # Validators only go on successful responses, as in http_cache
+            response_headers = {}
+            if compression_enabled(self.app):
+                response_headers['Vary'] = 'Accept-Encoding'
+            _add_cors_headers(response_headers, self.app, self.headers)
+        return status, {**dict(content_headers), **response_headers}, content
+
+
+def handle_native(app, method, path, args, headers):
+    """Answer a hot GET without WSGI.
+
+    `args` maps query parameter names to values and `headers` request header
+    names (lower case) to values. Returns (status, headers, body) or None
+    when the request should go through WSGI instead.
+    """
+    route = native_route(method, path, args, headers)
+    if route is None:
+        return None
+    endpoint, handler = route
+
+    with app.app_context():
+        try:
+            version = current_data_version()
+        except Exception:
+            logger.exception('Could not read the nex_score data version')
+            db.session.rollback()
+            version = None
+
+        exchange = NativeExchange(app, endpoint, args, headers, version)
+        early = exchange.early_response()
+        if early is not None:
+            return early
+
+        try:
+            body, status = handler(args)
+        except Exception as e:
+            body, status = {'error': str(e)}, 500
+        return exchange.response(body, status)
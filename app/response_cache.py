@@ -0,0 +1,255 @@
+"""Cache of rendered GET responses for the read blueprints.
+
+Entries are keyed on the endpoint, the normalized query arguments, the
+Accept header and the data version, so a new batch of nex_score rows makes
+every older entry unreachable without an explicit purge; stale entries then
+age out through the TTL or the byte bound.
+
+Two backends:
+
+* ``memory`` - per-process LRU bounded by total body bytes;
+* ``sqlite`` - a SQLite file shared by every worker on the host.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import current_app, g, request
+
+from .compression import request_encoding
+
+CachedResponse = namedtuple('CachedResponse', ['status', 'headers', 'body'])
+
+# Set per request by http_cache or recomputed on every hit; never stored
+UNCACHED_HEADERS = {'content-length', 'date', 'etag', 'last-modified', 'cache-control', 'vary', 'set-cookie'}
+
+
+class CacheStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def incr(self, name, amount=1):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def as_dict(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'expirations': self.expirations}
+
+
+class MemoryCache:
+    """LRU + TTL, bounded by the summed size of the cached bodies."""
+    name = 'memory'
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.stats.incr('misses')
+                return None
+            entry, size, expires_at = item
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.stats.incr('expirations')
+                self.stats.incr('misses')
+                return None
+            self._entries.move_to_end(key)
+        self.stats.incr('hits')
+        return entry
+
+    def set(self, key, entry):
+        size = len(entry.body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (entry, size, time.monotonic() + self.ttl)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats.incr('evictions')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def info(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes}
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+class SQLiteCache:
+    """Shared cache in a SQLite file; least recently read entries go first."""
+    name = 'sqlite'
+
+    def __init__(self, path, max_bytes, ttl):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS response_cache ('
+                'key TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB, '
+                'size INTEGER, expires_at REAL, accessed_at REAL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_response_cache_accessed ON response_cache (accessed_at)')
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=5)
+        connection.execute('PRAGMA journal_mode=WAL')
+        return connection
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as connection:
+            row = connection.execute(
+                'SELECT status, headers, body, expires_at FROM response_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self.stats.incr('misses')
+                return None
+            status, headers, body, expires_at = row
+            if expires_at <= now:
+                connection.execute('DELETE FROM response_cache WHERE key = ?', (key,))
+                self.stats.incr('expirations')
+                self.stats.incr('misses')
+                return None
+            connection.execute('UPDATE response_cache SET accessed_at = ? WHERE key = ?', (now, key))
+        self.stats.incr('hits')
+        return CachedResponse(status, [tuple(header) for header in json.loads(headers)], bytes(body))
+
+    def set(self, key, entry):
+        size = len(entry.body)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, entry.status, json.dumps(entry.headers), entry.body, size, now + self.ttl, now)
+            )
+            connection.execute('DELETE FROM response_cache WHERE expires_at <= ?', (now,))
+            total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM response_cache').fetchone()[0]
+            if total > self.max_bytes:
+                evicted = 0
+                for old_key, old_size in connection.execute(
+                        'SELECT key, size FROM response_cache ORDER BY accessed_at').fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    connection.execute('DELETE FROM response_cache WHERE key = ?', (old_key,))
+                    total -= old_size
+                    evicted += 1
+                self.stats.incr('evictions', evicted)
+
+    def clear(self):
+        with self._connect() as connection:
+            connection.execute('DELETE FROM response_cache')
+
+    def info(self):
+        with self._connect() as connection:
+            entries, size = connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache').fetchone()
+        return {'entries': entries, 'bytes': size}
+
+
+def init_response_cache(app):
+    app.config.setdefault('NEX_SCORE_RESPONSE_CACHE', 'memory')
+    app.config.setdefault('NEX_SCORE_RESPONSE_CACHE_BYTES', 64 * 1024 * 1024)
+    app.config.setdefault('NEX_SCORE_RESPONSE_CACHE_TTL', 300)
+
+    backend = app.config['NEX_SCORE_RESPONSE_CACHE']
+    max_bytes = app.config['NEX_SCORE_RESPONSE_CACHE_BYTES']
+    ttl = app.config['NEX_SCORE_RESPONSE_CACHE_TTL']
+
+    if backend == 'memory':
+        cache = MemoryCache(max_bytes, ttl)
+    elif backend == 'sqlite':
+        cache = SQLiteCache(app.config['NEX_SCORE_RESPONSE_CACHE_PATH'], max_bytes, ttl)
+    else:
+        cache = None
+    app.extensions['nex_score_response_cache'] = cache
+
+
+def get_response_cache(app=None):
+    return (app or current_app).extensions.get('nex_score_response_cache')
+
+
+def invalidate_response_cache(app=None):
+    cache = get_response_cache(app)
+    if cache is not None:
+        cache.clear()
+
+
+def cache_stats(app=None):
+    cache = get_response_cache(app)
+    if cache is None:
+        return {'backend': None}
+    return {'backend': cache.name, **cache.stats.as_dict(), **cache.info()}
+
+
+def make_cache_key(endpoint, args, accept, version, encoding=''):
+    # Empty values are dropped and the rest sorted, so ?region=WEST&type=
+    # and ?type&region=WEST share an entry. Bodies are stored already
+    # compressed, so the negotiated encoding is part of the key.
+    args = sorted((name, value.strip()) for name, value in args if value.strip())
+    return json.dumps([endpoint, args, accept, version.token, encoding])
+
+
+def cache_key(version):
+    return make_cache_key(
+        request.endpoint, request.args.items(multi=True), request.headers.get('Accept', ''), version, request_encoding()
+    )
+
+
+def _serve_cached():
+    cache = get_response_cache()
+    version = g.get('data_version')
+    if cache is None or version is None or request.method != 'GET':
+        return None
+
+    key = cache_key(version)
+    entry = cache.get(key)
+    if entry is None:
+        g.response_cache_key = key
+        return None
+    return current_app.response_class(entry.body, status=entry.status, headers=entry.headers)
+
+
+def _store_response(response):
+    key = g.pop('response_cache_key', None)
+    if key is None or response.status_code != 200 or response.is_streamed:
+        return response
+
+    headers = [(name, value) for name, value in response.headers.items() if name.lower() not in UNCACHED_HEADERS]
+    get_response_cache().set(key, CachedResponse(response.status_code, headers, response.get_data()))
+    return response
+
+
+def register_response_cache(bp):
+    """Serve repeated GETs of a blueprint from the response cache.
+
+    Must be registered after register_conditional_requests, whose hook puts
+    the data version on `g`; without a version nothing is cached.
+    """
+    bp.before_request(_serve_cached)
+    bp.after_request(_store_response)
@@ -0,0 +1,189 @@
+from datetime import date
+
+from sqlalchemy import select, delete, insert, func, literal, literal_column, cast
+
+from .metrics import timed_phase
+from .models.nex_score import NexScore, db
+from .models.nex_score_rollup import NexScoreRollup
+from .sql_functions import period_start
+
+TIMEFRAMES = ['monthly', 'quarterly', 'yearly']
+LEVELS = ['national', 'region', 'market']
+PERC_COLUMNS = ['influencer_perc', 'detractor_perc', 'neutral_perc']
+COUNT_COLUMNS = ['detractor_count', 'neutral_count', 'influencer_count', 'total']
+
+ROLLUP_COLUMNS = (
+    ['timeframe', 'period_start', 'level', 'region', 'market', 'row_count']
+    + [f'{name}_sum' for name in COUNT_COLUMNS]
+    + [f'{name}_sum' for name in PERC_COLUMNS]
+)
+
+
+def period_bounds(timeframe, day):
+    """Return the [start, end) dates of the period containing day."""
+    if timeframe == 'monthly':
+        start = date(day.year, day.month, 1)
+        end = date(day.year + 1, 1, 1) if day.month == 12 else date(day.year, day.month + 1, 1)
+    elif timeframe == 'quarterly':
+        first_month = 3 * ((day.month - 1) // 3) + 1
+        start = date(day.year, first_month, 1)
+        end = date(day.year + 1, 1, 1) if first_month == 10 else date(day.year, first_month + 3, 1)
+    elif timeframe == 'yearly':
+        start = date(day.year, 1, 1)
+        end = date(day.year + 1, 1, 1)
+    else:
+        raise ValueError(f'Unknown timeframe: {timeframe}')
+    return start, end
+
+
+def _aggregate(timeframe, level, period_start_expression, where=(), per_period=False):
+    source = NexScore.__table__
+    group_by = {'national': [], 'region': [source.c.region], 'market': [source.c.region, source.c.market]}[level]
+    if per_period:
+        # Grouping by position (the period is the second column) keeps the
+        # expression from being rendered twice with separate bind parameters
+        group_by = [literal_column('2')] + group_by
+
+    stmt = (
+        select(
+            literal(timeframe),
+            period_start_expression,
+            literal(level),
+            source.c.region if level != 'national' else literal(''),
+            source.c.market if level == 'market' else literal(''),
+            func.count(),
+            *[func.sum(source.c[name]) for name in COUNT_COLUMNS],
+            *[func.sum(source.c[name]) for name in PERC_COLUMNS]
+        )
+        .where(*where)
+        .group_by(*group_by)
+        .having(func.count() > 0)
+    )
+    return insert(NexScoreRollup.__table__).from_select(ROLLUP_COLUMNS, stmt)
+
+
+def _aggregate_period(timeframe, level, start, end):
+    source = NexScore.__table__
+    return _aggregate(
+        timeframe, level, literal(start, type_=db.Date),
+        where=(source.c.update_date >= start, source.c.update_date < end)
+    )
+
+
+def _aggregate_all_periods(timeframe, level):
+    source = NexScore.__table__
+    start = period_start(source.c.update_date, timeframe)
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # period_start renders text; PostgreSQL will not assign text to a date column
+        start = cast(start, db.Date)
+    return _aggregate(timeframe, level, start, per_period=True)
+
+
+def refresh_period(timeframe, start, end):
+    rollup = NexScoreRollup.__table__
+    db.session.execute(delete(rollup).where(rollup.c.timeframe == timeframe, rollup.c.period_start == start))
+    for level in LEVELS:
+        db.session.execute(_aggregate_period(timeframe, level, start, end))
+
+
+def rollups_empty():
+    return db.session.execute(select(literal(1)).select_from(NexScoreRollup.__table__).limit(1)).first() is None
+
+
+def refresh_rollups(update_date):
+    """Recompute the month, quarter and year that contain update_date.
+
+    Called after a batch is loaded; only those three periods are touched.
+    An empty table has never been built, and those periods alone would be
+    the whole trend series, so it is rebuilt instead and the number of
+    periods returned. The caller owns the transaction.
+    """
+    if rollups_empty():
+        return rebuild_rollups()
+    for timeframe in TIMEFRAMES:
+        refresh_period(timeframe, *period_bounds(timeframe, update_date))
+
+
+def rebuild_rollups():
+    """Recompute every period from the full history (for backfills).
+
+    One grouped INSERT ... SELECT per timeframe and level, rather than one
+    per period, so a backfill scans nex_score nine times in total.
+    """
+    db.session.execute(delete(NexScoreRollup.__table__))
+    for timeframe in TIMEFRAMES:
+        for level in LEVELS:
+            db.session.execute(_aggregate_all_periods(timeframe, level))
+
+    return db.session.query(NexScoreRollup.timeframe, NexScoreRollup.period_start).distinct().count()
+
+
+def rollup_trend_statement(region, market, timeframe):
+    level = 'market' if market else 'region' if region else 'national'
+    rollup = NexScoreRollup.__table__
+
+    stmt = select(
+        rollup.c.period_start,
+        *[
+            (func.sum(rollup.c[f'{name}_sum']) / func.sum(rollup.c.row_count)).label(name)
+            for name in PERC_COLUMNS
+        ]
+    ).where(rollup.c.timeframe == timeframe, rollup.c.level == level)
+
+    if region:
+        stmt = stmt.where(rollup.c.region == region)
+    if market:
+        stmt = stmt.where(rollup.c.market == market)
+
+    return stmt.group_by(rollup.c.period_start).order_by(rollup.c.period_start)
+
+
+@timed_phase('dataframe')
+def rollup_trend_frame_from_rows(rows):
+    import pandas as pd # type: ignore
+
+    df = pd.DataFrame(rows, columns=['timeframe'] + PERC_COLUMNS)
+    df['timeframe'] = pd.to_datetime(df['timeframe'])
+    return df
+
+
+def rollup_trend_frame(region, market, timeframe):
+    """Unrounded per-period averages read from nex_score_rollup."""
+    rows = db.session.execute(rollup_trend_statement(region, market, timeframe)).all()
+    return rollup_trend_frame_from_rows(rows)
+
+
+def check_rollups(region, market, timeframe, tolerance=1e-6):
+    """Compare rollup averages with a pandas groupby over nex_score.
+
+    Returns a list of mismatching periods; empty means consistent.
+    """
+    import pandas as pd # type: ignore
+
+    query = NexScore.query.with_entities(NexScore.update_date, *[getattr(NexScore, name) for name in PERC_COLUMNS])
+    if region:
+        query = query.filter(NexScore.region == region)
+    if market:
+        query = query.filter(NexScore.market == market)
+
+    raw = pd.DataFrame(query.all(), columns=['update_date'] + PERC_COLUMNS)
+    raw['timeframe'] = pd.to_datetime(raw['update_date']).dt.to_period(
+        {'monthly': 'M', 'quarterly': 'Q', 'yearly': 'Y'}[timeframe]
+    ).dt.to_timestamp()
+    expected = raw.groupby('timeframe')[PERC_COLUMNS].mean()
+    actual = rollup_trend_frame(region, market, timeframe).set_index('timeframe')
+
+    mismatches = []
+    for period in expected.index.union(actual.index):
+        if period not in expected.index or period not in actual.index:
+            mismatches.append({'timeframe': period, 'expected': period in expected.index, 'actual': period in actual.index})
+            continue
+        for name in PERC_COLUMNS:
+            if abs(expected.at[period, name] - actual.at[period, name]) > tolerance:
+                mismatches.append({
+                    'timeframe': period,
+                    'column': name,
+                    'expected': expected.at[period, name],
+                    'actual': actual.at[period, name]
+                })
+    return mismatches
@@ -2,14 +2,19 @@
 
 from flask import Blueprint, jsonify
 from ..models.nex_score import NexScore, db
-from ..schemas import nex_score_schema
 from ..utils import organize_data_by_region
 from sqlalchemy import func, and_
 from flask import request
 from ..controller.market_region_controller import get_dropdown_val
+from ..http_cache import register_conditional_requests
+from ..response_cache import register_response_cache
+from ..compression import register_compression
 
 
 bp = Blueprint('market_region', __name__, url_prefix='/market-region')
+register_conditional_requests(bp)
+register_response_cache(bp)
+register_compression(bp)
 
 
 # @bp.route('/', methods=['GET'])
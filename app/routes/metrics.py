@@ -0,0 +1,23 @@
+from flask import Blueprint, current_app, jsonify
+from ..metrics import PROMETHEUS_CONTENT_TYPE, metrics_enabled, render_metrics
+
+
+bp = Blueprint('metrics', __name__)
+
+
+@bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Per-route request, phase and response size histograms for this process
+    ---
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: Prometheus text format
+      404:
+        description: Metrics are off (NEX_SCORE_METRICS)
+    """
+    if not metrics_enabled():
+        return jsonify({'message': 'Metrics are disabled'}), 404
+    return current_app.response_class(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,14 +1,23 @@
-from flask import Blueprint, jsonify, request, send_file
-from ..models.nex_score import NexScore, db
-from flasgger import swag_from # type: ignore
-from ..schemas import nex_score_schema
-from ..utils import organize_data_by_region
-from sqlalchemy import func, and_
-from flask import request
-import pandas as pd # type: ignore
-from io import BytesIO
+from flask import Blueprint, jsonify, request
+from ..models.nex_score import db
+from ..docs import swag_from
+from ..controller.nex_score_controller import get_nex_score_data, get_trend_data, get_perc_data, get_score_data
+from ..controller.ingest_controller import ingest_upload
+from ..controller.dashboard_controller import get_dashboard_data
+from ..controller.score_batch_controller import get_score_batch_data
+from ..columnar import COLUMNAR_MIMETYPES, READ_MIMETYPES, negotiate_format, records_response
+from ..exports import (
+    EXPORT_FORMATS, EXPORT_MIMETYPES, PAGED_FORMATS, export_page, export_statement, json_records, parse_fields, parse_page,
+    stream_export
+)
+from ..http_cache import register_conditional_requests
+from ..response_cache import register_response_cache
+from ..compression import register_compression
 
 bp = Blueprint('nex_score', __name__, url_prefix='/nex-score')
+register_conditional_requests(bp)
+register_response_cache(bp)
+register_compression(bp)
 
 @bp.route('/', methods=['GET'])
 @swag_from({
@@ -18,10 +27,21 @@ bp = Blueprint('nex_score', __name__, url_prefix='/nex-score')
             'name': 'type',
             'in': 'query',
             'type': 'string',
-            'enum': ['influencer', 'detractor', 'neutral'],
             'required': False,
             'default': 'influencer',
-            'description': 'The type of data to retrieve. Options are influencer, detractor, and neutral.'
+            'description': 'The type of data to retrieve. Options are influencer, detractor, and neutral, '
+                           'or all / a comma separated list (e.g. influencer,neutral) to get one tree per type '
+                           'under data, keyed by type.'
+        },
+        {
+            'name': 'view',
+            'in': 'query',
+            'type': 'string',
+            'enum': ['flat', 'tree'],
+            'required': False,
+            'default': 'flat',
+            'description': 'flat lists the markets of each region; tree returns a national node with one child per '
+                           'region and the markets under those, with count-weighted value, count and total at each level.'
         },
         {
             'name': 'region',
@@ -50,6 +70,9 @@ bp = Blueprint('nex_score', __name__, url_prefix='/nex-score')
                 }
             }
         },
+        400: {
+            'description': 'Unknown type or view'
+        },
         500: {
             'description': 'Internal Server Error',
             'schema': {
@@ -69,106 +92,29 @@ def get_nex_score():
         # Get the 'type' parameter from the query string
         type_param = request.args.get('type') or 'influencer'
         region = request.args.get('region')
+        view = request.args.get('view') or 'flat'
 
-        print(region,type_param)
-
-        subquery = (
-            db.session.query(
-                NexScore.market,
-                NexScore.region,
-                func.max(NexScore.update_date).label('latest_update')
-            )
-            .group_by(NexScore.market, NexScore.region)
-            .subquery()
-        )
-
-        # Define the fields to be selected based on the value of the 'type' parameter
-        fields = [
-            NexScore.market,
-            NexScore.region,
-            NexScore.update_date
-        ]
-
-        if type_param and type_param.lower() == 'influencer':
-            fields.extend([
-                NexScore.influencer_count,
-                NexScore.influencer_perc
-            ])
-        if type_param and type_param.lower() == 'detractor':
-            fields.extend([
-                NexScore.detractor_count,
-                NexScore.detractor_perc
-            ])
-        if type_param and type_param.lower() == 'neutral':
-            fields.extend([
-                NexScore.neutral_count,
-                NexScore.neutral_perc
-            ])
-
-        # Join subquery with the main table
-        query = db.session.query(*fields).join(
-            subquery,
-            and_(
-                NexScore.market == subquery.c.market,
-                NexScore.region == subquery.c.region,
-                NexScore.update_date == subquery.c.latest_update
-            )
-        )
-
-        if region and region != 'ALL REGIONS':
-            query = query.filter(NexScore.region == region)
-
-        # Execute the query
-        result = query.all()
-
-        data = []
-        # for row in result:
-        #     entry = {
-        #         'label': row.market,
-        #         'value': row.neutral_perc or row.influencer_perc or row.detractor_perc,
-        #         'region': row.region,
-        #         'update_date': row.update_date.strftime('%Y-%m-%d'),
-        #         'percentage': row.percentage
-        #     }
-        #     data.append(entry)
-        for row in result:
-            entry = {
-                'label': row.market,
-                'value': row.neutral_perc if type_param == 'neutral' else row.influencer_perc if type_param == 'influencer' else row.detractor_perc,
-                'region': row.region,
-                'update_date': row.update_date.strftime('%Y-%m-%d'),
-                'count': row.neutral_count if type_param == 'neutral' else row.influencer_count if type_param == 'influencer' else row.detractor_count
-            }
-            data.append(entry)
-
-
-        # Serialize the results using the schema
-        # data = nex_score_schema.dump(result)
-        
-        finalData = {}
-        dataset = []
-        if data:
-            distinct_regions = set(entry['region'] for entry in data)
-            organized_dataset = organize_data_by_region(distinct_regions, data)
-            # obj = {
-            #     "label": "national",
-            #     "children": organized_dataset
-            # }
-            # finalData = obj
-            dataset = organized_dataset
+        dataset, type_param = get_nex_score_data(type_param, region, view)
 
         return jsonify({
-            # 'data': finalData
             'data': dataset,
             'type' : type_param
         })
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @bp.route('/trends', methods=['GET'])
 @swag_from({
     'summary': 'Get trend data for influencer, detractor, and neutral percentages',
+    'produces': [
+        'application/json',
+        'application/vnd.nex-score.columns+json',
+        'application/vnd.apache.arrow.stream',
+        'application/vnd.apache.parquet'
+    ],
     'parameters': [
         {
             'name': 'region',
@@ -246,61 +192,14 @@ def get_trend():
     timeframe = request.args.get('timeframe', 'monthly')  # Default to 'monthly' if not provided
     
     try:
-        query = NexScore.query
-        
-        if region:
-            query = query.filter(NexScore.region == region)
-        if market:
-            query = query.filter(NexScore.market == market)
-        
-        records = query.order_by(NexScore.update_date.asc()).all()
-        
-        if not records:
-            return jsonify({'message': 'No data found'}), 404
-        
-        data = nex_score_schema.dump(records)
-        
-       # Convert the 'update_date' column to a datetime object
-        df = pd.DataFrame(data)
-
-        if df.empty:
-            return jsonify({'message': 'No data found'}), 404
-        
-        df['update_date'] = pd.to_datetime(df['update_date'])
-
-        if timeframe == 'monthly':
-            df['timeframe'] = df['update_date'].dt.to_period('M').dt.to_timestamp()
-        elif timeframe == 'quarterly':
-            df['timeframe'] = df['update_date'].dt.to_period('Q').dt.to_timestamp()
-        elif timeframe == 'yearly':
-            df['timeframe'] = df['update_date'].dt.to_period('Y').dt.to_timestamp()
-        else:
-            return jsonify({'error': 'Invalid period parameter'}), 400
-
-        # 2 decimal places
-        trend_data = df.groupby('timeframe').agg({
-            'influencer_perc': lambda x: round(x.mean(), 1),
-            'detractor_perc': lambda x: round(x.mean(), 1),
-            'neutral_perc': lambda x: round(x.mean(), 1)
-        }).reset_index()
-
-        # Sort the data by 'timeframe' in ascending order
-        trend_data = trend_data.sort_values(by='timeframe', ascending=True)
+        result = get_trend_data(region, market, timeframe)
+        status = result.pop('status')
 
-        if timeframe == 'monthly':
-            trend_data['label'] = trend_data['timeframe'].dt.strftime("%b'%y").str.upper()
-        elif timeframe == 'quarterly':
-            trend_data['label'] = trend_data['timeframe'].dt.to_period('Q').dt.strftime('Q%q\'%y')
-        elif timeframe == 'yearly':
-            trend_data['label'] = trend_data['timeframe'].dt.strftime('%Y')
+        columnar_format = negotiate_format(READ_MIMETYPES)
+        if status == 200 and columnar_format in COLUMNAR_MIMETYPES:
+            return records_response(result['data'], columnar_format)
 
-        # Convert the DataFrame to a dictionary
-        trend_dict = trend_data.to_dict(orient='records')
-
-        # Return the JSON response with the data
-        return jsonify({'data': trend_dict})
-
-        # return jsonify({'data': trend_data.to_dict(orient='records')})
+        return jsonify(result), status
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -314,7 +213,16 @@ def get_trend():
             'in': 'query',
             'type': 'string',
             'required': False,
-            'description': 'Region name to filter the data (optional)'
+            'description': 'Region name to filter the data (optional); its own latest update date is used'
+        },
+        {
+            'name': 'breakdown',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'enum': ['region'],
+            'description': 'region: return {"national": {...}, "regions": [{"region": ..., ...}]} instead, '
+                           'each region on its own latest update date (the region filter narrows "regions")'
         }
     ],
     'responses': {
@@ -359,38 +267,70 @@ def get_trend():
 })
 def get_perc():
     region = request.args.get('region')
+    breakdown = request.args.get('breakdown')
 
     try:
-        query = NexScore.query
+        result = get_perc_data(region, breakdown)
+        status = result.pop('status')
+        return jsonify(result), status
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    
 
-        if region:
-            query = query.filter(NexScore.region == region)
-        
-        latest_update_date = db.session.query(db.func.max(NexScore.update_date)).scalar()
-        if not latest_update_date:
-            return jsonify({'message': 'No data found'}), 404
+@bp.route('/dashboard', methods=['GET'])
+@swag_from({
+    'summary': 'Get everything the dashboard page loads in one response',
+    'parameters': [
+        {
+            'name': 'region',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Region filter for the type views, percentage and trends (optional)'
+        },
+        {
+            'name': 'market',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Market filter for the trends (optional)'
+        },
+        {
+            'name': 'timeframe',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Timeframe for the trends. Defaults to "monthly" if not provided',
+            'enum': ['monthly', 'quarterly', 'yearly']
+        }
+    ],
+    'responses': {
+        '200': {
+            'description': 'One key per dashboard section, each holding what the standalone endpoint returns: '
+                           'influencer, detractor and neutral (/nex-score/?type=...), percentage (/nex-score/percentage), '
+                           'trends (/nex-score/trends) and market_region (/market-region/). '
+                           'A section that found no data carries its own status.'
+        },
+        '400': {
+            'description': 'Invalid period parameter'
+        },
+        '500': {
+            'description': 'Internal server error'
+        }
+    }
+})
+def get_dashboard():
+    region = request.args.get('region')
+    market = request.args.get('market')
+    timeframe = request.args.get('timeframe', 'monthly')
 
-        latest_records = query.filter(NexScore.update_date == latest_update_date).all()
-        
-        if not latest_records:
-            return jsonify({'message': 'No data found'}), 404
-        
-        data = nex_score_schema.dump(latest_records)
-        
-        df = pd.DataFrame(data)
-        influencer_perc = round(df['influencer_perc'].mean(), 1)
-        detractor_perc = round(df['detractor_perc'].mean(), 1)
-        neutral_perc = round(df['neutral_perc'].mean(), 1)
-        
-        return jsonify({
-            'influencer_perc': influencer_perc,
-            'detractor_perc': detractor_perc,
-            'neutral_perc': neutral_perc,
-            'update_date': latest_update_date.strftime('%Y-%m-%d')
-        })
+    try:
+        result = get_dashboard_data(region, market, timeframe)
+        status = result.pop('status')
+        return jsonify(result), status
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    
+
 
 @bp.route('/score-comparison', methods=['GET'])
 @swag_from({
@@ -415,7 +355,7 @@ def get_perc():
             'in': 'query',
             'type': 'string',
             'required': True,
-            'description': 'Month in "MMM\'YY" format (e.g., APR\'24)'
+            'description': 'Month in "MMM\'YY" format (e.g., APR\'24); compared with the calendar month before it'
         }
     ],
     'responses': {
@@ -463,7 +403,7 @@ def get_perc():
         },
         '400': {
             # 'description': 'Missing required parameters'
-            'description': 'Region/Market/Month is required'
+            'description': 'Region/Market/Month is required, or the month is not MMM\'YY'
         },
         '404': {
             'description': 'No data found'
@@ -488,77 +428,80 @@ def get_score():
         return jsonify({'error': 'Month is required'}), 400
 
     try:
-        # Start building the query
-        query = NexScore.query
-
-        # Filter based on region and market
-        query = query.filter(NexScore.region == region, NexScore.market == market)
-
-        records = query.all()
-        
-        if not records:
-            return jsonify({'message': 'No data found'}), 404
-        
-        data = nex_score_schema.dump(records)
-        
-        # Convert the 'update_date' column to a datetime object and extract the month
-        df = pd.DataFrame(data)
-        df['update_date'] = pd.to_datetime(df['update_date'])
-        df['timeframe'] = df['update_date'].dt.to_period('M').dt.to_timestamp().dt.strftime("%b'%y").str.upper()
-
-        avg_data = df.groupby('timeframe').agg({
-            'influencer_perc': lambda x: round(x.mean(), 1),
-            'detractor_perc': lambda x: round(x.mean(), 1),
-            'neutral_perc': lambda x: round(x.mean(), 1),
-
-            'influencer_count': lambda x: round(x.mean()),
-            'detractor_count': lambda x: round(x.mean()),
-            'neutral_count': lambda x: round(x.mean())
-        }).reset_index()
-
-        # Find the index of the specified month
-        if month_query in avg_data['timeframe'].values:
-            month_index = avg_data.index[avg_data['timeframe'] == month_query].tolist()[0]
-
-            # Check if there is a next row
-            if month_index + 1 < len(avg_data):
-                next_month_index = month_index + 1
+        result = get_score_data(region, market, month_query)
+        status = result.pop('status')
+        return jsonify(result), status
 
-                # Get the data for the specified month and the next month
-                current_month = avg_data.iloc[month_index]
-                prev_month = avg_data.iloc[next_month_index]
-
-                # Calculate the differences
-                differences = {
-                    'timeframe': current_month['timeframe'],
-                    'influencer_perc_diff': round(current_month['influencer_perc'] - prev_month['influencer_perc'], 2),
-                    'detractor_perc_diff': round(current_month['detractor_perc'] - prev_month['detractor_perc'], 2),
-                    'neutral_perc_diff': round(current_month['neutral_perc'] - prev_month['neutral_perc'], 2)
-                }
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-                result = {
-                    'current_month': current_month.to_dict(),
-                    # 'prev_month': prev_month.to_dict(),
-                    'differences': differences
-                }
-            else:
-                # No next month data available
-                result = {
-                    'current_month': avg_data.iloc[month_index].to_dict(),
-                    # 'prev_month': None,
-                    'differences': None
-                }
-        else:
-            return jsonify({'message': 'Month not found in data'}), 404
 
-        return jsonify({'data': result})
+@bp.route('/score-comparison/batch', methods=['GET'])
+@swag_from({
+    'summary': 'Month-over-month score comparison for many markets and months in one call',
+    'parameters': [
+        {
+            'name': 'region',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Comma separated regions (e.g., CENTRAL,WEST); all regions if omitted'
+        },
+        {
+            'name': 'market',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Comma separated markets (e.g., ARKANSAS,CINCINNATI); all markets if omitted'
+        },
+        {
+            'name': 'start',
+            'in': 'query',
+            'type': 'string',
+            'required': True,
+            'description': 'First month in "MMM\'YY" format (e.g., JAN\'24)'
+        },
+        {
+            'name': 'end',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Last month in "MMM\'YY" format; defaults to start'
+        }
+    ],
+    'responses': {
+        '200': {
+            'description': 'One entry per region, market and month with data: region, market, and the '
+                           'current_month and differences objects of /nex-score/score-comparison. '
+                           'Differences are against the calendar month before, or null without data for it.'
+        },
+        '400': {
+            'description': 'Start is required, or a month is not MMM\'YY, or end is before start'
+        },
+        '404': {
+            'description': 'No data found'
+        },
+        '500': {
+            'description': 'Internal server error'
+        }
+    }
+})
+def get_score_batch():
+    start = request.args.get('start')
+    if not start:
+        return jsonify({'error': 'Start is required'}), 400
 
+    try:
+        result = get_score_batch_data(request.args.get('region'), request.args.get('market'), start, request.args.get('end'))
+        status = result.pop('status')
+        return jsonify(result), status
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    
+
+
 @bp.route('/excel', methods=['GET'])
 @swag_from({
-    'summary': 'Get json data for NexScore data that is converted into an excel',
+    'summary': 'Export NexScore rows as JSON, or stream them as a CSV or Excel (xlsx) file',
     'parameters': [
         {
             'name': 'region',
@@ -574,10 +517,45 @@ def get_score():
             'required': False,
             'description': 'Market name to filter the data (optional)'
         },
+        {
+            'name': 'format',
+            'in': 'query',
+            'type': 'string',
+            'enum': ['json', 'csv', 'xlsx', 'columns', 'arrow', 'parquet'],
+            'required': False,
+            'default': 'json',
+            'description': 'json returns the rows as a JSON list; csv, xlsx, arrow (IPC stream) and parquet stream a file download; '
+                           'columns returns {"columns": [...], "data": [[...]]}. When omitted the Accept header is used.'
+        },
+        {
+            'name': 'fields',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Comma separated NexScore columns to return (e.g., market,region,influencer_perc); all columns if omitted'
+        },
+        {
+            'name': 'limit',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Page size (json and columns only). Pages are ordered by update_date, id; the body becomes '
+                           '{"data": [...], "next_cursor": ...} (columns: "next_cursor" next to "columns"/"data")'
+        },
+        {
+            'name': 'cursor',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'next_cursor of the previous page; null there means it was the last page'
+        },
     ],
     'responses': {
         '200': {
             
+        },
+        '400': {
+            'description': 'Invalid format, fields, limit or cursor parameter, or limit/cursor with a streamed format'
         },
         '404': {
             'description': 'No data found'
@@ -590,22 +568,92 @@ def get_score():
 def get_excel():
     region = request.args.get('region')
     market = request.args.get('market')
+    export_format = negotiate_format(EXPORT_MIMETYPES)
+
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'Invalid format parameter'}), 400
 
     try:
-        query = NexScore.query
-    
-        if region:
-            query = query.filter(NexScore.region == region)
-        if market:
-            query = query.filter(NexScore.market == market)
-        
-        records = query.all()
+        names = parse_fields(request.args.get('fields'))
+        page = parse_page(request.args.get('limit'), request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if page is not None and export_format not in PAGED_FORMATS:
+        return jsonify({'error': 'limit and cursor need format=json or columns'}), 400
+
+    try:
+        if page is not None:
+            return export_page(export_format, names, region, market, *page)
+        if export_format != 'json':
+            return stream_export(export_format, region, market, names)
+
+        rows = db.session.connection().execute(export_statement(region, market, names)).all()
         
-        if not records:
+        if not rows:
             return jsonify({'message': 'No data found'}), 404
         
-        data = nex_score_schema.dump(records)
-        return jsonify(data)
+        return jsonify(json_records(rows, names))
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+
+@bp.route('/ingest', methods=['POST'])
+@swag_from({
+    'summary': 'Bulk load a nex_score batch',
+    'description': 'Upserts every row of a CSV or XLSX file on (market, region, update_date) in one transaction, '
+                   'then refreshes the latest/rollup tables. Requires "Authorization: Bearer <NEX_SCORE_INGEST_TOKEN>".',
+    'consumes': ['multipart/form-data', 'text/csv', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'],
+    'parameters': [
+        {
+            'name': 'file',
+            'in': 'formData',
+            'type': 'file',
+            'required': False,
+            'description': 'The batch as a multipart upload. The raw request body is used when absent.'
+        },
+        {
+            'name': 'format',
+            'in': 'query',
+            'type': 'string',
+            'enum': ['csv', 'xlsx'],
+            'required': False,
+            'description': 'Input format. Taken from the file name or Content-Type when omitted.'
+        },
+        {
+            'name': 'date_format',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'default': '%m/%d/%Y',
+            'description': 'strptime format of the update_date column.'
+        }
+    ],
+    'responses': {
+        '200': {
+            'description': 'Rows upserted and the update_dates they carried',
+            'examples': {
+                'application/json': {'rows': 1200, 'update_dates': ['2024-04-23']}
+            }
+        },
+        '400': {
+            'description': 'Invalid format or malformed file'
+        },
+        '401': {
+            'description': 'Unauthorized'
+        },
+        '403': {
+            'description': 'Ingestion is disabled'
+        },
+        '500': {
+            'description': 'Internal server error'
+        }
+    }
+})
+def post_ingest():
+    try:
+        result = ingest_upload()
+        status = result.pop('status')
+        return jsonify(result), status
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
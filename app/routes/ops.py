@@ -0,0 +1,40 @@
+from flask import Blueprint, current_app, jsonify
+from ..engine import pool_stats
+from ..response_cache import cache_stats
+
+
+bp = Blueprint('ops', __name__, url_prefix='/ops')
+
+
+@bp.before_request
+def require_ops_endpoints():
+    if not current_app.config.get('NEX_SCORE_OPS_ENDPOINTS'):
+        return jsonify({'message': 'Ops endpoints are disabled'}), 404
+
+
+@bp.route('/cache', methods=['GET'])
+def get_cache_stats():
+    """
+    Response cache counters for this process
+    ---
+    responses:
+      200:
+        description: Backend name, hit/miss/eviction/expiration counters and current size
+      404:
+        description: Ops endpoints are off (NEX_SCORE_OPS_ENDPOINTS)
+    """
+    return jsonify(cache_stats())
+
+
+@bp.route('/pool', methods=['GET'])
+def get_pool_stats():
+    """
+    Connection pool state and checkout timings for this process
+    ---
+    responses:
+      200:
+        description: Profile, pool size/occupancy and checkout, wait and overflow counters
+      404:
+        description: Ops endpoints are off (NEX_SCORE_OPS_ENDPOINTS)
+    """
+    return jsonify(pool_stats())
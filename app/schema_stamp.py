@@ -0,0 +1,59 @@
+"""Skip db.create_all() on starts where the schema is known to be in place.
+
+create_all() asks the database about every table, which is several round
+trips to Azure MySQL on each cold start. With NEX_SCORE_CREATE_TABLES set to
+'stamp', a fingerprint of the model metadata is written to a local stamp file
+after a successful create_all(), and later starts against the same database
+skip the call while the fingerprint still matches.
+"""
+import hashlib
+import os
+
+from .models.nex_score import db
+
+
+def schema_version(metadata=None):
+    metadata = metadata or db.metadata
+    parts = []
+    for table in sorted(metadata.tables.values(), key=lambda table: table.name):
+        parts.append(table.name)
+        parts.extend(f'{column.name}:{column.type!r}:{column.nullable}:{column.primary_key}' for column in table.columns)
+        parts.extend(sorted(index.name or '' for index in table.indexes))
+        parts.extend(sorted(constraint.name or '' for constraint in table.constraints))
+    return hashlib.sha1('\n'.join(parts).encode()).hexdigest()
+
+
+def _stamp_path(app):
+    # The URL carries credentials, so only its hash goes into the file name
+    database = hashlib.sha1(str(app.config['SQLALCHEMY_DATABASE_URI']).encode()).hexdigest()[:16]
+    return os.path.join(app.config['NEX_SCORE_SCHEMA_STAMP_DIR'], f'nex_score_schema_{database}.stamp')
+
+
+def ensure_schema(app):
+    """Run db.create_all() according to NEX_SCORE_CREATE_TABLES.
+
+    'always' (default) creates missing tables on every start, 'stamp' only
+    when the stamp file is missing or out of date, 'never' leaves the schema
+    to migrations. Needs an app context.
+    """
+    mode = app.config.get('NEX_SCORE_CREATE_TABLES', 'always')
+    if mode == 'never':
+        return False
+    if mode != 'stamp':
+        db.create_all()
+        return True
+
+    # In-memory SQLite starts empty every time, so a stamp would lie
+    path = None if app.config['SQLALCHEMY_DATABASE_URI'] in ('sqlite://', 'sqlite:///:memory:') else _stamp_path(app)
+    version = schema_version()
+    if path and os.path.exists(path):
+        with open(path) as stamp:
+            if stamp.read().strip() == version:
+                return False
+
+    db.create_all()
+    if path:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as stamp:
+            stamp.write(version)
+    return True
@@ -0,0 +1,127 @@
+import threading
+import time
+
+from flask import current_app
+
+from .frames import load_frame
+from .models.nex_score import NexScore
+from .versioning import fetch_data_version
+
+COUNT_COLUMNS = ['detractor_count', 'neutral_count', 'influencer_count', 'total']
+PERC_COLUMNS = ['detractor_perc', 'neutral_perc', 'influencer_perc']
+SNAPSHOT_COLUMNS = ['id', 'market', 'region'] + COUNT_COLUMNS + PERC_COLUMNS + ['update_date']
+
+
+class NexScoreSnapshot:
+    """Read-only, column-oriented copy of the whole nex_score table.
+
+    market/region are dictionary encoded (pandas categoricals), counts are
+    int32, percentages float32 and update_date datetime64, so the full history
+    stays small enough to keep resident and answer reads without MySQL.
+    """
+
+    def __init__(self, frame, version):
+        self.frame = frame
+        self.version = version
+        self.latest_update = frame['update_date'].max() if not frame.empty else None
+
+        # Rows carrying the newest update_date of their market/region, the
+        # same set the max(update_date) self-join returns.
+        latest_per_group = frame.groupby(['market', 'region'], observed=True)['update_date'].transform('max')
+        self.latest = frame[frame['update_date'] == latest_per_group]
+
+    @classmethod
+    def load(cls, version):
+        import numpy as np
+        import pandas as pd # type: ignore
+
+        frame = load_frame(
+            NexScore.query.order_by(NexScore.id),
+            [getattr(NexScore, name) for name in SNAPSHOT_COLUMNS],
+            dtypes={**dict.fromkeys(COUNT_COLUMNS, np.int32), **dict.fromkeys(PERC_COLUMNS, np.float32)}
+        )
+        frame['market'] = pd.Categorical(frame['market'])
+        frame['region'] = pd.Categorical(frame['region'])
+        return cls(frame, version)
+
+    def rows(self, region=None, market=None):
+        return _filter(self.frame, region, market)
+
+    def latest_rows(self, region=None):
+        return _filter(self.latest, region)
+
+    def market_regions(self):
+        pairs = self.frame[['market', 'region']].drop_duplicates()
+        return list(zip(pairs['market'].astype(str), pairs['region'].astype(str)))
+
+
+def _filter(frame, region=None, market=None):
+    import numpy as np
+
+    mask = np.ones(len(frame), dtype=bool)
+    if region:
+        mask &= (frame['region'] == region).to_numpy()
+    if market:
+        mask &= (frame['market'] == market).to_numpy()
+    return frame[mask]
+
+
+def as_float64(values):
+    """Widen float32 snapshot values without exposing float32 noise.
+
+    float32(62.84) widened directly is 62.84000015258789; going through the
+    shortest decimal representation gives back 62.84.
+    """
+    import numpy as np
+
+    values = np.asarray(values)
+    if values.dtype == np.float32:
+        return values.astype(str).astype(np.float64)
+    return values.astype(np.float64)
+
+
+class _SnapshotState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.checked_at = 0.0
+
+
+def init_snapshot(app):
+    app.config.setdefault('NEX_SCORE_BACKEND', 'database')
+    app.config.setdefault('NEX_SCORE_SNAPSHOT_CHECK_INTERVAL', 30)
+    app.extensions['nex_score_snapshot'] = _SnapshotState()
+
+
+def snapshot_enabled():
+    return current_app.config.get('NEX_SCORE_BACKEND') == 'snapshot'
+
+
+def get_snapshot():
+    """Return the current snapshot, reloading it only when the data changed.
+
+    The version query runs at most once per NEX_SCORE_SNAPSHOT_CHECK_INTERVAL
+    seconds; between checks reads never touch the database.
+    """
+    state = current_app.extensions['nex_score_snapshot']
+    interval = current_app.config['NEX_SCORE_SNAPSHOT_CHECK_INTERVAL']
+
+    snapshot = state.snapshot
+    if snapshot is not None and time.monotonic() - state.checked_at < interval:
+        return snapshot
+
+    with state.lock:
+        if state.snapshot is not None and time.monotonic() - state.checked_at < interval:
+            return state.snapshot
+
+        version = fetch_data_version()
+        if state.snapshot is None or state.snapshot.version != version:
+            state.snapshot = NexScoreSnapshot.load(version)
+        state.checked_at = time.monotonic()
+        return state.snapshot
+
+
+def invalidate_snapshot(app=None):
+    state = (app or current_app).extensions.get('nex_score_snapshot')
+    if state is not None:
+        state.checked_at = 0.0
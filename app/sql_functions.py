@@ -0,0 +1,128 @@
+"""Dialect-aware SQL expressions that SQLAlchemy does not provide portably.
+
+The app talks to MySQL in production (mysql-connector / PyMySQL), can be
+pointed at PostgreSQL (psycopg2 is in requirements.txt) and runs on SQLite
+locally, so each construct below is compiled separately for those three.
+"""
+from sqlalchemy import func, cast, Integer
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import String
+
+
+class _PeriodStart(FunctionElement):
+    """Start of the period containing a date, rendered as 'YYYY-MM-DD'."""
+    type = String()
+    inherit_cache = True
+
+
+class month_start(_PeriodStart):
+    name = 'month_start'
+    inherit_cache = True
+
+
+class quarter_start(_PeriodStart):
+    name = 'quarter_start'
+    inherit_cache = True
+
+
+class year_start(_PeriodStart):
+    name = 'year_start'
+    inherit_cache = True
+
+
+PERIOD_START = {
+    'monthly': month_start,
+    'quarterly': quarter_start,
+    'yearly': year_start
+}
+
+
+def period_start(column, timeframe):
+    return PERIOD_START[timeframe](column)
+
+
+def _argument(element):
+    return list(element.clauses)[0]
+
+
+@compiles(_PeriodStart)
+def _compile_default(element, compiler, **kw):
+    raise CompileError(f'{element.name} is not supported on the {compiler.dialect.name} dialect')
+
+
+@compiles(month_start, 'mysql')
+def _month_start_mysql(element, compiler, **kw):
+    return compiler.process(func.date_format(_argument(element), '%Y-%m-01'), **kw)
+
+
+@compiles(quarter_start, 'mysql')
+def _quarter_start_mysql(element, compiler, **kw):
+    column = _argument(element)
+    first_month = func.lpad(func.quarter(column) * 3 - 2, 2, '0')
+    return compiler.process(func.concat(func.year(column), '-', first_month, '-01'), **kw)
+
+
+@compiles(year_start, 'mysql')
+def _year_start_mysql(element, compiler, **kw):
+    return compiler.process(func.date_format(_argument(element), '%Y-01-01'), **kw)
+
+
+def _date_trunc_postgresql(unit):
+    def compile_(element, compiler, **kw):
+        truncated = func.date_trunc(unit, _argument(element))
+        return compiler.process(func.to_char(truncated, 'YYYY-MM-DD'), **kw)
+    return compile_
+
+
+compiles(month_start, 'postgresql')(_date_trunc_postgresql('month'))
+compiles(quarter_start, 'postgresql')(_date_trunc_postgresql('quarter'))
+compiles(year_start, 'postgresql')(_date_trunc_postgresql('year'))
+
+
+@compiles(month_start, 'sqlite')
+def _month_start_sqlite(element, compiler, **kw):
+    return compiler.process(func.strftime('%Y-%m-01', _argument(element)), **kw)
+
+
+@compiles(quarter_start, 'sqlite')
+def _quarter_start_sqlite(element, compiler, **kw):
+    column = _argument(element)
+    month = cast(func.strftime('%m', column), Integer)
+    first_month = func.printf('%02d', ((month - 1) // 3) * 3 + 1, type_=String)
+    return compiler.process(func.strftime('%Y', column, type_=String) + '-' + first_month + '-01', **kw)
+
+
+@compiles(year_start, 'sqlite')
+def _year_start_sqlite(element, compiler, **kw):
+    return compiler.process(func.strftime('%Y-01-01', _argument(element)), **kw)
+
+
+class rollup(FunctionElement):
+    """GROUP BY argument adding subtotal rows for each prefix of the columns.
+
+    PostgreSQL renders ROLLUP(a, b) and MySQL a, b WITH ROLLUP; SQLite has
+    neither, so callers check ROLLUP_DIALECTS and emulate it with UNION ALL.
+    The rolled-up columns come back as NULL in the subtotal rows.
+    """
+    name = 'rollup'
+    inherit_cache = True
+
+
+ROLLUP_DIALECTS = {'mysql', 'postgresql'}
+
+
+@compiles(rollup)
+def _compile_rollup_default(element, compiler, **kw):
+    raise CompileError(f'rollup is not supported on the {compiler.dialect.name} dialect')
+
+
+@compiles(rollup, 'postgresql')
+def _rollup_postgresql(element, compiler, **kw):
+    return 'ROLLUP(%s)' % compiler.process(element.clauses, **kw)
+
+
+@compiles(rollup, 'mysql')
+def _rollup_mysql(element, compiler, **kw):
+    return '%s WITH ROLLUP' % compiler.process(element.clauses, **kw)
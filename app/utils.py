@@ -1,12 +1,17 @@
 def organize_data_by_region(regions, data):
+    # One pass over data; regions keep the order they are given in
     organized_data = []
+    children = {}
     for region in regions:
         region_data = {
             'label': region,
             'children': []
         }
-        for entry in data:
-            if entry['region'] == region:
-                region_data['children'].append(entry)
+        children[region] = region_data['children']
         organized_data.append(region_data)
+
+    for entry in data:
+        region_children = children.get(entry['region'])
+        if region_children is not None:
+            region_children.append(entry)
     return organized_data
@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, time as day_start, timezone
+
+from flask import current_app
+from sqlalchemy import select, func, insert, update
+from .models.nex_score import NexScore, db
+from .models.nex_score_version import NexScoreVersion
+
+
+class DataVersion(namedtuple('DataVersion', ['latest_update', 'row_count', 'ingest_count', 'loaded_at'],
+                             defaults=(0, None))):
+    """Cheap fingerprint of the nex_score table.
+
+    A new update_date batch moves the newest update_date and the row count;
+    a load that only corrects dates already present moves neither, so the
+    ingest counter of nex_score_version (bumped by every app.ingest load)
+    is part of it too.
+    """
+    __slots__ = ()
+
+    @property
+    def token(self):
+        latest = self.latest_update.strftime('%Y%m%d') if self.latest_update else '0'
+        return f'{latest}-{self.row_count}-{self.ingest_count or 0}'
+
+    @property
+    def last_modified(self):
+        candidates = []
+        if self.latest_update:
+            candidates.append(datetime.combine(self.latest_update, day_start.min, tzinfo=timezone.utc))
+        if self.loaded_at:
+            # HTTP dates have whole seconds; drop the rest so an echoed date still matches
+            candidates.append(self.loaded_at.replace(tzinfo=timezone.utc, microsecond=0))
+        return max(candidates) if candidates else None
+
+
+def data_version_statement():
+    version = NexScoreVersion.__table__
+    return select(
+        func.max(NexScore.update_date),
+        func.count(NexScore.id),
+        select(version.c.ingest_count).where(version.c.id == 1).scalar_subquery(),
+        select(version.c.loaded_at).where(version.c.id == 1).scalar_subquery()
+    )
+
+
+def fetch_data_version():
+    return DataVersion(*db.session.execute(data_version_statement()).one())
+
+
+def bump_data_version(connection):
+    """Count a load in nex_score_version; runs in the loader's transaction."""
+    version = NexScoreVersion.__table__
+    loaded_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    result = connection.execute(
+        update(version).where(version.c.id == 1)
+        .values(ingest_count=version.c.ingest_count + 1, loaded_at=loaded_at)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(version).values(id=1, ingest_count=1, loaded_at=loaded_at))
+
+
+class _VersionState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked_at = 0.0
+
+
+def init_versioning(app):
+    app.config.setdefault('NEX_SCORE_VERSION_CHECK_INTERVAL', 5)
+    app.extensions['nex_score_data_version'] = _VersionState()
+
+
+def current_data_version():
+    """fetch_data_version(), re-queried at most once per check interval."""
+    state = current_app.extensions['nex_score_data_version']
+    interval = current_app.config['NEX_SCORE_VERSION_CHECK_INTERVAL']
+
+    if state.version is not None and time.monotonic() - state.checked_at < interval:
+        return state.version
+
+    with state.lock:
+        if state.version is None or time.monotonic() - state.checked_at >= interval:
+            state.version = fetch_data_version()
+            state.checked_at = time.monotonic()
+        return state.version
+
+
+def cached_data_version(app):
+    """The remembered version while it is within the check interval, else None."""
+    state = app.extensions['nex_score_data_version']
+    if state.version is not None and time.monotonic() - state.checked_at < app.config['NEX_SCORE_VERSION_CHECK_INTERVAL']:
+        return state.version
+    return None
+
+
+def remember_data_version(app, version):
+    # For callers that fetch the version themselves (the ASGI mode)
+    state = app.extensions['nex_score_data_version']
+    with state.lock:
+        state.version = version
+        state.checked_at = time.monotonic()
+
+
+def invalidate_data_version(app=None):
+    state = (app or current_app).extensions.get('nex_score_data_version')
+    if state is not None:
+        state.checked_at = 0.0
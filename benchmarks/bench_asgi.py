@@ -0,0 +1,188 @@
+"""Load test waitress against the ASGI mode with a slow database.
+
+    python -m benchmarks.bench_asgi --rows 20000 --latency-ms 100 --concurrency 4 16 64
+
+Both servers run as subprocesses over the same seeded SQLite file with the
+response cache off, and every statement is delayed by --latency-ms to stand
+in for the round trip to Azure MySQL: time.sleep() on the waitress side (the
+request thread is held, as with a blocking driver) and asyncio.sleep() in the
+driver's greenlet on the ASGI side (the event loop keeps serving). A closed
+loop of keep-alive clients cycles through the hot URLs; throughput with
+waitress stops at its thread count, the ASGI mode keeps scaling until the
+async pool or the CPU is the limit.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from .common import bench_config, free_port, seed_database, temp_database_path, wait_for_port
+
+HOT_URLS = [
+    '/nex-score/?region=WEST',
+    '/nex-score/trends?region=CENTRAL&timeframe=quarterly',
+    '/nex-score/percentage?region=SOUTH',
+    '/market-region/'
+]
+
+
+def _server_config():
+    return bench_config(
+        os.environ['NEX_SCORE_BENCH_DB'],
+        NEX_SCORE_RESPONSE_CACHE='none',
+        NEX_SCORE_LATEST_TABLE=False,
+        NEX_SCORE_ASYNC_POOL_SIZE=int(os.environ.get('NEX_SCORE_ASYNC_POOL_SIZE', 20))
+    )
+
+
+def _latency():
+    return float(os.environ.get('NEX_SCORE_BENCH_LATENCY_MS', 0)) / 1000
+
+
+def wsgi_app():
+    """waitress --call target: the Flask app, sleeping in every statement."""
+    from sqlalchemy import event
+
+    from app import create_app, db
+
+    app = create_app(_server_config())
+    latency = _latency()
+    with app.app_context():
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def slow_statement(*args):
+            time.sleep(latency)
+    return app
+
+
+def asgi_app():
+    """uvicorn --factory target: the ASGI mode, awaiting in every statement."""
+    from sqlalchemy import event
+    from sqlalchemy.util import await_only
+
+    from app import create_app
+    from app.asgi import create_asgi_app
+
+    asgi = create_asgi_app(create_app(_server_config()))
+    asgi.reads.start()
+    latency = _latency()
+
+    @event.listens_for(asgi.reads.engine.sync_engine, 'before_cursor_execute')
+    def slow_statement(*args):
+        await_only(asyncio.sleep(latency))
+    return asgi
+
+
+def server_command(server, port, threads):
+    if server == 'waitress':
+        return [sys.executable, '-m', 'waitress', f'--threads={threads}', '--host=127.0.0.1', f'--port={port}',
+                '--call', 'benchmarks.bench_asgi:wsgi_app']
+    return [sys.executable, '-m', 'uvicorn', '--factory', 'benchmarks.bench_asgi:asgi_app',
+            '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning']
+
+
+async def get(reader, writer, url):
+    writer.write(f'GET {url} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n'.encode('latin-1'))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(port, offset, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    index = offset
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            status = await get(reader, writer, HOT_URLS[index % len(HOT_URLS)])
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors.append(status)
+            index += 1
+    finally:
+        writer.close()
+
+
+async def load(port, concurrency, duration):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(client(port, offset, deadline, latencies, errors) for offset in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(quantiles[49] * 1000, 1),
+        'p99_ms': round(quantiles[98] * 1000, 1)
+    }
+
+
+def run_server(server, path, args):
+    port = free_port()
+    env = {
+        **os.environ,
+        'NEX_SCORE_BENCH_DB': path,
+        'NEX_SCORE_BENCH_LATENCY_MS': str(args.latency_ms),
+        # Let the async pool cover every client; the waitress pool is sized by its threads
+        'NEX_SCORE_ASYNC_POOL_SIZE': str(max(args.concurrency))
+    }
+    process = subprocess.Popen(server_command(server, port, args.threads), env=env)
+    try:
+        wait_for_port(port)
+        asyncio.run(load(port, 1, 0.5))
+        return {str(concurrency): asyncio.run(load(port, concurrency, args.duration))
+                for concurrency in args.concurrency}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--latency-ms', type=float, default=100)
+    parser.add_argument('--threads', type=int, default=4, help='waitress threads')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[4, 16, 64])
+    parser.add_argument('--duration', type=float, default=5, help='seconds per concurrency level')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    path = temp_database_path()
+    results = {'rows': args.rows, 'latency_ms': args.latency_ms, 'threads': args.threads}
+    try:
+        from app import create_app
+
+        seed_database(create_app(bench_config(path)), args.rows)
+        for server in ('waitress', 'asgi'):
+            results[server] = run_server(server, path, args)
+    finally:
+        os.remove(path)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.rows} rows, {args.latency_ms} ms per statement, waitress --threads={args.threads}")
+    print(f"{'clients':>8} {'server':>9} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for concurrency in map(str, args.concurrency):
+        for server in ('waitress', 'asgi'):
+            row = results[server][concurrency]
+            print(f"{concurrency:>8} {server:>9} {row['rps']:9.1f} {row['p50_ms']:8.1f} {row['p99_ms']:8.1f} {row['errors']:7}")
+
+
+if __name__ == '__main__':
+    main()
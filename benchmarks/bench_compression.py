@@ -0,0 +1,89 @@
+"""Bytes saved and CPU spent compressing the read responses, per endpoint and encoding.
+
+    python -m benchmarks.bench_compression --markets-per-region 500 --months 3
+
+Each endpoint is fetched once uncompressed from a seeded SQLite file; its
+body is then compressed with every available encoding through
+app.compression.compress_body, timing the CPU per response. 'hit' is the
+time to serve the same GET again from the response cache with
+Accept-Encoding: gzip, where the stored body is already compressed.
+"""
+import argparse
+import json
+import os
+import time
+
+from app import create_app
+from app.compression import compress_body
+from .common import REGIONS, bench_config, seed_database, temp_database_path
+
+ENDPOINTS = [
+    '/nex-score/?type=all&view=tree',
+    '/nex-score/?type=all',
+    '/nex-score/dashboard',
+    '/nex-score/excel',
+    '/nex-score/excel?format=csv'
+]
+
+
+def cpu_seconds(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.process_time()
+        function()
+        timings.append(time.process_time() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--markets-per-region', type=int, default=500)
+    parser.add_argument('--months', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    rows = args.markets_per_region * len(REGIONS) * args.months
+    path = temp_database_path()
+    results = {'rows': rows, 'endpoints': {}}
+    try:
+        app = create_app(bench_config(path, NEX_SCORE_LATEST_TABLE=False))
+        seed_database(app, rows, markets_per_region=args.markets_per_region)
+        encodings = app.extensions['nex_score_compression']
+        client = app.test_client()
+        results['level'] = app.config['NEX_SCORE_COMPRESSION_LEVEL']
+        results['brotli_quality'] = app.config['NEX_SCORE_BROTLI_QUALITY']
+
+        for url in ENDPOINTS:
+            body = client.get(url).data
+            entry = {'identity_bytes': len(body)}
+            for encoding in encodings:
+                compressed, _ = compress_body(app, body, encoding)
+                seconds = cpu_seconds(lambda: compress_body(app, body, encoding), args.repeat)
+                entry[encoding] = {
+                    'bytes': len(compressed),
+                    'saved': round(1 - len(compressed) / len(body), 3),
+                    'cpu_ms': round(seconds * 1000, 2)
+                }
+            if not url.endswith('csv'):
+                client.get(url, headers={'Accept-Encoding': 'gzip'})
+                seconds = cpu_seconds(lambda: client.get(url, headers={'Accept-Encoding': 'gzip'}), args.repeat)
+                entry['gzip_hit_cpu_ms'] = round(seconds * 1000, 2)
+            results['endpoints'][url] = entry
+    finally:
+        os.remove(path)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{rows} rows, zlib level {results['level']}, brotli quality {results['brotli_quality']}")
+    for url, entry in results['endpoints'].items():
+        hit = f"  cached gzip hit {entry['gzip_hit_cpu_ms']:.2f} ms" if 'gzip_hit_cpu_ms' in entry else ''
+        print(f"{url}  {entry['identity_bytes'] / 1024:.0f} KiB{hit}")
+        for encoding in encodings:
+            stats = entry[encoding]
+            print(f"  {encoding:8} {stats['bytes'] / 1024:9.0f} KiB  saved {stats['saved']:6.1%}  cpu {stats['cpu_ms']:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""Latency percentiles, throughput and peak memory for every /nex-score and /market-region route.
+
+    python -m benchmarks.bench_endpoints --markets-per-region 100 --years 2 --output run.json
+    python -m benchmarks.bench_endpoints --database nex_score_bench.sqlite --output new.json --compare run.json
+
+Without --database a throwaway dataset is generated (see generate_dataset).
+Each case gets --warmup untimed requests, then --requests timed ones through
+the Flask test client, one at a time: p50/p95/p99 are over those requests
+and rps is requests over their summed time. peak_bytes is the tracemalloc
+peak of one more request (Python allocations only). The response cache is
+off unless --cache is given, so the timings are of the query path. The
+ingest case re-posts the newest batch of one region, an idempotent upsert.
+
+The run fails when a route in either blueprint has no case, so new routes
+have to be added here. --compare reads an earlier --output file and exits 1
+when a case's p95 grew by more than --tolerance.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import func, select
+
+from app import create_app, db
+from app.models.nex_score import NexScore
+from .common import bench_config, build_dataset, region_names, temp_database_path
+
+BLUEPRINTS = ('nex_score', 'market_region')
+INGEST_TOKEN = 'bench'
+INGEST_COLUMNS = [
+    'market', 'region', 'detractor_count', 'neutral_count', 'influencer_count', 'total',
+    'detractor_perc', 'neutral_perc', 'influencer_perc'
+]
+
+
+def read_cases(region, market, month, start):
+    """(name, path) of the GET cases; one or more per route."""
+    return [
+        ('nex_score', '/nex-score/?type=influencer'),
+        ('nex_score_region', f'/nex-score/?type=detractor&region={region}'),
+        ('nex_score_tree', '/nex-score/?type=all&view=tree'),
+        ('trends_market_monthly', f'/nex-score/trends?region={region}&market={market}&timeframe=monthly'),
+        ('trends_national_yearly', '/nex-score/trends?timeframe=yearly'),
+        ('percentage', f'/nex-score/percentage?region={region}'),
+        ('percentage_breakdown', '/nex-score/percentage?breakdown=region'),
+        ('dashboard', f'/nex-score/dashboard?region={region}'),
+        ('score_comparison', f'/nex-score/score-comparison?region={region}&market={market}&month={month}'),
+        ('score_comparison_batch', f'/nex-score/score-comparison/batch?region={region}&start={start}&end={month}'),
+        ('excel_page', '/nex-score/excel?limit=1000'),
+        ('excel_csv', f'/nex-score/excel?format=csv&region={region}'),
+        ('excel_xlsx', f'/nex-score/excel?format=xlsx&region={region}&market={market}'),
+        ('market_region', '/market-region/')
+    ]
+
+
+def ingest_batch(app, region):
+    """The newest batch of `region` as CSV, for re-posting to /nex-score/ingest."""
+    with app.app_context():
+        table = NexScore.__table__
+        newest = select(func.max(table.c.update_date)).where(table.c.region == region).scalar_subquery()
+        rows = db.session.execute(
+            select(*[table.c[name] for name in INGEST_COLUMNS], table.c.update_date)
+            .where(table.c.region == region, table.c.update_date == newest)
+        ).all()
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(INGEST_COLUMNS + ['update_date'])
+    for row in rows:
+        writer.writerow(list(row[:-1]) + [row[-1].strftime('%m/%d/%Y')])
+    return output.getvalue().encode(), len(rows)
+
+
+def route_endpoints(app):
+    return {rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint.split('.')[0] in BLUEPRINTS}
+
+
+def covered_endpoints(app, cases):
+    adapter = app.url_map.bind('localhost')
+    return {adapter.match(case['path'].split('?')[0], method=case['method'])[0] for case in cases}
+
+
+def percentiles(latencies):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {'p50_ms': round(p50, 3), 'p95_ms': round(p95, 3), 'p99_ms': round(p99, 3)}
+
+
+def run_case(client, case, requests, warmup):
+    def call():
+        if case['method'] == 'POST':
+            response = client.post(case['path'], data=case['body'], headers=case['headers'])
+        else:
+            response = client.get(case['path'])
+        body = response.data
+        if response.status_code != 200:
+            raise SystemExit(f"{case['name']}: {case['method']} {case['path']} returned {response.status_code}: {body[:200]!r}")
+        return body
+
+    for _ in range(warmup):
+        call()
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        body = call()
+        latencies.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'method': case['method'],
+        'path': case['path'],
+        'requests': requests,
+        **percentiles(latencies),
+        'mean_ms': round(float(np.mean(latencies)) * 1000, 3),
+        'rps': round(requests / sum(latencies), 1),
+        'peak_bytes': peak,
+        'response_bytes': len(body)
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Cases whose p95 grew by more than tolerance over the baseline run."""
+    regressions = []
+    for name, entry in results['endpoints'].items():
+        before = baseline['endpoints'].get(name)
+        if before is None or not before['p95_ms']:
+            continue
+        ratio = entry['p95_ms'] / before['p95_ms']
+        entry['baseline_p95_ms'] = before['p95_ms']
+        entry['p95_ratio'] = round(ratio, 3)
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database', help='existing SQLite file from generate_dataset; a temporary one is generated otherwise')
+    parser.add_argument('--markets-per-region', type=int, default=100)
+    parser.add_argument('--regions', type=int, default=4)
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--requests', type=int, default=30, help='timed requests per case')
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--cache', choices=['none', 'memory'], default='none', help='NEX_SCORE_RESPONSE_CACHE for the run')
+    parser.add_argument('--only', nargs='*', default=None, help='run only the cases with these names')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='earlier --output file to check for p95 regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 growth over --compare (0.2 = 20%%)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    path = os.path.abspath(args.database) if args.database else temp_database_path()
+    results = {}
+    try:
+        app = create_app(bench_config(path, NEX_SCORE_RESPONSE_CACHE=args.cache, NEX_SCORE_INGEST_TOKEN=INGEST_TOKEN))
+        if args.database:
+            if not os.path.exists(args.database):
+                parser.error(f'{args.database} does not exist; create it with benchmarks.generate_dataset')
+            with app.app_context():
+                rows = db.session.execute(select(func.count()).select_from(NexScore)).scalar()
+                region = db.session.execute(select(func.min(NexScore.region))).scalar()
+                newest = db.session.execute(select(func.max(NexScore.update_date))).scalar()
+            dataset = {'database': args.database, 'rows': rows}
+        else:
+            rows = build_dataset(app, args.markets_per_region, args.regions, args.years)
+            region = region_names(args.regions)[0]
+            newest = datetime(2024, 12, 1)
+            dataset = {'rows': rows, 'markets_per_region': args.markets_per_region,
+                       'regions': args.regions, 'years': args.years}
+
+        month_index = newest.year * 12 + newest.month - 1
+        start = datetime((month_index - 2) // 12, (month_index - 2) % 12 + 1, 1)
+        cases = [
+            {'name': name, 'method': 'GET', 'path': case_path}
+            for name, case_path in read_cases(region, f'{region}_MARKET_000', newest.strftime("%b'%y").upper(), start.strftime("%b'%y").upper())
+        ]
+        body, batch_rows = ingest_batch(app, region)
+        cases.append({
+            'name': 'ingest', 'method': 'POST', 'path': '/nex-score/ingest', 'body': body,
+            'headers': {'Authorization': f'Bearer {INGEST_TOKEN}', 'Content-Type': 'text/csv'}
+        })
+
+        missing = route_endpoints(app) - covered_endpoints(app, cases)
+        if missing:
+            raise SystemExit(f'No benchmark case for: {", ".join(sorted(missing))}')
+
+        results['meta'] = {
+            'started': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'dataset': dataset,
+            'ingest_rows': batch_rows,
+            'cache': args.cache,
+            'requests': args.requests
+        }
+        results['endpoints'] = {}
+        client = app.test_client()
+        for case in cases:
+            if args.only is None or case['name'] in args.only:
+                results['endpoints'][case['name']] = run_case(client, case, args.requests, args.warmup)
+    finally:
+        if not args.database:
+            os.remove(path)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as baseline:
+            regressions = compare(results, json.load(baseline), args.tolerance)
+        results['regressions'] = regressions
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{results['meta']['dataset']['rows']} rows, {args.requests} requests per case, cache {args.cache}")
+        print(f"  {'case':24} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'peak MiB':>9} {'body KiB':>9}")
+        for name, entry in results['endpoints'].items():
+            change = f"  p95 x{entry['p95_ratio']}" if 'p95_ratio' in entry else ''
+            print(f"  {name:24} {entry['p50_ms']:9.2f} {entry['p95_ms']:9.2f} {entry['p99_ms']:9.2f} {entry['rps']:8.1f}"
+                  f" {entry['peak_bytes'] / 2**20:9.1f} {entry['response_bytes'] / 1024:9.1f}{change}")
+        if args.compare:
+            print(f"  regressions over {args.tolerance:.0%}: {', '.join(regressions) or 'none'}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
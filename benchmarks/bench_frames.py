@@ -0,0 +1,59 @@
+"""Compare the ORM + marshmallow DataFrame path with app.frames.load_frame.
+
+    python -m benchmarks.bench_frames --rows 1000000
+"""
+import argparse
+import json
+import os
+
+import pandas as pd # type: ignore
+
+from app.controller.nex_score_controller import SCORE_COLUMNS
+from app.frames import load_frame
+from app.models.nex_score import NexScore
+from app.schemas import nex_score_schema
+from .common import create_seeded_bench_app, measure
+
+
+def legacy_frame():
+    records = NexScore.query.order_by(NexScore.update_date.asc()).all()
+    df = pd.DataFrame(nex_score_schema.dump(records))
+    df['update_date'] = pd.to_datetime(df['update_date'])
+    return df
+
+
+def fast_frame():
+    return load_frame(NexScore.query.order_by(NexScore.update_date.asc()), SCORE_COLUMNS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    app, path = create_seeded_bench_app(args.rows)
+    try:
+        results = {}
+        with app.app_context():
+            for name, loader in (('orm_marshmallow', legacy_frame), ('load_frame', fast_frame)):
+                seconds, peak = measure(loader, repeat=args.repeat)
+                results[name] = {'seconds': round(seconds, 4), 'peak_bytes': peak}
+    finally:
+        os.remove(path)
+
+    results['speedup'] = round(results['orm_marshmallow']['seconds'] / results['load_frame']['seconds'], 1)
+    results['allocation_ratio'] = round(results['orm_marshmallow']['peak_bytes'] / results['load_frame']['peak_bytes'], 1)
+    results['rows'] = args.rows
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name in ('orm_marshmallow', 'load_frame'):
+            print(f"{name:16} {results[name]['seconds']:9.3f}s  peak {results[name]['peak_bytes'] / 2**20:9.1f} MiB")
+        print(f"rows {args.rows}: {results['speedup']}x faster, {results['allocation_ratio']}x less peak allocation")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Invoke run.main() with synthetic func.HttpRequest objects and time it.
+
+    python -m benchmarks.bench_functions --rows 50000 --invocations 500
+
+Each hot URL is sent through three paths: a WsgiMiddleware built per
+invocation (the old run.py), the module-level middleware, and the native
+handler. Bodies are compared across paths so a drift in the native handler
+shows up here too. run.py is imported against a seeded local SQLite file
+(NEX_SCORE_PROFILE=local), so nothing reaches Azure MySQL.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+import azure.functions as func
+
+HOT_URLS = [
+    '/nex-score/?region=WEST',
+    '/nex-score/trends?region=CENTRAL&timeframe=quarterly',
+    '/nex-score/percentage',
+    '/market-region/'
+]
+
+
+def make_request(url, headers=None):
+    return func.HttpRequest(
+        method='GET',
+        url=f'http://localhost{url}',
+        headers=headers or {},
+        params=dict(parse_qsl(urlsplit(url).query)),
+        body=b''
+    )
+
+
+def time_invocations(handler, request, invocations):
+    timings = []
+    for _ in range(invocations):
+        started = time.perf_counter()
+        handler(request)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50_000)
+    parser.add_argument('--invocations', type=int, default=500)
+    parser.add_argument('--cache', choices=['memory', 'none'], default='memory',
+                        help='response cache backend; "none" times the controllers as well')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    # run.py builds its app at import time from the environment, and config.py
+    # reads it when first imported, so nothing from app/config is imported
+    # before this point
+    handle, database_path = tempfile.mkstemp(prefix='nex_score_bench_', suffix='.sqlite')
+    os.close(handle)
+    os.environ.update({
+        'NEX_SCORE_PROFILE': 'local',
+        'NEX_SCORE_SQLITE_URI': f'sqlite:///{database_path}',
+        'NEX_SCORE_RESPONSE_CACHE': args.cache,
+        'NEX_SCORE_CREATE_TABLES': 'always'
+    })
+
+    try:
+        import run
+        from .common import seed_database
+        seed_database(run.app, args.rows)
+
+        def per_call_middleware(request):
+            return func.WsgiMiddleware(run.app.wsgi_app).handle(request, None)
+
+        def reused_middleware(request):
+            return run.wsgi_middleware.handle(request, None)
+
+        def native(request):
+            return run.main(request, None)
+
+        paths = {'per_call_middleware': per_call_middleware, 'reused_middleware': reused_middleware, 'native': native}
+        run.app.config['NEX_SCORE_NATIVE_HANDLER'] = True
+
+        results = {}
+        for url in HOT_URLS:
+            request = make_request(url)
+            bodies = {}
+            results[url] = {}
+            for name, handler in paths.items():
+                response = handler(request)
+                bodies[name] = json.loads(response.get_body())
+                results[url][name] = round(time_invocations(handler, request, args.invocations), 1)
+            results[url]['bodies_match'] = all(body == bodies['native'] for body in bodies.values())
+            results[url]['speedup'] = round(results[url]['per_call_middleware'] / results[url]['native'], 2)
+    finally:
+        os.remove(database_path)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'url':55} {'per-call µs':>12} {'reused µs':>10} {'native µs':>10} {'speedup':>8}  match")
+        for url, timing in results.items():
+            print(f"{url:55} {timing['per_call_middleware']:12.1f} {timing['reused_middleware']:10.1f} "
+                  f"{timing['native']:10.1f} {timing['speedup']:7.2f}x  {timing['bodies_match']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Time app.ingest against a row-by-row ORM load of the same CSV.
+
+The upsert and the nex_score_latest/rollup refresh are timed separately;
+the synthetic file spans ~120 monthly batches, so the refresh is a full
+rebuild here, whereas a regular monthly load only refreshes one date.
+
+    python -m benchmarks.bench_ingest --rows 1000000
+"""
+import argparse
+import csv
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from app import create_app, db
+from app.ingest import ingest, refresh_derived
+from app.models.nex_score import NexScore
+from .common import bench_config, generate_rows, temp_database_path
+
+CSV_COLUMNS = [
+    'market', 'region', 'detractor_count', 'neutral_count', 'influencer_count', 'total',
+    'detractor_perc', 'neutral_perc', 'influencer_perc'
+]
+
+
+def write_batch_csv(row_count):
+    """Write rows in the nex_score_temp layout (MM/DD/YYYY dates)."""
+    handle, path = tempfile.mkstemp(prefix='nex_score_batch_', suffix='.csv')
+    with os.fdopen(handle, 'w', newline='') as output:
+        writer = csv.writer(output)
+        writer.writerow(CSV_COLUMNS + ['Update_Date_Str'])
+        for row in generate_rows(row_count):
+            writer.writerow([row[name] for name in CSV_COLUMNS] + [row['update_date'].strftime('%m/%d/%Y')])
+    return path
+
+
+def orm_load(path):
+    with open(path, newline='') as source:
+        reader = csv.DictReader(source)
+        for row in reader:
+            values = {name: row[name] for name in CSV_COLUMNS}
+            values['update_date'] = datetime.strptime(row['Update_Date_Str'], '%m/%d/%Y').date()
+            db.session.add(NexScore(**values))
+    db.session.commit()
+
+
+def bulk_load(path):
+    with open(path, 'rb') as source:
+        result = ingest(source, 'csv', refresh=False)
+    db.session.commit()
+    return result
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - started, result
+
+
+def run_ingest(csv_path):
+    """Seconds for the load, a re-load (every row updates) and the derived-table refresh."""
+    database_path = temp_database_path()
+    app = create_app(bench_config(database_path))
+    try:
+        with app.app_context():
+            db.create_all()
+            load_seconds, result = timed(bulk_load, csv_path)
+            reload_seconds, _ = timed(bulk_load, csv_path)
+            refresh_seconds, _ = timed(refresh_derived, set(result.update_dates))
+            db.session.commit()
+        return load_seconds, reload_seconds, refresh_seconds
+    finally:
+        os.remove(database_path)
+
+
+def run_orm(csv_path):
+    database_path = temp_database_path()
+    app = create_app(bench_config(database_path))
+    try:
+        with app.app_context():
+            db.create_all()
+            return timed(orm_load, csv_path)[0]
+    finally:
+        os.remove(database_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--orm-rows', type=int, default=100_000,
+                        help='rows for the ORM baseline, which is extrapolated to --rows')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    bulk_csv = write_batch_csv(args.rows)
+    orm_csv = write_batch_csv(args.orm_rows)
+    try:
+        bulk_seconds, reload_seconds, refresh_seconds = run_ingest(bulk_csv)
+        orm_seconds = run_orm(orm_csv)
+    finally:
+        os.remove(bulk_csv)
+        os.remove(orm_csv)
+
+    results = {
+        'rows': args.rows,
+        'ingest': {'seconds': round(bulk_seconds, 3), 'rows_per_second': round(args.rows / bulk_seconds)},
+        'ingest_reload': {'seconds': round(reload_seconds, 3), 'rows_per_second': round(args.rows / reload_seconds)},
+        'refresh_derived': {'seconds': round(refresh_seconds, 3), 'rows_per_second': round(args.rows / refresh_seconds)},
+        'orm': {'rows': args.orm_rows, 'seconds': round(orm_seconds, 3), 'rows_per_second': round(args.orm_rows / orm_seconds)}
+    }
+    results['speedup'] = round(results['ingest']['rows_per_second'] / results['orm']['rows_per_second'], 1)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name in ('ingest', 'ingest_reload', 'refresh_derived', 'orm'):
+            print(f"{name:14} {results[name]['seconds']:9.3f}s  {results[name]['rows_per_second']:>10,} rows/s")
+        print(f"rows {args.rows}: {results['speedup']}x the ORM load rate")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+"""Closed-loop load test of the app under waitress with a dashboard-shaped traffic mix.
+
+    python -m benchmarks.bench_load --threads 4 --concurrency 1 2 4 8 16 32 --duration 10
+    python -m benchmarks.bench_load --database nex_score_bench.sqlite --latency-ms 20 --mix trends_market=50,market_region=0
+
+waitress runs as a subprocess (--threads) over a SQLite stand-in: a file
+from generate_dataset, or a throwaway one generated here. --latency-ms
+sleeps in every statement to stand in for the round trip to Azure MySQL.
+Each concurrency level runs that many client threads for --duration
+seconds. Each thread keeps one keep-alive connection and sends the next
+request as soon as the last one is answered. Requests are drawn from MIX
+by weight, with random regions, markets, types and timeframes, as the
+dashboard page issues them.
+
+Per level it reports req/s, p50/p95/p99, a latency histogram and the error
+rate (non-200 answers, timeouts and dropped connections), overall and per
+request kind. The saturation point is the lowest concurrency that reaches
+95% of the best throughput; past it, added clients only add latency. The
+clients run in this process, so on a small machine they compete with the
+server for CPU.
+"""
+import argparse
+import bisect
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from .common import bench_config, build_dataset, free_port, region_names, temp_database_path, wait_for_port
+
+TYPES = ['influencer', 'detractor', 'neutral']
+TIMEFRAMES = [('monthly', 6), ('quarterly', 3), ('yearly', 1)]
+
+# name -> (weight, URL template); one dashboard view is a type read per
+# tab, the trend chart, the percentage tiles and the dropdowns
+MIX = {
+    'nex_score': (30, '/nex-score/?type={type}&region={region}'),
+    'nex_score_national': (5, '/nex-score/?type={type}'),
+    'trends_market': (20, '/nex-score/trends?region={region}&market={market}&timeframe={timeframe}'),
+    'trends_region': (10, '/nex-score/trends?region={region}&timeframe={timeframe}'),
+    'percentage': (20, '/nex-score/percentage?region={region}'),
+    'market_region': (15, '/market-region/')
+}
+
+# Upper bounds of the latency histogram buckets in ms; the last bucket is open
+HISTOGRAM_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+def wsgi_app():
+    """waitress --call target: the Flask app over NEX_SCORE_BENCH_DB."""
+    from sqlalchemy import event
+
+    from app import create_app, db
+
+    app = create_app(bench_config(
+        os.environ['NEX_SCORE_BENCH_DB'],
+        NEX_SCORE_RESPONSE_CACHE=os.environ.get('NEX_SCORE_BENCH_CACHE', 'none')
+    ))
+    latency = float(os.environ.get('NEX_SCORE_BENCH_LATENCY_MS', 0)) / 1000
+    if latency:
+        with app.app_context():
+            @event.listens_for(db.engine, 'before_cursor_execute')
+            def slow_statement(*args):
+                time.sleep(latency)
+    return app
+
+
+def parse_mix(value):
+    """'trends_market=50,market_region=0' over the default MIX weights."""
+    weights = {name: weight for name, (weight, _) in MIX.items()}
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        name, _, weight = item.partition('=')
+        if name not in MIX or not weight.isdigit():
+            raise ValueError(f'Invalid mix entry {item!r}; names are {", ".join(MIX)}')
+        weights[name] = int(weight)
+    if not any(weights.values()):
+        raise ValueError('The mix has no weight left')
+    return weights
+
+
+class Workload:
+    def __init__(self, weights, regions, markets_per_region):
+        self.names = [name for name, weight in weights.items() if weight]
+        self.weights = [weights[name] for name in self.names]
+        self.regions = regions
+        self.markets_per_region = markets_per_region
+
+    def next_request(self, rng):
+        name = rng.choices(self.names, self.weights)[0]
+        region = rng.choice(self.regions)
+        url = MIX[name][1].format(
+            type=rng.choice(TYPES),
+            region=region,
+            market=f'{region}_MARKET_{rng.randrange(self.markets_per_region):03d}',
+            timeframe=rng.choices([timeframe for timeframe, _ in TIMEFRAMES], [weight for _, weight in TIMEFRAMES])[0]
+        )
+        return name, url
+
+
+def client(port, workload, seed, deadline, timeout, samples):
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        while time.perf_counter() < deadline:
+            name, url = workload.next_request(rng)
+            started = time.perf_counter()
+            try:
+                connection.request('GET', url)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                ok = False
+                connection.close()
+            samples.append((name, time.perf_counter() - started, ok))
+    finally:
+        connection.close()
+
+
+def histogram(latencies):
+    counts = [0] * (len(HISTOGRAM_MS) + 1)
+    for latency in latencies:
+        counts[bisect.bisect_left(HISTOGRAM_MS, latency * 1000)] += 1
+    labels = [f'<={bound}ms' for bound in HISTOGRAM_MS] + [f'>{HISTOGRAM_MS[-1]}ms']
+    return dict(zip(labels, counts))
+
+
+def summarize(samples, elapsed):
+    latencies = np.array([latency for _, latency, ok in samples if ok])
+    errors = sum(1 for _, _, ok in samples if not ok)
+    summary = {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'rps': round(len(latencies) / elapsed, 1)
+    }
+    if len(latencies):
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+        summary.update({'p50_ms': round(p50, 2), 'p95_ms': round(p95, 2), 'p99_ms': round(p99, 2)})
+    else:
+        summary.update({'p50_ms': None, 'p95_ms': None, 'p99_ms': None})
+    return summary
+
+
+def run_level(port, workload, concurrency, duration, timeout):
+    samples = []
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=client, args=(port, workload, index, deadline, timeout, samples))
+        for index in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    result = summarize(samples, elapsed)
+    result['histogram'] = histogram(latency for _, latency, ok in samples if ok)
+    result['by_request'] = {
+        name: summarize([sample for sample in samples if sample[0] == name], elapsed)
+        for name in workload.names
+    }
+    return result
+
+
+def saturation(levels):
+    """Best throughput and the lowest concurrency within 95% of it."""
+    peak = max(levels.values(), key=lambda level: level['rps'])
+    knee = next(concurrency for concurrency, level in levels.items() if level['rps'] >= 0.95 * peak['rps'])
+    return {'peak_rps': peak['rps'], 'saturation_concurrency': int(knee)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database', help='existing SQLite file from generate_dataset; a temporary one is generated otherwise')
+    parser.add_argument('--markets-per-region', type=int, default=100)
+    parser.add_argument('--regions', type=int, default=4)
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4, help='waitress threads')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--duration', type=float, default=10, help='seconds per concurrency level')
+    parser.add_argument('--warmup', type=float, default=2, help='untimed seconds before the first level')
+    parser.add_argument('--latency-ms', type=float, default=0, help='added to every statement')
+    parser.add_argument('--timeout', type=float, default=30, help='client timeout per request, counted as an error')
+    parser.add_argument('--cache', choices=['none', 'memory'], default='none', help='NEX_SCORE_RESPONSE_CACHE of the server')
+    parser.add_argument('--mix', help='weight overrides, e.g. trends_market=50,market_region=0')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    try:
+        weights = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.database and not os.path.exists(args.database):
+        parser.error(f'{args.database} does not exist; create it with benchmarks.generate_dataset')
+
+    path = os.path.abspath(args.database) if args.database else temp_database_path()
+    results = {
+        'threads': args.threads, 'latency_ms': args.latency_ms, 'cache': args.cache,
+        'duration': args.duration, 'mix': weights, 'levels': {}
+    }
+    try:
+        from sqlalchemy import distinct, func, select
+
+        from app import create_app, db
+        from app.models.nex_score import NexScore
+
+        app = create_app(bench_config(path, NEX_SCORE_RESPONSE_CACHE='none'))
+        if args.database:
+            with app.app_context():
+                regions = db.session.execute(select(distinct(NexScore.region)).order_by(NexScore.region)).scalars().all()
+                markets = db.session.execute(select(func.count(distinct(NexScore.market)))).scalar()
+            markets_per_region = max(1, markets // len(regions))
+        else:
+            build_dataset(app, args.markets_per_region, args.regions, args.years)
+            regions, markets_per_region = region_names(args.regions), args.markets_per_region
+        workload = Workload(weights, regions, markets_per_region)
+
+        port = free_port()
+        env = {
+            **os.environ,
+            'NEX_SCORE_BENCH_DB': path,
+            'NEX_SCORE_BENCH_CACHE': args.cache,
+            'NEX_SCORE_BENCH_LATENCY_MS': str(args.latency_ms)
+        }
+        command = [sys.executable, '-m', 'waitress', f'--threads={args.threads}', '--host=127.0.0.1', f'--port={port}',
+                   '--call', 'benchmarks.bench_load:wsgi_app']
+        process = subprocess.Popen(command, env=env)
+        try:
+            wait_for_port(port)
+            run_level(port, workload, 1, args.warmup, args.timeout)
+            for concurrency in args.concurrency:
+                results['levels'][str(concurrency)] = run_level(port, workload, concurrency, args.duration, args.timeout)
+        finally:
+            process.terminate()
+            process.wait()
+    finally:
+        if not args.database:
+            os.remove(path)
+    results['saturation'] = saturation(results['levels'])
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"waitress --threads={args.threads}, {args.latency_ms} ms per statement, cache {args.cache}, {args.duration}s per level")
+    print(f"{'clients':>8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}")
+    for concurrency, level in results['levels'].items():
+        p50, p95, p99 = (f'{level[key]:9.1f}' if level[key] is not None else f'{"-":>9}' for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+        print(f"{concurrency:>8} {level['rps']:9.1f} {p50} {p95} {p99} {level['error_rate']:8.2%}")
+    labels = list(HISTOGRAM_MS) + [f'>{HISTOGRAM_MS[-1]}']
+    print(f"\nlatency histogram (requests per bucket, upper bound in ms)\n{'clients':>8} " + ' '.join(f'{label:>6}' for label in labels))
+    for concurrency, level in results['levels'].items():
+        print(f"{concurrency:>8} " + ' '.join(f'{count:6}' for count in level['histogram'].values()))
+    print(f"\npeak {results['saturation']['peak_rps']} req/s, saturated from {results['saturation']['saturation_concurrency']} clients")
+
+
+if __name__ == '__main__':
+    main()
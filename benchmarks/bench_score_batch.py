@@ -0,0 +1,72 @@
+"""Time the monthly report as per-market score-comparison calls against one batch call.
+
+    python -m benchmarks.bench_score_batch --markets-per-region 100 --months 24 --report-months 3
+
+'single' calls get_score_data once per market and report month, as the
+report did against /score-comparison. 'batch' is one get_score_batch_data
+call: one grouped query plus the pivot and diff. Both run in-process against
+a seeded SQLite file, so HTTP overhead per call (which favours the batch even
+more) is not included.
+"""
+import argparse
+import json
+import os
+from datetime import date
+
+from app import create_app
+from app.controller.nex_score_controller import get_score_data, shift_month
+from app.controller.score_batch_controller import get_score_batch_data
+from .common import REGIONS, bench_config, measure, seed_database, temp_database_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--markets-per-region', type=int, default=100)
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--report-months', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    markets = args.markets_per_region * len(REGIONS)
+    rows = markets * args.months
+    path = temp_database_path()
+    results = {'rows': rows, 'markets': markets, 'report_months': args.report_months}
+    try:
+        app = create_app(bench_config(path, NEX_SCORE_RESPONSE_CACHE='none'))
+        seed_database(app, rows, markets_per_region=args.markets_per_region)
+        # generate_rows ends its history in December 2024
+        end = date(2024, 12, 1)
+        months = [shift_month(end, -offset).strftime("%b'%y").upper() for offset in reversed(range(args.report_months))]
+        pairs = [(f'{region}_MARKET_{index:03d}', region) for region in REGIONS for index in range(args.markets_per_region)]
+
+        def single():
+            for market, region in pairs:
+                for month in months:
+                    get_score_data(region, market, month)
+
+        def batch():
+            get_score_batch_data(None, None, months[0], months[-1])
+
+        with app.app_context():
+            for name, run in (('single', single), ('batch', batch)):
+                seconds, peak = measure(run, repeat=args.repeat)
+                results[name] = {'seconds': round(seconds, 4), 'peak_bytes': peak}
+        results['single']['calls'] = len(pairs) * len(months)
+        results['batch']['calls'] = 1
+    finally:
+        os.remove(path)
+    results['speedup'] = round(results['single']['seconds'] / results['batch']['seconds'], 1)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{markets} markets x {args.report_months} months ({rows} history rows)")
+        for name in ('single', 'batch'):
+            print(f"  {name:7} {results[name]['calls']:6} calls {results[name]['seconds']:9.4f}s"
+                  f"  peak {results[name]['peak_bytes'] / 2**20:7.1f} MiB")
+        print(f"  batch is {results['speedup']}x faster")
+
+
+if __name__ == '__main__':
+    main()
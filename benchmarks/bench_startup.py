@@ -0,0 +1,126 @@
+"""Cold-start cost of create_app(): import time, app creation, first response.
+
+    python -m benchmarks.bench_startup --runs 5 --budget-ms 800
+
+Every run is a fresh interpreter with ``-X importtime`` against a seeded
+SQLite file, once with the default startup (Swagger, create_all on every
+start) and once with the serverless settings (no Swagger, schema stamp).
+Exits non-zero when the fast mode's median time to first response is over
+--budget-ms, so the budget can be enforced in CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from .common import create_seeded_bench_app
+
+MODES = {
+    'default': {'NEX_SCORE_SWAGGER': 'true', 'NEX_SCORE_CREATE_TABLES': 'always'},
+    'fast': {'NEX_SCORE_SWAGGER': 'false', 'NEX_SCORE_CREATE_TABLES': 'stamp'}
+}
+
+# Runs in the child interpreter; only what create_app() itself needs is imported
+CHILD = '''
+import json, os, sys, time
+started = time.perf_counter()
+from app import create_app
+from config import LocalConfig
+imported = time.perf_counter()
+app = create_app(LocalConfig)
+created = time.perf_counter()
+response = app.test_client().get(os.environ['BENCH_URL'])
+responded = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_response_ms': (responded - created) * 1000,
+    'total_ms': (responded - started) * 1000,
+    'pandas_loaded': 'pandas' in sys.modules
+}))
+'''
+
+
+def parse_importtime(stderr, top):
+    """Top modules by cumulative import time (microseconds) from -X importtime output."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line.split('|', 2)
+        modules.append((int(cumulative_us), name.strip()))
+    return [{'module': name, 'cumulative_ms': round(cumulative / 1000, 1)}
+            for cumulative, name in sorted(modules, reverse=True)[:top]]
+
+
+def run_child(database_path, stamp_dir, mode, url):
+    env = {
+        **os.environ,
+        **MODES[mode],
+        'NEX_SCORE_SQLITE_URI': f'sqlite:///{database_path}',
+        'NEX_SCORE_SCHEMA_STAMP_DIR': stamp_dir,
+        'NEX_SCORE_RESPONSE_CACHE': 'none',
+        'BENCH_URL': url
+    }
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD],
+        env=env, capture_output=True, text=True, check=True, cwd=os.getcwd()
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--url', default='/nex-score/?region=WEST')
+    parser.add_argument('--budget-ms', type=float, default=800.0,
+                        help='maximum median total_ms for the fast mode')
+    parser.add_argument('--top', type=int, default=10, help='slowest imports to list')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    _, database_path = create_seeded_bench_app(10_000)
+    stamp_dir = tempfile.mkdtemp(prefix='nex_score_stamp_')
+    results = {}
+    try:
+        for mode in MODES:
+            # One untimed run warms the OS file cache and writes the schema stamp
+            run_child(database_path, stamp_dir, mode, args.url)
+            runs = [run_child(database_path, stamp_dir, mode, args.url) for _ in range(args.runs)]
+            timings = [timing for timing, _ in runs]
+            results[mode] = {
+                name: round(statistics.median(timing[name] for timing in timings), 1)
+                for name in ('import_ms', 'create_app_ms', 'first_response_ms', 'total_ms')
+            }
+            results[mode]['pandas_loaded'] = any(timing['pandas_loaded'] for timing in timings)
+            results[mode]['slowest_imports'] = parse_importtime(runs[-1][1], args.top)
+    finally:
+        os.remove(database_path)
+        for name in os.listdir(stamp_dir):
+            os.remove(os.path.join(stamp_dir, name))
+        os.rmdir(stamp_dir)
+
+    results['budget_ms'] = args.budget_ms
+    results['within_budget'] = results['fast']['total_ms'] <= args.budget_ms
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for mode in MODES:
+            timing = results[mode]
+            print(f"{mode:8} import {timing['import_ms']:7.1f} ms  create_app {timing['create_app_ms']:7.1f} ms  "
+                  f"first response {timing['first_response_ms']:7.1f} ms  total {timing['total_ms']:7.1f} ms")
+            for entry in timing['slowest_imports'][:5]:
+                print(f"           {entry['cumulative_ms']:7.1f} ms  {entry['module']}")
+        print(f"budget {args.budget_ms:.0f} ms: {'OK' if results['within_budget'] else 'EXCEEDED'}")
+
+    if not results['within_budget']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Time the national/region/market tree against assembling it client side.
+
+    python -m benchmarks.bench_tree --markets-per-region 2500 --months 3
+
+'client' is what dashboards did before view=tree: three flat /nex-score/
+reads (one per type), grouped with the old per-region rescan, then region
+and national averages computed in Python. 'tree' is get_tree_views(): one
+grouped query and one pass. A second section times organize_data_by_region
+against the old rescan on synthetic entries with many regions.
+"""
+import argparse
+import json
+import os
+
+from app import create_app
+from app.controller.nex_score_controller import TYPE_PARAMS, get_nex_score_data
+from app.hierarchy import get_tree_views
+from app.utils import organize_data_by_region
+from .common import REGIONS, bench_config, measure, seed_database, temp_database_path
+
+
+def rescan_organize(regions, data):
+    # organize_data_by_region before it became single pass
+    organized_data = []
+    for region in regions:
+        region_data = {'label': region, 'children': []}
+        for entry in data:
+            if entry['region'] == region:
+                region_data['children'].append(entry)
+        organized_data.append(region_data)
+    return organized_data
+
+
+def client_side_tree():
+    trees = {}
+    for type_param in TYPE_PARAMS:
+        groups, _ = get_nex_score_data(type_param, None)
+        entries = [entry for group in groups for entry in group['children']]
+        groups = rescan_organize(sorted({entry['region'] for entry in entries}), entries)
+        # The flat view has no totals, so clients could only take plain means
+        region_nodes = []
+        for group in groups:
+            count = sum(entry['count'] for entry in group['children'])
+            value = sum(entry['value'] for entry in group['children']) / len(group['children'])
+            region_nodes.append({'label': group['label'], 'value': value, 'count': count, 'children': group['children']})
+        national_count = sum(node['count'] for node in region_nodes)
+        national_value = sum(entry['value'] for entry in entries) / len(entries)
+        trees[type_param] = {'label': 'NATIONAL', 'value': national_value, 'count': national_count, 'children': region_nodes}
+    return trees
+
+
+def tree_views():
+    return get_tree_views(TYPE_PARAMS, None)
+
+
+def synthetic_entries(regions, markets_per_region):
+    return [
+        {'label': f'M{index}', 'region': f'R{region}', 'value': 1.0, 'count': 1}
+        for index in range(markets_per_region) for region in range(regions)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--markets-per-region', type=int, default=2500)
+    parser.add_argument('--months', type=int, default=3)
+    parser.add_argument('--organize-regions', type=int, default=200)
+    parser.add_argument('--organize-markets', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    rows = args.markets_per_region * len(REGIONS) * args.months
+    path = temp_database_path()
+    results = {'rows': rows, 'markets': args.markets_per_region * len(REGIONS)}
+    try:
+        app = create_app(bench_config(path, NEX_SCORE_LATEST_TABLE=False, NEX_SCORE_RESPONSE_CACHE='none'))
+        seed_database(app, rows, markets_per_region=args.markets_per_region)
+        with app.app_context():
+            for name, build in (('client', client_side_tree), ('tree', tree_views)):
+                seconds, peak = measure(build, repeat=args.repeat)
+                results[name] = {'seconds': round(seconds, 4), 'peak_bytes': peak}
+    finally:
+        os.remove(path)
+    results['speedup'] = round(results['client']['seconds'] / results['tree']['seconds'], 1)
+
+    regions = [f'R{region}' for region in range(args.organize_regions)]
+    entries = synthetic_entries(args.organize_regions, args.organize_markets)
+    for name, organize in (('organize_rescan', rescan_organize), ('organize_single_pass', organize_data_by_region)):
+        seconds, _ = measure(lambda: organize(regions, entries), repeat=args.repeat)
+        results[name] = {'seconds': round(seconds, 4), 'entries': len(entries), 'regions': len(regions)}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"latest rows for {results['markets']} markets ({rows} history rows)")
+        for name in ('client', 'tree'):
+            print(f"  {name:8} {results[name]['seconds']:9.4f}s  peak {results[name]['peak_bytes'] / 2**20:7.1f} MiB")
+        print(f"  tree is {results['speedup']}x faster")
+        print(f"organize {len(entries)} entries into {len(regions)} regions")
+        for name in ('organize_rescan', 'organize_single_pass'):
+            print(f"  {name:20} {results[name]['seconds']:9.4f}s")
+
+
+if __name__ == '__main__':
+    main()
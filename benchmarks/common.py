@@ -0,0 +1,157 @@
+"""Shared helpers for the benchmark scripts in this directory.
+
+Benchmarks run against a throwaway SQLite file so they are reproducible and
+never touch the Azure MySQL database configured in config.py. Run them from
+the repository root, e.g. ``python -m benchmarks.bench_frames --rows 100000``.
+"""
+import os
+import socket
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+import numpy as np
+
+from app import create_app, db
+from app.models.nex_score import NexScore
+from config import Config
+
+REGIONS = ['CENTRAL', 'WEST', 'SOUTH', 'NORTHEAST']
+
+
+def bench_config(database_path, **overrides):
+    return type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database_path}',
+        'NEX_SCORE_BACKEND': 'database',
+        **overrides
+    })
+
+
+def temp_database_path():
+    handle, path = tempfile.mkstemp(prefix='nex_score_bench_', suffix='.sqlite')
+    os.close(handle)
+    return path
+
+
+def region_names(count):
+    """REGIONS, then REGION_05, REGION_06, ... when more regions are asked for."""
+    return REGIONS[:count] + [f'REGION_{index + 1:02d}' for index in range(len(REGIONS), count)]
+
+
+def generate_rows(row_count, markets_per_region=None, seed=7, max_months=120, regions=REGIONS):
+    """Yield synthetic nex_score rows as dicts: every market gets a monthly batch.
+
+    Each market keeps its own level from month to month and drifts a little
+    around it, so trends and month-on-month comparisons look like real data.
+    Unless given, the market count grows with row_count so the history never
+    spans more than max_months monthly batches.
+    """
+    rng = np.random.default_rng(seed)
+    if markets_per_region is None:
+        markets_per_region = max(50, -(-row_count // (max_months * len(regions))))
+    markets = [(f'{region}_MARKET_{index:03d}', region) for region in regions for index in range(markets_per_region)]
+    batches = -(-row_count // len(markets))
+    start = date(2024, 12, 1)
+    base_influencer = rng.uniform(3, 14, len(markets))
+    base_detractor = rng.uniform(11, 29, len(markets))
+    base_total = rng.integers(10_000, 500_000, len(markets))
+
+    produced = 0
+    for batch in range(batches):
+        month_index = start.year * 12 + start.month - 1 - (batches - 1 - batch)
+        update_date = date(month_index // 12, month_index % 12 + 1, 23)
+        influencer = np.clip(base_influencer + rng.normal(0, 0.8, len(markets)), 2, 15).round(2)
+        detractor = np.clip(base_detractor + rng.normal(0, 1.2, len(markets)), 10, 30).round(2)
+        totals = (base_total * rng.uniform(0.9, 1.1, len(markets))).astype(int)
+        for (market, region), influencer_perc, detractor_perc, total in zip(markets, influencer, detractor, totals):
+            if produced == row_count:
+                return
+            neutral_perc = round(100 - influencer_perc - detractor_perc, 2)
+            yield {
+                'market': market,
+                'region': region,
+                'influencer_count': int(total * influencer_perc / 100),
+                'detractor_count': int(total * detractor_perc / 100),
+                'neutral_count': int(total * neutral_perc / 100),
+                'total': int(total),
+                'influencer_perc': float(influencer_perc),
+                'detractor_perc': float(detractor_perc),
+                'neutral_perc': neutral_perc,
+                'update_date': update_date
+            }
+            produced += 1
+
+
+def seed_database(app, row_count, chunk_size=50_000, **kwargs):
+    with app.app_context():
+        db.create_all()
+        table = NexScore.__table__
+        chunk = []
+        for row in generate_rows(row_count, **kwargs):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                db.session.execute(table.insert(), chunk)
+                chunk = []
+        if chunk:
+            db.session.execute(table.insert(), chunk)
+        db.session.commit()
+
+
+def create_seeded_bench_app(row_count, **overrides):
+    path = temp_database_path()
+    app = create_app(bench_config(path, **overrides))
+    seed_database(app, row_count)
+    return app, path
+
+
+def build_dataset(app, markets_per_region, regions=len(REGIONS), years=1):
+    """Seed markets_per_region x regions x years of monthly batches and build the derived tables.
+
+    Returns the number of nex_score rows written.
+    """
+    from app.latest import rebuild_latest
+    from app.rollups import rebuild_rollups
+
+    names = region_names(regions)
+    row_count = markets_per_region * len(names) * years * 12
+    seed_database(app, row_count, markets_per_region=markets_per_region, regions=names, max_months=years * 12)
+    with app.app_context():
+        rebuild_latest()
+        rebuild_rollups()
+        db.session.commit()
+    return row_count
+
+
+def measure(function, repeat=3):
+    """Best wall-clock seconds over `repeat` runs, plus peak traced allocation in bytes."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(timings), peak
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'server on port {port} did not come up')
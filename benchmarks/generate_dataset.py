@@ -0,0 +1,56 @@
+"""Write a synthetic nex_score dataset to a SQLite file.
+
+    python -m benchmarks.generate_dataset nex_score_bench.sqlite --markets-per-region 500 --regions 4 --years 5
+
+Every market gets one batch per month (day 23) for `years` years ending in
+December 2024, and nex_score_latest and the rollups are built, so the file
+can be served by create_app() as is (SQLALCHEMY_DATABASE_URI=sqlite:///...)
+or passed to bench_endpoints with --database. 500 x 4 x 5 is 120,000 rows;
+scale markets and years for millions.
+"""
+import argparse
+import json
+import os
+import time
+
+from app import create_app
+from .common import bench_config, build_dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path', help='SQLite file to create')
+    parser.add_argument('--markets-per-region', type=int, default=500)
+    parser.add_argument('--regions', type=int, default=4)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--force', action='store_true', help='replace the file when it exists')
+    parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    args = parser.parse_args()
+
+    if os.path.exists(args.path):
+        if not args.force:
+            parser.error(f'{args.path} exists; pass --force to replace it')
+        os.remove(args.path)
+
+    started = time.perf_counter()
+    app = create_app(bench_config(os.path.abspath(args.path), NEX_SCORE_RESPONSE_CACHE='none'))
+    rows = build_dataset(app, args.markets_per_region, args.regions, args.years)
+    summary = {
+        'path': args.path,
+        'rows': rows,
+        'markets_per_region': args.markets_per_region,
+        'regions': args.regions,
+        'years': args.years,
+        'seconds': round(time.perf_counter() - started, 2),
+        'bytes': os.path.getsize(args.path)
+    }
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(f"{summary['path']}: {rows} rows ({args.markets_per_region} markets x {args.regions} regions"
+              f" x {args.years * 12} months), {summary['bytes'] / 2**20:.1f} MiB in {summary['seconds']}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,4 +12,154 @@ class Config:
 
     SQLALCHEMY_DATABASE_URI = db_uri
 
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # 'database' queries MySQL on every read, 'snapshot' serves reads from an
+    # in-process columnar copy that is reloaded when the data version changes
+    NEX_SCORE_BACKEND = os.getenv('NEX_SCORE_BACKEND', 'database')
+    NEX_SCORE_SNAPSHOT_CHECK_INTERVAL = int(os.getenv('NEX_SCORE_SNAPSHOT_CHECK_INTERVAL', '30'))
+
+    # Read the latest-per-market view from the maintained nex_score_latest table
+    NEX_SCORE_LATEST_TABLE = os.getenv('NEX_SCORE_LATEST_TABLE', 'true').lower() == 'true'
+
+    # Where /nex-score/trends aggregates: 'pandas' over raw rows, 'rollup' to
+    # read the pre-aggregated nex_score_rollup table, or 'sql' to bucket and
+    # average inside the database for deployments without rollups
+    NEX_SCORE_TREND_SOURCE = os.getenv('NEX_SCORE_TREND_SOURCE', 'pandas')
+
+    # Rows fetched per server-side cursor round trip by the csv/xlsx export
+    NEX_SCORE_EXPORT_CHUNK_SIZE = int(os.getenv('NEX_SCORE_EXPORT_CHUNK_SIZE', '5000'))
+    # Largest /excel page (limit/cursor), also the page size for a bare cursor
+    NEX_SCORE_EXPORT_MAX_PAGE_SIZE = int(os.getenv('NEX_SCORE_EXPORT_MAX_PAGE_SIZE', '10000'))
+
+    # ETag/Last-Modified: how often the data version (max update_date + row
+    # count) is re-read, and the Cache-Control max-age sent with it
+    NEX_SCORE_VERSION_CHECK_INTERVAL = int(os.getenv('NEX_SCORE_VERSION_CHECK_INTERVAL', '5'))
+    NEX_SCORE_CACHE_MAX_AGE = int(os.getenv('NEX_SCORE_CACHE_MAX_AGE', '60'))
+
+    # Response cache: 'memory' (per process), 'sqlite' (file shared by the
+    # workers on a host) or 'none'. Entries are keyed on the data version.
+    NEX_SCORE_RESPONSE_CACHE = os.getenv('NEX_SCORE_RESPONSE_CACHE', 'memory')
+    NEX_SCORE_RESPONSE_CACHE_BYTES = int(os.getenv('NEX_SCORE_RESPONSE_CACHE_BYTES', str(64 * 1024 * 1024)))
+    NEX_SCORE_RESPONSE_CACHE_TTL = int(os.getenv('NEX_SCORE_RESPONSE_CACHE_TTL', '300'))
+    NEX_SCORE_RESPONSE_CACHE_PATH = os.getenv('NEX_SCORE_RESPONSE_CACHE_PATH',
+                                              os.path.join(tempfile.gettempdir(), 'nex_score_response_cache.sqlite3'))
+
+    # Response compression: encodings offered in order of preference (br only
+    # with the Brotli package; empty turns compression off), the smallest
+    # body worth compressing, the zlib level (gzip/deflate) and brotli quality
+    NEX_SCORE_COMPRESSION_ENCODINGS = os.getenv('NEX_SCORE_COMPRESSION_ENCODINGS', 'br,gzip,deflate')
+    NEX_SCORE_COMPRESSION_MIN_BYTES = int(os.getenv('NEX_SCORE_COMPRESSION_MIN_BYTES', '1024'))
+    NEX_SCORE_COMPRESSION_LEVEL = int(os.getenv('NEX_SCORE_COMPRESSION_LEVEL', '6'))
+    NEX_SCORE_BROTLI_QUALITY = int(os.getenv('NEX_SCORE_BROTLI_QUALITY', '5'))
+
+    # Per-request phase timing (db, dataframe, aggregate, serialize, encode)
+    # into per-route histograms at GET /metrics, plus a Server-Timing header
+    # on every response. Nothing is recorded while it is off.
+    NEX_SCORE_METRICS = os.getenv('NEX_SCORE_METRICS', 'false').lower() == 'true'
+    NEX_SCORE_SERVER_TIMING = os.getenv('NEX_SCORE_SERVER_TIMING', 'true').lower() == 'true'
+
+    # GET /ops/cache and /ops/pool (per-process cache and pool counters);
+    # off in the production profiles, where they would be public
+    NEX_SCORE_OPS_ENDPOINTS = os.getenv('NEX_SCORE_OPS_ENDPOINTS', 'true').lower() == 'true'
+
+    # Bearer token for POST /nex-score/ingest; the endpoint is off when unset
+    NEX_SCORE_INGEST_TOKEN = os.getenv('NEX_SCORE_INGEST_TOKEN', '')
+
+    # Startup: 'always' runs db.create_all() on every start, 'stamp' only when
+    # the model fingerprint in the local stamp file changed, 'never' skips it.
+    # Swagger (/apidocs) can be turned off to keep flasgger off the start path.
+    NEX_SCORE_CREATE_TABLES = os.getenv('NEX_SCORE_CREATE_TABLES', 'always')
+    NEX_SCORE_SCHEMA_STAMP_DIR = os.getenv('NEX_SCORE_SCHEMA_STAMP_DIR', tempfile.gettempdir())
+    NEX_SCORE_SWAGGER = os.getenv('NEX_SCORE_SWAGGER', 'true').lower() == 'true'
+
+    # Threads /nex-score/dashboard runs its sub-queries on; capped by what
+    # the connection pool can hand out
+    NEX_SCORE_FANOUT_WORKERS = int(os.getenv('NEX_SCORE_FANOUT_WORKERS', '4'))
+
+    # ASGI mode (app.asgi): asyncio engine pool and the threads the pandas
+    # work runs on. The async URI defaults to SQLALCHEMY_DATABASE_URI with
+    # the driver swapped for aiomysql / aiosqlite.
+    NEX_SCORE_ASYNC_DATABASE_URI = os.getenv('NEX_SCORE_ASYNC_DATABASE_URI', '')
+    NEX_SCORE_ASYNC_POOL_SIZE = int(os.getenv('NEX_SCORE_ASYNC_POOL_SIZE', '20'))
+    NEX_SCORE_ASYNC_MAX_OVERFLOW = int(os.getenv('NEX_SCORE_ASYNC_MAX_OVERFLOW', '10'))
+    NEX_SCORE_ASGI_WORKERS = int(os.getenv('NEX_SCORE_ASGI_WORKERS', '4'))
+
+    # run.py: answer the hot GET endpoints without the WSGI bridge (app.native)
+    NEX_SCORE_NATIVE_HANDLER = os.getenv('NEX_SCORE_NATIVE_HANDLER', 'false').lower() == 'true'
+
+
+# Engine profiles, chosen with NEX_SCORE_PROFILE. Azure MySQL sits behind a
+# gateway that drops connections idle for a few minutes, so the MySQL
+# profiles recycle before that and pre-ping on checkout. Size pool_size +
+# max_overflow against the waitress thread count (4 by default).
+class ProductionConfig(Config):
+    NEX_SCORE_PROFILE = 'production'
+    NEX_SCORE_OPS_ENDPOINTS = os.getenv('NEX_SCORE_OPS_ENDPOINTS', 'false').lower() == 'true'
+    NEX_SCORE_STATEMENT_TIMEOUT_MS = int(os.getenv('NEX_SCORE_STATEMENT_TIMEOUT_MS', '30000'))
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.getenv('NEX_SCORE_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('NEX_SCORE_MAX_OVERFLOW', '5')),
+        'pool_timeout': 10,
+        'pool_recycle': 240,
+        'pool_pre_ping': True,
+        'connect_args': {'connection_timeout': 10}
+    }
+
+
+class ReadHeavyConfig(ProductionConfig):
+    # Reporting replicas: more threads, longer aggregate queries, shared response cache
+    NEX_SCORE_PROFILE = 'read-heavy'
+    NEX_SCORE_STATEMENT_TIMEOUT_MS = int(os.getenv('NEX_SCORE_STATEMENT_TIMEOUT_MS', '60000'))
+    NEX_SCORE_RESPONSE_CACHE = os.getenv('NEX_SCORE_RESPONSE_CACHE', 'sqlite')
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        **ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS,
+        'pool_size': int(os.getenv('NEX_SCORE_POOL_SIZE', '16')),
+        'max_overflow': int(os.getenv('NEX_SCORE_MAX_OVERFLOW', '8')),
+        'pool_timeout': 5
+    }
+
+
+class ServerlessConfig(ProductionConfig):
+    # One Functions worker serves few concurrent requests and may be frozen
+    # between invocations: keep a single connection and recycle it early
+    NEX_SCORE_PROFILE = 'serverless'
+    NEX_SCORE_CREATE_TABLES = os.getenv('NEX_SCORE_CREATE_TABLES', 'stamp')
+    NEX_SCORE_SWAGGER = os.getenv('NEX_SCORE_SWAGGER', 'false').lower() == 'true'
+    NEX_SCORE_NATIVE_HANDLER = os.getenv('NEX_SCORE_NATIVE_HANDLER', 'true').lower() == 'true'
+    NEX_SCORE_STATEMENT_TIMEOUT_MS = int(os.getenv('NEX_SCORE_STATEMENT_TIMEOUT_MS', '20000'))
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        **ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS,
+        'pool_size': int(os.getenv('NEX_SCORE_POOL_SIZE', '1')),
+        'max_overflow': int(os.getenv('NEX_SCORE_MAX_OVERFLOW', '2')),
+        'pool_timeout': 5,
+        'pool_recycle': 120,
+        'connect_args': {'connection_timeout': 5}
+    }
+
+
+class LocalConfig(Config):
+    # Flask-SQLAlchemy resolves a relative SQLite path under instance/
+    NEX_SCORE_PROFILE = 'local'
+    SQLALCHEMY_DATABASE_URI = os.getenv('NEX_SCORE_SQLITE_URI', 'sqlite:///nex_score.sqlite3')
+    NEX_SCORE_STATEMENT_TIMEOUT_MS = 0
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 5,
+        'max_overflow': 5,
+        'connect_args': {'timeout': 15}
+    }
+
+
+PROFILES = {
+    'production': ProductionConfig,
+    'read-heavy': ReadHeavyConfig,
+    'serverless': ServerlessConfig,
+    'local': LocalConfig
+}
+
+
+def get_config(profile=None):
+    profile = profile or os.getenv('NEX_SCORE_PROFILE', 'production')
+    if profile not in PROFILES:
+        raise ValueError(f'Unknown NEX_SCORE_PROFILE {profile!r}; expected one of {", ".join(PROFILES)}')
+    return PROFILES[profile]
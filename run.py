@@ -1,4 +1,7 @@
+from urllib.parse import urlsplit
+
 from app import create_app
+from app.native import handle_native
 from waitress import serve
 
 import azure.functions as func
@@ -6,13 +9,23 @@ import azure.functions as func
 
 app = create_app()
 
+# Built once per worker; constructing it per invocation only added overhead
+wsgi_middleware = func.WsgiMiddleware(app.wsgi_app)
+
+
 def main(req: func.HttpRequest, context: func.Context) -> func.HttpResponse:
-    """Each request is redirected to the WSGI handler.
+    """Hot GET endpoints are answered natively when enabled; every other
+    request is redirected to the WSGI handler.
     """
-    return func.WsgiMiddleware(app.wsgi_app).handle(req, context)
+    if app.config.get('NEX_SCORE_NATIVE_HANDLER'):
+        headers = {name.lower(): value for name, value in req.headers.items()}
+        native = handle_native(app, req.method, urlsplit(req.url).path, dict(req.params), headers)
+        if native is not None:
+            status, response_headers, body = native
+            return func.HttpResponse(body=body, status_code=status, headers=response_headers)
+
+    return wsgi_middleware.handle(req, context)
 
         
 # if __name__ == '__main__':
 #     app.run(debug=True, host='0.0.0.0', port=8000)
-
-
@@ -0,0 +1,37 @@
+"""Helpers for tests that run against a throwaway in-memory SQLite database."""
+from datetime import date
+
+from app import create_app, db
+from app.models.nex_score import NexScore
+from config import Config
+
+
+class SQLiteConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    NEX_SCORE_BACKEND = 'database'
+
+
+def seed_rows():
+    rows = []
+    for month, day in ((2, 23), (3, 23), (4, 23)):
+        for market, region, base in (('ARKANSAS', 'CENTRAL', 5.0), ('CINCINNATI', 'CENTRAL', 6.0), ('SEATTLE', 'WEST', 7.0)):
+            influencer_perc = round(base + month / 10, 2)
+            detractor_perc = round(20.0 + month / 10, 2)
+            rows.append(NexScore(
+                market=market, region=region,
+                influencer_count=1000 * month, detractor_count=4000 + month, neutral_count=15000 - month,
+                total=20000,
+                influencer_perc=influencer_perc, detractor_perc=detractor_perc,
+                neutral_perc=round(100 - influencer_perc - detractor_perc, 2),
+                update_date=date(2024, month, day)
+            ))
+    return rows
+
+
+def create_seeded_app(config_class=SQLiteConfig, rows=None):
+    app = create_app(config_class)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(seed_rows() if rows is None else rows)
+        db.session.commit()
+    return app
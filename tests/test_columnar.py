@@ -0,0 +1,77 @@
+import json
+import unittest
+from io import BytesIO
+
+import pyarrow as pa # type: ignore
+import pyarrow.parquet as pq # type: ignore
+
+from sqlite_app import create_seeded_app, seed_rows
+
+
+class TestColumnarFormats(unittest.TestCase):
+    def setUp(self):
+        """Set up a seeded SQLite app."""
+        self.app = create_seeded_app()
+        self.client = self.app.test_client()
+
+    def test_export_columns_json(self):
+        """format=columns returns one array per column."""
+        response = self.client.get('/nex-score/excel?format=columns&market=SEATTLE')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/vnd.nex-score.columns+json')
+
+        body = response.get_json(force=True)
+        self.assertEqual(body['columns'][:3], ['id', 'market', 'region'])
+        columns = dict(zip(body['columns'], body['data']))
+        self.assertEqual(columns['market'], ['SEATTLE'] * 3)
+        self.assertEqual(columns['update_date'], ['2024-02-23', '2024-03-23', '2024-04-23'])
+
+    def test_export_columns_json_streams(self):
+        """The columns export streams the same body across chunks, and for no rows."""
+        self.app.config['NEX_SCORE_EXPORT_CHUNK_SIZE'] = 2
+        response = self.client.get('/nex-score/excel?format=columns&fields=market,influencer_perc,update_date')
+        self.assertTrue(response.is_streamed)
+        body = json.loads(response.get_data())
+        self.assertEqual(body['columns'], ['market', 'influencer_perc', 'update_date'])
+        self.assertEqual(body['data'][0], [row.market for row in seed_rows()])
+        self.assertEqual(body['data'][2], [row.update_date.isoformat() for row in seed_rows()])
+
+        empty = self.client.get('/nex-score/excel?format=columns&fields=market&region=NOWHERE')
+        self.assertEqual(json.loads(empty.get_data()), {'columns': ['market'], 'data': [[]]})
+
+    def test_export_arrow_from_accept_header(self):
+        """An Arrow Accept header selects the IPC stream with NexScore column types."""
+        response = self.client.get('/nex-score/excel?region=CENTRAL',
+                                   headers={'Accept': 'application/vnd.apache.arrow.stream'})
+        self.assertEqual(response.status_code, 200)
+
+        table = pa.ipc.open_stream(response.data).read_all()
+        self.assertEqual(table.num_rows, 6)
+        self.assertEqual(table.schema.field('update_date').type, pa.date32())
+        self.assertEqual(table.schema.field('total').type, pa.int32())
+        self.assertTrue(pa.types.is_dictionary(table.schema.field('market').type))
+
+    def test_export_parquet(self):
+        """format=parquet returns a readable Parquet file."""
+        response = self.client.get('/nex-score/excel?format=parquet')
+        table = pq.read_table(BytesIO(response.data))
+        self.assertEqual(table.num_rows, 9)
+        self.assertEqual(table.column('influencer_perc').type, pa.float64())
+
+    def test_read_endpoints_honor_accept(self):
+        """/trends and /market-region/ return columnar forms on request."""
+        response = self.client.get('/nex-score/trends?region=CENTRAL',
+                                   headers={'Accept': 'application/vnd.nex-score.columns+json'})
+        body = response.get_json(force=True)
+        columns = dict(zip(body['columns'], body['data']))
+        self.assertEqual(columns['label'], ["FEB'24", "MAR'24", "APR'24"])
+
+        response = self.client.get('/market-region/', headers={'Accept': 'application/vnd.apache.parquet'})
+        self.assertEqual(pq.read_table(BytesIO(response.data)).num_rows, 3)
+
+        response = self.client.get('/nex-score/trends?region=CENTRAL', headers={'Accept': '*/*'})
+        self.assertEqual(len(response.json['data']), 3)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
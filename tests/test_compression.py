@@ -0,0 +1,111 @@
+import gzip
+import unittest
+import zlib
+from unittest.mock import patch
+
+from app import create_app
+from app.native import handle_native
+from sqlite_app import SQLiteConfig, create_seeded_app
+
+TREE_URL = '/nex-score/?type=all&view=tree'
+
+
+class SmallThresholdConfig(SQLiteConfig):
+    NEX_SCORE_COMPRESSION_MIN_BYTES = 200
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        """Set up a seeded SQLite app that compresses bodies from 200 bytes."""
+        self.app = create_seeded_app(SmallThresholdConfig)
+        self.client = self.app.test_client()
+
+    def get(self, url, encoding):
+        return self.client.get(url, headers={'Accept-Encoding': encoding})
+
+    def test_gzip_and_deflate(self):
+        """The tree is compressed with the negotiated encoding and decodes to the plain body."""
+        plain = self.client.get(TREE_URL)
+        self.assertNotIn('Content-Encoding', plain.headers)
+
+        response = self.get(TREE_URL, 'gzip')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.data), plain.data)
+        self.assertLess(len(response.data), len(plain.data))
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertNotEqual(response.headers['ETag'], plain.headers['ETag'])
+
+        head = self.client.head(TREE_URL, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(head.data, b'')
+        self.assertEqual(head.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(head.headers['ETag'], response.headers['ETag'])
+        self.assertEqual(int(head.headers['Content-Length']), len(response.data))
+
+        response = self.get(TREE_URL, 'gzip;q=0.5, deflate')
+        self.assertEqual(response.headers['Content-Encoding'], 'deflate')
+        self.assertEqual(zlib.decompress(response.data), plain.data)
+
+    def test_brotli_when_installed(self):
+        """br is preferred when the client accepts it and Brotli is installed."""
+        try:
+            import brotli # type: ignore
+        except ImportError:
+            self.skipTest('Brotli is not installed')
+        response = self.get(TREE_URL, 'gzip, deflate, br')
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.data), self.client.get(TREE_URL).data)
+
+    def test_small_and_refused_bodies_stay_plain(self):
+        """Bodies under the threshold and identity-only clients get no encoding."""
+        response = self.get('/nex-score/percentage?region=WEST', 'gzip')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertNotIn('Content-Encoding', self.get(TREE_URL, 'identity').headers)
+        self.assertNotIn('Content-Encoding', self.get(TREE_URL, 'gzip;q=0').headers)
+
+    def test_cache_hits_are_stored_compressed(self):
+        """A cache hit returns the stored gzip body without compressing again."""
+        first = self.get(TREE_URL, 'gzip')
+        with patch('app.compression.compress_body') as compress_body:
+            second = self.get(TREE_URL, 'gzip')
+        compress_body.assert_not_called()
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second.headers['Content-Encoding'], 'gzip')
+        # Plain clients get their own entry
+        self.assertNotIn('Content-Encoding', self.client.get(TREE_URL).headers)
+
+    def test_conditional_request_per_encoding(self):
+        """The gzip ETag revalidates to a 304."""
+        etag = self.get(TREE_URL, 'gzip').headers['ETag']
+        response = self.client.get(TREE_URL, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_streamed_csv_is_compressed(self):
+        """A streamed export is compressed chunk by chunk."""
+        plain = self.client.get('/nex-score/excel?format=csv').data
+        response = self.get('/nex-score/excel?format=csv', 'gzip')
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.data), plain)
+
+    def test_native_handler_matches(self):
+        """The Functions/ASGI path sends the same encoded body and ETag."""
+        expected = self.get('/nex-score/?type=all', 'gzip')
+        status, headers, body = handle_native(self.app, 'GET', '/nex-score/', {'type': 'all'}, {'accept-encoding': 'gzip'})
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), gzip.decompress(expected.data))
+        self.assertEqual(headers['ETag'], expected.headers['ETag'])
+
+    def test_encodings_setting(self):
+        """An empty list turns compression off; unknown encodings are rejected."""
+        app = create_seeded_app(type('NoCompression', (SmallThresholdConfig,), {'NEX_SCORE_COMPRESSION_ENCODINGS': ''}))
+        response = app.test_client().get(TREE_URL, headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertNotIn('Accept-Encoding', response.headers.get('Vary', ''))
+        with self.assertRaises(ValueError):
+            create_app(type('Zstd', (SQLiteConfig,), {'NEX_SCORE_COMPRESSION_ENCODINGS': 'zstd'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
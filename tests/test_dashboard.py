@@ -0,0 +1,99 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from app import db
+from app.controller import nex_score_controller
+from app.fanout import fanout_workers
+from config import LocalConfig
+from sqlite_app import create_seeded_app
+
+
+class TestDashboard(unittest.TestCase):
+    def setUp(self):
+        """Set up a seeded in-memory SQLite app."""
+        self.app = create_seeded_app()
+        self.client = self.app.test_client()
+
+    def test_sections_match_standalone_endpoints(self):
+        """Each section is what the page would have fetched on its own."""
+        response = self.client.get('/nex-score/dashboard?region=CENTRAL&market=ARKANSAS')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+
+        for type_param in ('influencer', 'detractor', 'neutral'):
+            expected = self.client.get(f'/nex-score/?type={type_param}&region=CENTRAL').get_json()
+            self.assertEqual(data[type_param], expected)
+        self.assertEqual(data['percentage'], self.client.get('/nex-score/percentage?region=CENTRAL').get_json())
+        self.assertEqual(data['trends'],
+                         self.client.get('/nex-score/trends?region=CENTRAL&market=ARKANSAS').get_json())
+        self.assertEqual(data['market_region'], self.client.get('/market-region/').get_json())
+
+    def test_type_views_share_one_latest_scan(self):
+        """influencer, detractor and neutral come from a single query."""
+        with patch.object(nex_score_controller, '_latest_rows_from_db',
+                          wraps=nex_score_controller._latest_rows_from_db) as scan:
+            self.client.get('/nex-score/dashboard')
+        scan.assert_called_once()
+
+    def test_section_without_data(self):
+        """A section that finds nothing reports its own 404."""
+        data = self.client.get('/nex-score/dashboard?market=NOWHERE').get_json()
+        self.assertEqual(data['trends'], {'message': 'No data found', 'status': 404})
+        self.assertNotIn('status', data['percentage'])
+
+    def test_invalid_timeframe(self):
+        response = self.client.get('/nex-score/dashboard?timeframe=weekly')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json, {'error': 'Invalid period parameter'})
+
+
+class TestFanout(unittest.TestCase):
+    def setUp(self):
+        """Set up a seeded app on a SQLite file with a QueuePool."""
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+
+        class PoolConfig(LocalConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{self.path}'
+            NEX_SCORE_RESPONSE_CACHE = 'none'
+
+        self.app = create_seeded_app(PoolConfig)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        os.remove(self.path)
+
+    def test_workers_bounded_by_pool(self):
+        """The fan-out never needs more connections than the pool allows."""
+        self.assertEqual(fanout_workers(self.app), 4)
+        self.app.config['NEX_SCORE_FANOUT_WORKERS'] = 16
+        self.assertEqual(fanout_workers(self.app), 9)
+        self.app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**self.app.config['SQLALCHEMY_ENGINE_OPTIONS'], 'max_overflow': 2}
+        self.assertEqual(fanout_workers(self.app), 6)
+        self.assertEqual(fanout_workers(create_seeded_app()), 1)
+
+    def test_sub_queries_run_on_the_pool(self):
+        """Sub-queries run on the fan-out threads with their own sessions."""
+        threads = []
+        get_perc_data = nex_score_controller.get_perc_data
+
+        def record_thread(region):
+            threads.append(threading.current_thread().name)
+            return get_perc_data(region)
+
+        with patch('app.controller.dashboard_controller.get_perc_data', side_effect=record_thread):
+            response = self.client.get('/nex-score/dashboard?region=WEST')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['percentage'], self.client.get('/nex-score/percentage?region=WEST').json)
+        self.assertTrue(threads[0].startswith('nex-score-fanout'))
+        self.assertEqual(self.client.get('/ops/pool').json['metrics']['timeouts'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
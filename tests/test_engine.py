@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import exc
+
+from app import db
+from app.engine import InstrumentedQueuePool, _statement_timeout_sql
+from config import LocalConfig, ProductionConfig, ServerlessConfig, get_config
+from sqlite_app import create_seeded_app
+
+
+class TestProfiles(unittest.TestCase):
+    def test_profile_from_environment(self):
+        """NEX_SCORE_PROFILE selects the config class."""
+        with patch.dict(os.environ, {'NEX_SCORE_PROFILE': 'serverless'}):
+            self.assertIs(get_config(), ServerlessConfig)
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertIs(get_config(), ProductionConfig)
+        with self.assertRaises(ValueError):
+            get_config('nope')
+
+    def test_mysql_profiles_recycle_and_pre_ping(self):
+        """MySQL profiles recycle before the Azure idle cutoff and pre-ping."""
+        for profile in ('production', 'read-heavy', 'serverless'):
+            options = get_config(profile).SQLALCHEMY_ENGINE_OPTIONS
+            self.assertTrue(options['pool_pre_ping'], profile)
+            self.assertLessEqual(options['pool_recycle'], 240, profile)
+
+    def test_statement_timeout_sql(self):
+        self.assertEqual(_statement_timeout_sql('mysql', 30000), 'SET SESSION max_execution_time = 30000')
+        self.assertEqual(_statement_timeout_sql('postgresql', 500), 'SET statement_timeout = 500')
+        self.assertIsNone(_statement_timeout_sql('sqlite', 500))
+
+
+class TestPoolMetrics(unittest.TestCase):
+    def setUp(self):
+        """Set up a seeded app on a SQLite file with a small QueuePool."""
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+
+        class PoolConfig(LocalConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{self.path}'
+            SQLALCHEMY_ENGINE_OPTIONS = {'pool_size': 1, 'max_overflow': 0, 'pool_timeout': 1}
+
+        self.app = create_seeded_app(PoolConfig)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        os.remove(self.path)
+
+    def test_checkouts_are_reported(self):
+        """/ops/pool shows the instrumented pool and its checkout counters."""
+        self.client.get('/market-region/')
+        stats = self.client.get('/ops/pool').json
+
+        self.assertEqual(stats['profile'], 'local')
+        self.assertEqual(stats['pool_class'], InstrumentedQueuePool.__name__)
+        self.assertEqual(stats['size'], 1)
+        self.assertGreater(stats['metrics']['checkouts'], 0)
+        self.assertEqual(stats['metrics']['connects'], 1)
+
+    def test_ops_endpoints_setting(self):
+        """/ops is off in the production profiles and a 404 when turned off."""
+        for profile in ('production', 'read-heavy', 'serverless'):
+            self.assertFalse(get_config(profile).NEX_SCORE_OPS_ENDPOINTS, profile)
+        self.assertTrue(LocalConfig.NEX_SCORE_OPS_ENDPOINTS)
+
+        self.app.config['NEX_SCORE_OPS_ENDPOINTS'] = False
+        for path in ('/ops/pool', '/ops/cache'):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 404, path)
+            self.assertEqual(response.json, {'message': 'Ops endpoints are disabled'})
+
+    def test_exhausted_pool_counts_waits_and_timeouts(self):
+        """A checkout with no idle connection and no overflow left is a wait."""
+        with self.app.app_context():
+            engine = db.engine
+            held = engine.connect()
+            try:
+                with self.assertRaises(exc.TimeoutError):
+                    engine.connect()
+            finally:
+                held.close()
+            metrics = engine.pool.metrics.as_dict()
+
+        self.assertEqual(metrics['timeouts'], 1)
+        self.assertEqual(metrics['waits'], 1)
+        self.assertGreaterEqual(metrics['wait_seconds_max'], 0.9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import csv
+import unittest
+from io import BytesIO, StringIO
+
+from openpyxl import load_workbook # type: ignore
+
+from sqlite_app import SQLiteConfig, create_seeded_app
+
+
+class SmallChunkConfig(SQLiteConfig):
+    NEX_SCORE_EXPORT_CHUNK_SIZE = 2
+
+
+class TestExcelExport(unittest.TestCase):
+    def setUp(self):
+        """Set up a seeded SQLite app with tiny export chunks."""
+        self.app = create_seeded_app(SmallChunkConfig)
+        self.client = self.app.test_client()
+
+    def test_csv_streams_in_chunks(self):
+        """GET /nex-score/excel?format=csv streams the header first, then row chunks."""
+        response = self.client.get('/nex-score/excel?format=csv&region=CENTRAL')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertTrue(response.is_streamed)
+
+        chunks = list(response.response)
+        self.assertTrue(chunks[0].decode().startswith('id,market,region'))
+        self.assertEqual(len(chunks), 1 + 3)  # header + 6 rows in chunks of 2
+
+        rows = list(csv.DictReader(StringIO(b''.join(chunks).decode())))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual({row['region'] for row in rows}, {'CENTRAL'})
+        self.assertEqual(rows[0]['update_date'], '2024-02-23')
+
+    def test_xlsx_is_a_workbook(self):
+        """GET /nex-score/excel?format=xlsx returns a real workbook."""
+        response = self.client.get('/nex-score/excel?format=xlsx&market=SEATTLE')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment; filename=nex_score.xlsx', response.headers['Content-Disposition'])
+
+        sheet = load_workbook(BytesIO(response.data), read_only=True)['nex_score']
+        rows = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(rows[0][:3], ('id', 'market', 'region'))
+        self.assertEqual(len(rows), 1 + 3)
+        self.assertEqual(rows[1][1], 'SEATTLE')
+
+    def test_json_is_default(self):
+        """Without a format the endpoint still returns the JSON list."""
+        response = self.client.get('/nex-score/excel?market=SEATTLE')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), 3)
+
+    def test_invalid_format(self):
+        """An unknown format is rejected."""
+        response = self.client.get('/nex-score/excel?format=pdf')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['error'], 'Invalid format parameter')
+
+
+class SmallPageConfig(SQLiteConfig):
+    NEX_SCORE_EXPORT_MAX_PAGE_SIZE = 5
+
+
+class TestExcelPages(unittest.TestCase):
+    def setUp(self):
+        """Set up a seeded SQLite app (9 rows) with a page size cap of 5."""
+        self.app = create_seeded_app(SmallPageConfig)
+        self.client = self.app.test_client()
+
+    def walk(self, query):
+        pages = []
+        response = self.client.get(f'/nex-score/excel?{query}')
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json['data'])
+            if response.json['next_cursor'] is None:
+                return pages
+            response = self.client.get(f"/nex-score/excel?{query}&cursor={response.json['next_cursor']}")
+
+    def test_keyset_pages_cover_every_row_once(self):
+        """limit/cursor pages through the rows in (update_date, id) order."""
+        pages = self.walk('limit=4')
+        self.assertEqual([len(page) for page in pages], [4, 4, 1])
+        rows = [row for page in pages for row in page]
+        self.assertEqual(rows, sorted(self.client.get('/nex-score/excel').json,
+                                      key=lambda row: (row['update_date'], row['id'])))
+
+    def test_limit_is_capped_and_filters_apply(self):
+        """limit above NEX_SCORE_EXPORT_MAX_PAGE_SIZE is capped; region still filters."""
+        self.assertEqual([len(page) for page in self.walk('limit=100')], [5, 4])
+        self.assertEqual([len(page) for page in self.walk('limit=100&region=WEST')], [3])
+
+    def test_fields_select_columns(self):
+        """fields= narrows every format to the named columns."""
+        response = self.client.get('/nex-score/excel?market=SEATTLE&fields=market,influencer_perc,update_date')
+        self.assertEqual(response.json[0], {'market': 'SEATTLE', 'influencer_perc': 7.2, 'update_date': '2024-02-23'})
+
+        response = self.client.get('/nex-score/excel?format=csv&market=SEATTLE&fields=region,total')
+        self.assertEqual(response.data.decode().splitlines(), ['region,total'] + ['WEST,20000'] * 3)
+
+        response = self.client.get('/nex-score/excel?format=columns&fields=market&limit=2')
+        self.assertEqual(response.json['columns'], ['market'])
+        self.assertEqual(response.json['data'], [['ARKANSAS', 'CINCINNATI']])
+        self.assertIsNotNone(response.json['next_cursor'])
+
+    def test_invalid_parameters(self):
+        """Unknown fields, bad limits or cursors and paging a streamed format are 400s."""
+        cases = [
+            ('fields=market,password', 'Invalid fields parameter'),
+            ('limit=0', 'Invalid limit parameter'),
+            ('limit=ten', 'Invalid limit parameter'),
+            ('cursor=not-a-cursor', 'Invalid cursor parameter'),
+            ('format=csv&limit=2', 'limit and cursor need format=json or columns')
+        ]
+        for query, error in cases:
+            response = self.client.get(f'/nex-score/excel?{query}')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json, {'error': error})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
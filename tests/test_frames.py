@@ -0,0 +1,49 @@
+import unittest
+
+import numpy as np
+import pandas as pd # type: ignore
+
+from app.controller.nex_score_controller import SCORE_COLUMNS
+from app.frames import load_frame
+from app.models.nex_score import NexScore
+from app.schemas import nex_score_schema
+from sqlite_app import create_seeded_app
+
+
+class TestLoadFrame(unittest.TestCase):
+    def setUp(self):
+        """Set up a seeded SQLite app and push its context."""
+        self.app = create_seeded_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        """Remove the app context."""
+        self.app_context.pop()
+
+    def test_typed_columns(self):
+        """Columns come back typed from their SQL types."""
+        df = load_frame(NexScore.query.filter(NexScore.region == 'WEST'), SCORE_COLUMNS)
+        self.assertEqual(len(df), 3)
+        self.assertEqual(df['update_date'].dtype, np.dtype('datetime64[ns]'))
+        self.assertEqual(df['influencer_perc'].dtype, np.float64)
+        self.assertEqual(df['influencer_count'].dtype, np.int64)
+
+    def test_matches_schema_path(self):
+        """The fast path yields the same values as dump + DataFrame + to_datetime."""
+        query = NexScore.query.order_by(NexScore.update_date.asc(), NexScore.id.asc())
+        expected = pd.DataFrame(nex_score_schema.dump(query.all()))
+        expected['update_date'] = pd.to_datetime(expected['update_date'])
+        names = [column.key for column in SCORE_COLUMNS]
+
+        pd.testing.assert_frame_equal(load_frame(query, SCORE_COLUMNS), expected[names])
+
+    def test_empty_result_keeps_columns(self):
+        """An empty result is an empty frame with the requested columns."""
+        df = load_frame(NexScore.query.filter(NexScore.market == 'NOWHERE'), SCORE_COLUMNS)
+        self.assertTrue(df.empty)
+        self.assertEqual(list(df.columns), [column.key for column in SCORE_COLUMNS])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,111 @@
+import unittest
+from datetime import date
+
+from sqlalchemy.dialects import mysql, postgresql
+
+from app import db
+from app.hierarchy import _latest_from_table, rollup_statement
+from app.latest import refresh_latest
+from app.models.nex_score import NexScore
+from app.utils import organize_data_by_region
+from sqlite_app import SQLiteConfig, create_seeded_app, seed_rows
+
+
+class SnapshotConfig(SQLiteConfig):
+    NEX_SCORE_BACKEND = 'snapshot'
+
+
+def weighted_rows():
+    rows = seed_rows()
+    # Twice the respondents of the other WEST market, so it weighs double
+    rows.append(NexScore(
+        market='PORTLAND', region='WEST',
+        influencer_count=4000, detractor_count=8000, neutral_count=28000, total=40000,
+        influencer_perc=10.0, detractor_perc=20.0, neutral_perc=70.0,
+        update_date=date(2024, 3, 23)
+    ))
+    return rows
+
+
+class TestHierarchy(unittest.TestCase):
+    def setUp(self):
+        """Set up a seeded app with markets of different sizes."""
+        self.app = create_seeded_app(rows=weighted_rows())
+        self.client = self.app.test_client()
+
+    def test_tree_levels_are_count_weighted(self):
+        """Region and national nodes weight each market by its total."""
+        response = self.client.get('/nex-score/?view=tree')
+        self.assertEqual(response.status_code, 200)
+        national = response.json['data']
+
+        self.assertEqual((national['label'], national['level']), ('NATIONAL', 'national'))
+        self.assertEqual(national['total'], 100000)
+        self.assertEqual(national['count'], 16000)
+        self.assertEqual(national['value'], round((5.4 + 6.4 + 7.4) * 0.2 + 10.0 * 0.4, 2))
+        self.assertEqual(national['update_date'], '2024-04-23')
+
+        central, west = national['children']
+        self.assertEqual((central['label'], west['label']), ('CENTRAL', 'WEST'))
+        self.assertEqual(central['value'], 5.9)
+        self.assertEqual(west['value'], round((7.4 + 2 * 10.0) / 3, 2))
+        self.assertEqual([leaf['label'] for leaf in west['children']], ['PORTLAND', 'SEATTLE'])
+
+    def test_leaves_match_flat_view(self):
+        """Market leaves are the entries the flat view returns."""
+        tree = self.client.get('/nex-score/?view=tree&type=detractor').json['data']
+        flat = self.client.get('/nex-score/?type=detractor').json['data']
+
+        for region in tree['children']:
+            expected = next(group['children'] for group in flat if group['label'] == region['label'])
+            self.assertEqual(region['children'], sorted(expected, key=lambda entry: entry['label']))
+
+    def test_latest_table_and_history_agree(self):
+        """The tree reads nex_score_latest when populated and falls back to the self-join."""
+        before = self.client.get('/nex-score/?view=tree&type=all').json
+        with self.app.app_context():
+            refresh_latest()
+            db.session.commit()
+        after = self.client.get('/nex-score/?view=tree&type=all&_=1').json
+        self.assertEqual(before, after)
+        self.assertEqual(sorted(after['data']), ['detractor', 'influencer', 'neutral'])
+
+    def test_region_filter(self):
+        national = self.client.get('/nex-score/?view=tree&region=WEST').json['data']
+        self.assertEqual([region['label'] for region in national['children']], ['WEST'])
+        self.assertEqual(national['value'], national['children'][0]['value'])
+
+    def test_invalid_view_and_type(self):
+        self.assertEqual(self.client.get('/nex-score/?view=graph').status_code, 400)
+        self.assertEqual(self.client.get('/nex-score/?view=tree&type=promoter').status_code, 400)
+
+    def test_snapshot_backend_matches_database(self):
+        snapshot = create_seeded_app(SnapshotConfig, rows=weighted_rows()).test_client()
+        self.assertEqual(snapshot.get('/nex-score/?view=tree&type=all').json,
+                         self.client.get('/nex-score/?view=tree&type=all').json)
+
+    def test_empty_table(self):
+        client = create_seeded_app(rows=[]).test_client()
+        self.assertIsNone(client.get('/nex-score/?view=tree').json['data'])
+
+
+class TestRollupStatement(unittest.TestCase):
+    def compile(self, dialect):
+        return str(rollup_statement(_latest_from_table(None), ['influencer'], dialect.name).compile(dialect=dialect))
+
+    def test_grouping_per_dialect(self):
+        self.assertIn('GROUP BY anon_1.region, anon_1.market WITH ROLLUP', self.compile(mysql.dialect()))
+        self.assertIn('GROUP BY ROLLUP(anon_1.region, anon_1.market)', self.compile(postgresql.dialect()))
+
+
+class TestOrganizeDataByRegion(unittest.TestCase):
+    def test_groups_entries_in_region_order(self):
+        data = [{'label': 'A', 'region': 'WEST'}, {'label': 'B', 'region': 'CENTRAL'}, {'label': 'C', 'region': 'WEST'}]
+        self.assertEqual(organize_data_by_region(['WEST', 'CENTRAL'], data), [
+            {'label': 'WEST', 'children': [data[0], data[2]]},
+            {'label': 'CENTRAL', 'children': [data[1]]}
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
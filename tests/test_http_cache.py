@@ -0,0 +1,73 @@
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from app import db
+from app.models.nex_score import NexScore
+from app.versioning import invalidate_data_version
+from sqlite_app import create_seeded_app
+
+
+class TestConditionalRequests(unittest.TestCase):
+    def setUp(self):
+        """Set up a seeded SQLite app."""
+        self.app = create_seeded_app()
+        self.client = self.app.test_client()
+
+    def test_validators_on_read_endpoints(self):
+        """Read endpoints carry ETag, Last-Modified and Cache-Control."""
+        for url in ('/nex-score/?region=WEST', '/market-region/', '/nex-score/trends?market=SEATTLE&region=WEST'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertTrue(response.headers.get('ETag'), url)
+            self.assertEqual(response.headers['Last-Modified'], 'Tue, 23 Apr 2024 00:00:00 GMT')
+            self.assertIn('must-revalidate', response.headers['Cache-Control'])
+
+    def test_if_none_match_returns_304_without_running_the_view(self):
+        """A matching If-None-Match is answered before the controller runs."""
+        etag = self.client.get('/nex-score/?region=WEST').headers['ETag']
+
+        with patch('app.routes.nex_score_routes.get_nex_score_data') as view:
+            response = self.client.get('/nex-score/?region=WEST', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertEqual(response.data, b'')
+        view.assert_not_called()
+
+    def test_if_modified_since(self):
+        """If-Modified-Since at or after the newest update_date gives a 304."""
+        response = self.client.get('/market-region/', headers={'If-Modified-Since': 'Tue, 23 Apr 2024 00:00:00 GMT'})
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get('/market-region/', headers={'If-Modified-Since': 'Mon, 22 Apr 2024 00:00:00 GMT'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_changes_with_data_and_representation(self):
+        """New rows and a different Accept header both change the ETag."""
+        etag = self.client.get('/market-region/').headers['ETag']
+        arrow_etag = self.client.get('/market-region/', headers={'Accept': 'application/vnd.apache.arrow.stream'}).headers['ETag']
+        self.assertNotEqual(etag, arrow_etag)
+
+        with self.app.app_context():
+            # An older backfill leaves max(update_date) alone but changes the row count
+            db.session.add(NexScore(market='SEATTLE', region='WEST',
+                                    influencer_count=1, detractor_count=1, neutral_count=1, total=3,
+                                    influencer_perc=1.0, detractor_perc=1.0, neutral_perc=1.0,
+                                    update_date=date(2024, 1, 23)))
+            db.session.commit()
+            invalidate_data_version(self.app)
+
+        response = self.client.get('/market-region/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_version_failure_does_not_break_routes(self):
+        """If the version query fails the route still answers, without validators."""
+        with patch('app.http_cache.current_data_version', side_effect=Exception('Database Error')):
+            response = self.client.get('/market-region/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from email.utils import parsedate_to_datetime
+from io import BytesIO
+
+from openpyxl import Workbook # type: ignore
+from sqlalchemy import text
+
+from app import db
+from app.ingest import ingest
+from app.models.nex_score import NexScore
+from app.models.nex_score_latest import NexScoreLatest
+from sqlite_app import SQLiteConfig, create_seeded_app
+
+HEADER = 'market,Region,Detractor_Count,Neutral_Count,Influencer_Count,total,Detractor_perc,Neutral_perc,Influencer_perc,Update_Date_Str\n'
+BATCH = (
+    HEADER
+    + 'SEATTLE,WEST,4005,14995,5000,24000,16.69,62.48,20.83,05/23/2024\n'
+    + 'ARKANSAS,CENTRAL,4005,14995,5000,24000,16.69,62.48,20.83,05/23/2024\n'
+)
+
+
+class IngestConfig(SQLiteConfig):
+    NEX_SCORE_INGEST_TOKEN = 'secret'
+
+
+class TestIngest(unittest.TestCase):
+    def setUp(self):
+        """Set up a seeded SQLite app with ingestion enabled."""
+        self.app = create_seeded_app(IngestConfig)
+        self.client = self.app.test_client()
+
+    def _post(self, body, token='secret', **kwargs):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        return self.client.post('/nex-score/ingest', data=body, headers=headers, **kwargs)
+
+    def test_csv_upsert_is_idempotent(self):
+        """Loading the same batch twice leaves one row per market/region/date."""
+        with self.app.app_context():
+            for _ in range(2):
+                result = ingest(BytesIO(BATCH.encode()), 'csv')
+                db.session.commit()
+            self.assertEqual(result.rows, 2)
+            self.assertEqual(result.update_dates, [date(2024, 5, 23)])
+            self.assertEqual(NexScore.query.filter_by(update_date=date(2024, 5, 23)).count(), 2)
+
+            updated = BATCH.replace('20.83,05/23', '21.5,05/23')
+            ingest(BytesIO(updated.encode()), 'csv')
+            db.session.commit()
+            row = NexScore.query.filter_by(market='SEATTLE', update_date=date(2024, 5, 23)).one()
+            self.assertEqual(row.influencer_perc, 21.5)
+
+            # nex_score_latest follows the load
+            latest = db.session.get(NexScoreLatest, ('WEST', 'SEATTLE'))
+            self.assertEqual((latest.update_date, latest.influencer_perc), (date(2024, 5, 23), 21.5))
+
+    def test_endpoint_refreshes_reads(self):
+        """A load through the endpoint is visible to the next read immediately."""
+        self.assertEqual(self.client.get('/nex-score/percentage').json['update_date'], '2024-04-23')
+
+        response = self._post(BATCH, content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {'rows': 2, 'update_dates': ['2024-05-23']})
+
+        self.assertEqual(self.client.get('/nex-score/percentage').json['update_date'], '2024-05-23')
+
+    def test_partial_batch_into_unbuilt_tables(self):
+        """The first load over history loaded by hand builds the derived tables in full."""
+        app = create_seeded_app(type('RollupTrends', (IngestConfig,), {'NEX_SCORE_TREND_SOURCE': 'rollup'}))
+        client = app.test_client()
+        batch = HEADER + 'SEATTLE,WEST,4005,14995,5000,24000,16.69,62.48,20.83,05/23/2024\n'
+        response = client.post('/nex-score/ingest', data=batch, content_type='text/csv',
+                               headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+
+        flat = client.get('/nex-score/?region=CENTRAL').json['data']
+        self.assertEqual([market['label'] for market in flat[0]['children']], ['ARKANSAS', 'CINCINNATI'])
+        tree = client.get('/nex-score/?view=tree').json['data']
+        self.assertEqual(sorted(region['label'] for region in tree['children']), ['CENTRAL', 'WEST'])
+        trend = client.get('/nex-score/trends?region=CENTRAL&market=ARKANSAS').json['data']
+        self.assertEqual([entry['label'] for entry in trend], ["FEB'24", "MAR'24", "APR'24"])
+
+    def test_same_date_correction_changes_the_version(self):
+        """Rewriting values of a loaded date changes the ETag, even when another process loaded it."""
+        app = create_seeded_app(type('NoVersionCache', (IngestConfig,), {'NEX_SCORE_VERSION_CHECK_INTERVAL': 0}))
+        client = app.test_client()
+        url = '/nex-score/trends?region=CENTRAL&market=ARKANSAS'
+        first = client.get(url)
+        etag = first.headers['ETag']
+
+        correction = HEADER + 'ARKANSAS,CENTRAL,4000,14000,2000,20000,20.0,70.0,10.0,04/23/2024\n'
+        with app.app_context():
+            # As the CLI does in its own process: no invalidate_caches() here
+            ingest(BytesIO(correction.encode()), 'csv')
+            db.session.commit()
+
+        response = client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(response.json['data'][-1]['influencer_perc'], 10.0)
+        self.assertNotEqual(response.json, first.json)
+        self.assertGreater(
+            parsedate_to_datetime(response.headers['Last-Modified']),
+            parsedate_to_datetime(first.headers['Last-Modified'])
+        )
+
+    def test_xlsx_upload(self):
+        """A multipart XLSX upload is read like the CSV."""
+        workbook = Workbook()
+        sheet = workbook.active
+        for line in BATCH.splitlines():
+            values = line.split(',')
+            sheet.append(values[:2] + [float(value) if value[0].isdigit() and '/' not in value else value for value in values[2:]])
+        body = BytesIO()
+        workbook.save(body)
+        body.seek(0)
+
+        response = self._post({'file': (body, 'batch.xlsx')}, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['rows'], 2)
+
+    def test_authentication(self):
+        """The endpoint needs the configured bearer token."""
+        self.assertEqual(self._post(BATCH, token=None, content_type='text/csv').status_code, 401)
+        self.assertEqual(self._post(BATCH, token='wrong', content_type='text/csv').status_code, 401)
+
+        disabled = create_seeded_app().test_client()
+        response = disabled.post('/nex-score/ingest', data=BATCH, content_type='text/csv',
+                                 headers={'Authorization': 'Bearer '})
+        self.assertEqual(response.status_code, 403)
+
+    def test_malformed_file_is_rejected_and_rolled_back(self):
+        """A bad chunk fails the whole load with a 400 and nothing is written."""
+        bad = BATCH + 'CINCINNATI,CENTRAL,1,1,1,3,1,1,1,not a date\n'
+        response = self._post(bad, content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+
+        response = self._post(BATCH.replace(',total', ',totals'), content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('total', response.json['error'])
+
+        with self.app.app_context():
+            self.assertEqual(NexScore.query.count(), 9)
+
+    def test_missing_upsert_key_is_reported(self):
+        """A nex_score table created before the unique key refuses to load instead of duplicating rows."""
+        app = create_seeded_app(IngestConfig, rows=[])
+        with app.app_context():
+            db.session.execute(text('DROP TABLE nex_score'))
+            db.session.execute(text(
+                'CREATE TABLE nex_score (id INTEGER PRIMARY KEY, market VARCHAR(50) NOT NULL, region VARCHAR(50) NOT NULL, '
+                'detractor_count INTEGER NOT NULL, neutral_count INTEGER NOT NULL, influencer_count INTEGER NOT NULL, '
+                'total INTEGER NOT NULL, detractor_perc FLOAT NOT NULL, neutral_perc FLOAT NOT NULL, '
+                'influencer_perc FLOAT NOT NULL, update_date DATE NOT NULL)'
+            ))
+            db.session.commit()
+
+        response = app.test_client().post('/nex-score/ingest', data=BATCH, content_type='text/csv',
+                                          headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 500)
+        self.assertIn('uq_nex_score_market_region_date', response.json['error'])
+        with app.app_context():
+            self.assertEqual(NexScore.query.count(), 0)
+
+    def test_cli(self):
+        """flask nex-score ingest loads a file from disk."""
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as output:
+            output.write(BATCH)
+        try:
+            result = self.app.test_cli_runner().invoke(args=['nex-score', 'ingest', path])
+        finally:
+            os.remove(path)
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('2 rows upserted', result.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
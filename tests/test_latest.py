@@ -0,0 +1,142 @@
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from app import db, hierarchy
+from app.controller import nex_score_controller
+from app.ingest import invalidate_caches
+from app.latest import refresh_latest
+from app.models.nex_score import NexScore
+from app.models.nex_score_latest import NexScoreLatest
+from sqlite_app import create_seeded_app
+
+
+def nex_score(market, region, update_date, influencer_perc):
+    return NexScore(
+        market=market, region=region,
+        influencer_count=10, detractor_count=10, neutral_count=80, total=100,
+        influencer_perc=influencer_perc, detractor_perc=10.0, neutral_perc=90.0 - influencer_perc,
+        update_date=update_date
+    )
+
+
+class TestNexScoreLatest(unittest.TestCase):
+    def setUp(self):
+        """Seed the history and build nex_score_latest from it."""
+        self.app = create_seeded_app()
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        refresh_latest()
+        db.session.commit()
+
+    def tearDown(self):
+        """Remove the app context."""
+        self.app_context.pop()
+
+    def latest(self):
+        return {(row.market, row.region): (row.update_date, row.influencer_perc) for row in NexScoreLatest.query.all()}
+
+    def test_rebuild_keeps_newest_row_per_market(self):
+        """Rebuilding leaves one row per market/region at its newest date."""
+        latest = self.latest()
+        self.assertEqual(len(latest), 3)
+        self.assertEqual(latest[('SEATTLE', 'WEST')], (date(2024, 4, 23), 7.4))
+
+    def test_refresh_with_batch_date(self):
+        """A newer batch replaces entries; an older backfill does not regress them."""
+        db.session.add(nex_score('SEATTLE', 'WEST', date(2024, 5, 23), 9.0))
+        db.session.add(nex_score('ARKANSAS', 'CENTRAL', date(2023, 1, 23), 1.0))
+        db.session.add(nex_score('BOSTON', 'NORTHEAST', date(2023, 1, 23), 3.0))
+        db.session.commit()
+
+        refresh_latest(date(2024, 5, 23))
+        refresh_latest(date(2023, 1, 23))
+        db.session.commit()
+
+        latest = self.latest()
+        self.assertEqual(latest[('SEATTLE', 'WEST')], (date(2024, 5, 23), 9.0))
+        self.assertEqual(latest[('ARKANSAS', 'CENTRAL')][0], date(2024, 4, 23))
+        self.assertEqual(latest[('BOSTON', 'NORTHEAST')], (date(2023, 1, 23), 3.0))
+
+    def test_refresh_into_empty_table_rebuilds(self):
+        """A batch refresh of a never-built table keeps the markets outside the batch."""
+        db.session.query(NexScoreLatest).delete()
+        db.session.add(nex_score('SEATTLE', 'WEST', date(2024, 5, 23), 9.0))
+        db.session.commit()
+
+        refresh_latest(date(2024, 5, 23))
+        db.session.commit()
+
+        latest = self.latest()
+        self.assertEqual(len(latest), 3)
+        self.assertEqual(latest[('SEATTLE', 'WEST')], (date(2024, 5, 23), 9.0))
+        self.assertEqual(latest[('ARKANSAS', 'CENTRAL')][0], date(2024, 4, 23))
+
+    def test_endpoint_reads_latest_table(self):
+        """GET /nex-score/ serves what nex_score_latest holds."""
+        db.session.query(NexScoreLatest).filter_by(market='SEATTLE').update({'influencer_perc': 99.0})
+        db.session.commit()
+
+        response = self.client.get('/nex-score/?region=WEST')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['data'][0]['children'][0]['value'], 99.0)
+
+    def test_endpoint_falls_back_to_history_when_table_empty(self):
+        """GET /nex-score/ still answers before nex_score_latest is populated."""
+        db.session.query(NexScoreLatest).delete()
+        db.session.commit()
+
+        response = self.client.get('/nex-score/?region=WEST')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['data'][0]['children'][0]['value'], 7.4)
+
+    def test_unknown_region_does_not_scan_history(self):
+        """A filtered read with no rows in a populated table is not retried on the self-join."""
+        with patch.object(nex_score_controller, '_latest_join_statement') as flat_join, \
+                patch.object(hierarchy, '_latest_from_join') as tree_join:
+            self.assertEqual(self.client.get('/nex-score/?region=NOWHERE').status_code, 200)
+            self.assertEqual(self.client.get('/nex-score/?view=tree&region=NOWHERE').status_code, 200)
+        flat_join.assert_not_called()
+        tree_join.assert_not_called()
+
+    def test_empty_table_is_probed_again_after_a_load(self):
+        """The empty-table fallback is remembered until invalidate_caches()."""
+        db.session.query(NexScoreLatest).delete()
+        db.session.commit()
+        self.client.get('/nex-score/?region=WEST')
+
+        refresh_latest()
+        db.session.query(NexScoreLatest).filter_by(market='SEATTLE').update({'influencer_perc': 99.0})
+        db.session.commit()
+        self.assertEqual(self.client.get('/nex-score/?region=WEST&_=1').json['data'][0]['children'][0]['value'], 7.4)
+
+        invalidate_caches(self.app)
+        self.assertEqual(self.client.get('/nex-score/?region=WEST&_=2').json['data'][0]['children'][0]['value'], 99.0)
+
+    def test_all_types_in_one_query(self):
+        """type=all returns every type's tree from a single latest read."""
+        with patch.object(nex_score_controller, '_latest_rows_from_db',
+                          wraps=nex_score_controller._latest_rows_from_db) as scan:
+            response = self.client.get('/nex-score/?type=all&region=CENTRAL')
+        scan.assert_called_once()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['type'], 'all')
+        self.assertEqual(sorted(response.json['data']), ['detractor', 'influencer', 'neutral'])
+        for type_param, tree in response.json['data'].items():
+            single = self.client.get(f'/nex-score/?type={type_param}&region=CENTRAL').json['data']
+            self.assertEqual(tree, single)
+
+    def test_type_list(self):
+        """A comma list returns only the named types; unknown names are a 400."""
+        response = self.client.get('/nex-score/?type=neutral, influencer')
+        self.assertEqual(sorted(response.json['data']), ['influencer', 'neutral'])
+
+        response = self.client.get('/nex-score/?type=neutral,promoter')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json, {'error': 'Invalid type parameter: neutral,promoter'})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,85 @@
+import re
+import unittest
+from unittest.mock import patch
+
+from flask.json.provider import DefaultJSONProvider
+
+from app.metrics import PhaseTimer, phase, use_timer
+from sqlite_app import SQLiteConfig, create_seeded_app
+
+TRENDS_URL = '/nex-score/trends?region=CENTRAL&timeframe=quarterly'
+
+
+class MetricsConfig(SQLiteConfig):
+    NEX_SCORE_METRICS = True
+
+
+def server_timing(response):
+    return {name: float(value) for name, value in re.findall(r'(\w+);dur=([\d.]+)', response.headers['Server-Timing'])}
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        """Set up a seeded SQLite app with metrics on."""
+        self.app = create_seeded_app(MetricsConfig)
+        self.client = self.app.test_client()
+
+    def test_server_timing_phases(self):
+        """A pandas trend read reports every phase and the total."""
+        timings = server_timing(self.client.get(TRENDS_URL))
+        self.assertEqual(set(timings), {'db', 'dataframe', 'aggregate', 'serialize', 'encode', 'total'})
+        self.assertLessEqual(sum(value for name, value in timings.items() if name != 'total'), timings['total'] + 0.1)
+
+    def test_dashboard_counts_fanout_work(self):
+        """Queries run by the dashboard's fan-out tasks are booked to the request."""
+        timings = server_timing(self.client.get('/nex-score/dashboard?region=CENTRAL'))
+        self.assertIn('db', timings)
+        self.assertIn('aggregate', timings)
+
+    def test_prometheus_text(self):
+        """/metrics has the request counter and per-route histograms; the cache hit runs no phase."""
+        self.client.get(TRENDS_URL)
+        self.client.get(TRENDS_URL)
+        self.client.get('/market-region/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        text = response.get_data(as_text=True)
+        self.assertIn('nex_score_requests_total{route="/nex-score/trends",method="GET",status="200"} 2', text)
+        self.assertIn('# TYPE nex_score_request_phase_seconds histogram', text)
+        self.assertIn('nex_score_request_phase_seconds_bucket{route="/nex-score/trends",phase="db",le="+Inf"} 1', text)
+        self.assertIn('nex_score_request_phase_seconds_count{route="/market-region/",phase="serialize"} 1', text)
+        self.assertRegex(text, r'nex_score_response_size_bytes_bucket\{route="/nex-score/trends",le="1024"\} 2')
+        self.assertIn('nex_score_request_duration_seconds_count{route="/nex-score/trends",method="GET"} 2', text)
+
+    def test_phases_are_exclusive(self):
+        """Time in a nested phase is not counted again in the phase around it."""
+        clock = iter([0.0, 1.0, 2.0, 5.0, 9.0])
+        with patch('app.metrics.time.perf_counter', side_effect=lambda: next(clock)):
+            timer = PhaseTimer()
+            with use_timer(timer):
+                with phase('aggregate'):
+                    with phase('dataframe'):
+                        pass
+        self.assertEqual(timer.seconds, {'dataframe': 3.0, 'aggregate': 5.0})
+
+    def test_server_timing_setting(self):
+        """NEX_SCORE_SERVER_TIMING=False keeps the histograms but drops the header."""
+        app = create_seeded_app(type('NoHeader', (MetricsConfig,), {'NEX_SCORE_SERVER_TIMING': False}))
+        client = app.test_client()
+        self.assertNotIn('Server-Timing', client.get(TRENDS_URL).headers)
+        self.assertIn('route="/nex-score/trends"', client.get('/metrics').get_data(as_text=True))
+
+    def test_disabled(self):
+        """With metrics off nothing is installed and /metrics is a 404."""
+        app = create_seeded_app()
+        client = app.test_client()
+        self.assertNotIn('Server-Timing', client.get(TRENDS_URL).headers)
+        self.assertIs(type(app.json), DefaultJSONProvider)
+        response = client.get('/metrics')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json, {'message': 'Metrics are disabled'})
+
+
+if __name__ == '__main__':
+    unittest.main()
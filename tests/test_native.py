@@ -0,0 +1,82 @@
+import json
+import unittest
+from urllib.parse import parse_qsl, urlsplit
+
+from app.native import handle_native
+from sqlite_app import SQLiteConfig, create_seeded_app
+
+HOT_URLS = [
+    '/nex-score/?region=WEST&type=detractor',
+    '/nex-score/trends?market=SEATTLE&region=WEST',
+    '/nex-score/trends?region=WEST&timeframe=weekly',
+    '/nex-score/percentage?region=CENTRAL',
+    '/market-region/'
+]
+
+
+class TestNativeHandler(unittest.TestCase):
+    def setUp(self):
+        """Set up a seeded SQLite app."""
+        self.app = create_seeded_app()
+        self.client = self.app.test_client()
+
+    def _native(self, url, headers=None):
+        parts = urlsplit(url)
+        return handle_native(self.app, 'GET', parts.path, dict(parse_qsl(parts.query)),
+                             {name.lower(): value for name, value in (headers or {}).items()})
+
+    def test_matches_wsgi_responses(self):
+        """Status, JSON body and validators match the Flask routes."""
+        for url in HOT_URLS:
+            status, headers, body = self._native(url)
+            expected = self.client.get(url)
+            self.assertEqual(status, expected.status_code, url)
+            self.assertEqual(json.loads(body), expected.get_json(), url)
+            self.assertEqual(headers.get('ETag'), expected.headers.get('ETag'), url)
+            self.assertEqual(headers.get('Last-Modified'), expected.headers.get('Last-Modified'), url)
+            self.assertEqual(headers['Access-Control-Allow-Origin'], '*')
+
+    def test_same_bytes_as_jsonify(self):
+        """Native bodies are byte for byte what the Flask routes send."""
+        app = create_seeded_app(type('NoCache', (SQLiteConfig,), {'NEX_SCORE_RESPONSE_CACHE': 'none'}))
+        client = app.test_client()
+        for url in HOT_URLS:
+            parts = urlsplit(url)
+            _, _, body = handle_native(app, 'GET', parts.path, dict(parse_qsl(parts.query)), {})
+            self.assertEqual(body, client.get(url).data, url)
+
+    def test_cors_matches_flask_cors(self):
+        """With an Origin header the CORS headers are the ones CORS(app) sends."""
+        origin = {'Origin': 'https://dashboard.example'}
+        for url in ('/market-region/', '/nex-score/?type=bogus'):
+            status, headers, _ = self._native(url, origin)
+            expected = self.client.get(url, headers=origin)
+            self.assertEqual(headers['Access-Control-Allow-Origin'], expected.headers['Access-Control-Allow-Origin'], url)
+            self.assertIn('Origin', headers['Vary'], url)
+            self.assertIn('Origin', expected.headers.getlist('Vary'), url)
+
+    def test_if_none_match(self):
+        """A matching ETag gets a 304 with no body."""
+        etag = self.client.get('/market-region/').headers['ETag']
+        status, headers, body = self._native('/market-region/', {'If-None-Match': etag})
+        self.assertEqual((status, body), (304, b''))
+        self.assertEqual(headers['ETag'], etag)
+
+    def test_served_from_response_cache(self):
+        """Native responses share the response cache with the WSGI path."""
+        self.client.get('/nex-score/percentage')
+        self._native('/nex-score/percentage')
+        stats = self.client.get('/ops/cache').get_json()
+        self.assertEqual((stats['hits'], stats['entries']), (1, 1))
+
+    def test_falls_back_to_wsgi(self):
+        """Other routes, methods and columnar representations are left to WSGI."""
+        self.assertIsNone(self._native('/nex-score/excel'))
+        self.assertIsNone(self._native('/market-region/?format=arrow'))
+        self.assertIsNone(self._native('/nex-score/trends?market=SEATTLE',
+                                       {'Accept': 'application/vnd.apache.arrow.stream'}))
+        self.assertIsNone(handle_native(self.app, 'POST', '/nex-score/ingest', {}, {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,7 @@ from flask import Flask, Blueprint, jsonify
 from flask.testing import FlaskClient
 from unittest.mock import patch, MagicMock
 from datetime import datetime, timedelta
+import pandas as pd # type: ignore
 
 
 from app import create_app
@@ -58,11 +59,11 @@ class TestTrendAPI(unittest.TestCase):
     #     self.assertIn("error", response.json)
     #     self.assertEqual(response.json["error"], "Internal server error")
 
-    @patch('app.models.nex_score.NexScore.query')
-    def test_get_trend_no_data_found(self, mock_query):
+    @patch('app.controller.nex_score_controller.load_frame')
+    def test_get_trend_no_data_found(self, mock_load_frame):
         """Test GET /nex-score/trends when no data is found."""
-        # Mock NexScore.query.filter().all() to return an empty list
-        mock_query.filter.return_value.all.return_value = []
+        # Mock the row loader to return an empty frame
+        mock_load_frame.return_value = pd.DataFrame()
         
         response = self.client.get('/nex-score/trends?region=CENTRAL&market=CINCINNATI')
         self.assertEqual(response.status_code, 404)
@@ -81,50 +82,28 @@ class TestScoreComparisonAPI(unittest.TestCase):
         """Remove the app context."""
         self.app_context.pop()
 
-    @patch('app.models.nex_score.NexScore.query')
-    def test_get_score_success(self, mock_query):
+    @patch('app.controller.nex_score_controller.load_score_months')
+    def test_get_score_success(self, mock_load_score_months):
         """Test GET /nex-score/score-comparison/ success scenario."""
-        # Create mock NexScore data for April 2024
-        mock_data_apr = NexScore(
-            region="CENTRAL",
-            market="CINCINNATI",
-            influencer_count=29504,
-            detractor_count=105347,
-            neutral_count=385532,
-            influencer_perc=5.6,
-            detractor_perc=20.2,
-            neutral_perc=74.0,
-            update_date=datetime.strptime("2024-04-23", "%Y-%m-%d")
-        )
-
-        # Create mock NexScore data for March 2024
-        mock_data_mar = NexScore(
-            region="CENTRAL",
-            market="CINCINNATI",
-            influencer_count=25000,
-            detractor_count=100000,
-            neutral_count=400000,
-            influencer_perc=5.0,
-            detractor_perc=20.0,
-            neutral_perc=75.0,
-            update_date=datetime.strptime("2024-03-23", "%Y-%m-%d")
-        )
-
-        # Create mock NexScore data for February 2024
-        mock_data_feb = NexScore(
-            region="CENTRAL",
-            market="CINCINNATI",
-            influencer_count=27000,
-            detractor_count=110000,
-            neutral_count=380000,
-            influencer_perc=5.5,
-            detractor_perc=21.0,
-            neutral_perc=73.5,
-            update_date=datetime.strptime("2024-02-23", "%Y-%m-%d")
-        )
-
-        # Mock NexScore.query.filter().all() to return the mock data
-        mock_query.filter().all.return_value = [mock_data_apr, mock_data_mar, mock_data_feb]
+        # Mock the two monthly averages: April 2024 and March 2024
+        mock_load_score_months.return_value = {
+            'current': {
+                'influencer_count': 29504,
+                'detractor_count': 105347,
+                'neutral_count': 385532,
+                'influencer_perc': 5.6,
+                'detractor_perc': 20.2,
+                'neutral_perc': 74.0
+            },
+            'previous': {
+                'influencer_count': 25000,
+                'detractor_count': 100000,
+                'neutral_count': 400000,
+                'influencer_perc': 5.0,
+                'detractor_perc': 20.0,
+                'neutral_perc': 75.0
+            }
+        }
 
         response = self.client.get('/nex-score/score-comparison?region=CENTRAL&market=CINCINNATI&month=APR\'24')
         self.assertEqual(response.status_code, 200)
@@ -175,11 +154,11 @@ class TestScoreComparisonAPI(unittest.TestCase):
         self.assertIn("error", response.json)
         self.assertEqual(response.json["error"], "Month is required")
 
-    @patch('app.models.nex_score.NexScore.query')
-    def test_get_score_no_data_found(self, mock_query):
+    @patch('app.controller.nex_score_controller.load_score_months')
+    def test_get_score_no_data_found(self, mock_load_score_months):
         """Test GET /nex-score/score-comparison when no data is found."""
-        # Mock NexScore.query.filter().all() to return an empty list
-        mock_query.filter().all.return_value = []
+        # Mock a market without any rows
+        mock_load_score_months.return_value = None
         
         response = self.client.get('/nex-score/score-comparison?region=CENTRAL&market=ARKANSAS&month=JUN\'24')
         self.assertEqual(response.status_code, 404)
@@ -188,11 +167,11 @@ class TestScoreComparisonAPI(unittest.TestCase):
         self.assertIn("message", response.json)
         self.assertEqual(response.json["message"], "No data found")
 
-    @patch('app.models.nex_score.NexScore.query')
-    def test_get_score_internal_server_error(self, mock_query):
+    @patch('app.controller.nex_score_controller.load_score_months')
+    def test_get_score_internal_server_error(self, mock_load_score_months):
         """Test GET /nex-score/score-comparison internal server error."""
         # Mock an internal server error in the query
-        mock_query.filter().all.side_effect = Exception("Internal server error")
+        mock_load_score_months.side_effect = Exception("Internal server error")
         
         response = self.client.get('/nex-score/score-comparison?region=CENTRAL&market=ARKANSAS&month=APR\'24')
         self.assertEqual(response.status_code, 500)
@@ -220,23 +199,25 @@ class TestGetPerc(unittest.TestCase):
         self.assertEqual(statuscode,200)
 
 
-    @patch('app.models.nex_score.NexScore.query')
-    def test_get_perc_no_data_found(self, mock_query):
+    @patch('app.controller.nex_score_controller.load_perc_rows')
+    def test_get_perc_no_data_found(self, mock_load_perc_rows):
         """Test get_perc() when no data is found."""
-        # Mock the database query to return no records
-        mock_query.return_value.filter.return_value.all.return_value = []
+        # Mock the aggregate query over no records: one row of NULLs
+        mock_load_perc_rows.return_value = [
+            {'influencer_perc': None, 'detractor_perc': None, 'neutral_perc': None, 'update_date': None}
+        ]
 
         response = self.client.get('/nex-score/percentage?region=CENTRAL')
-        self.assertEqual(response.status_code, 500)
-        # data = response.json
-        # self.assertIn("message", data)
-        # self.assertEqual(data["message"], "No data found")
+        self.assertEqual(response.status_code, 404)
+        data = response.json
+        self.assertIn("message", data)
+        self.assertEqual(data["message"], "No data found")
 
-    @patch('app.models.nex_score.NexScore.query')
-    def test_get_perc_internal_server_error(self, mock_query):
+    @patch('app.controller.nex_score_controller.load_perc_rows')
+    def test_get_perc_internal_server_error(self, mock_load_perc_rows):
         """Test get_perc() with internal server error."""
         # Mock the query to raise an exception
-        mock_query.side_effect = Exception("Internal server error")
+        mock_load_perc_rows.side_effect = Exception("Internal server error")
 
         response = self.client.get('/nex-score/percentage?region=CENTRAL')
         self.assertEqual(response.status_code, 500)  # Ensure the status code is 500
@@ -0,0 +1,80 @@
+import unittest
+from datetime import date
+
+from app import db
+from app.controller.nex_score_controller import perc_breakdown_statement, perc_statement
+from app.models.nex_score import NexScore
+from sqlite_app import SQLiteConfig, create_seeded_app, seed_rows
+
+
+class SnapshotConfig(SQLiteConfig):
+    NEX_SCORE_BACKEND = 'snapshot'
+
+
+def rows_with_newer_central():
+    """Seed rows plus a May batch for CENTRAL only, so the regions' latest dates differ."""
+    rows = seed_rows()
+    rows.append(NexScore(
+        market='ARKANSAS', region='CENTRAL',
+        influencer_count=1, detractor_count=1, neutral_count=1, total=3,
+        influencer_perc=10.0, detractor_perc=30.0, neutral_perc=60.0,
+        update_date=date(2024, 5, 23)
+    ))
+    return rows
+
+
+class TestPercentage(unittest.TestCase):
+    def setUp(self):
+        self.app = create_seeded_app(rows=rows_with_newer_central())
+        self.client = self.app.test_client()
+
+    def test_region_uses_its_own_latest_date(self):
+        """WEST is averaged on its April batch, not on the global May date."""
+        response = self.client.get('/nex-score/percentage?region=WEST')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {
+            'influencer_perc': 7.4, 'detractor_perc': 20.4, 'neutral_perc': 72.2, 'update_date': '2024-04-23'
+        })
+        response = self.client.get('/nex-score/percentage')
+        self.assertEqual(response.json['update_date'], '2024-05-23')
+        self.assertEqual(response.json['influencer_perc'], 10.0)
+
+    def test_breakdown_by_region(self):
+        """breakdown=region returns national plus each region, matching the single calls."""
+        response = self.client.get('/nex-score/percentage?breakdown=region')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['national'], self.client.get('/nex-score/percentage').json)
+        self.assertEqual([entry['region'] for entry in response.json['regions']], ['CENTRAL', 'WEST'])
+        for entry in response.json['regions']:
+            single = self.client.get(f"/nex-score/percentage?region={entry['region']}").json
+            self.assertEqual({key: value for key, value in entry.items() if key != 'region'}, single)
+
+        response = self.client.get('/nex-score/percentage?breakdown=region&region=WEST')
+        self.assertEqual([entry['region'] for entry in response.json['regions']], ['WEST'])
+
+    def test_invalid_breakdown_and_no_data(self):
+        """Unknown breakdowns are a 400; a region without rows is a 404."""
+        response = self.client.get('/nex-score/percentage?breakdown=market')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json, {'error': 'Invalid breakdown parameter'})
+        for url in ('/nex-score/percentage?region=NOWHERE', '/nex-score/percentage?breakdown=region&region=NOWHERE'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.json, {'message': 'No data found'})
+
+    def test_only_aggregate_rows_are_fetched(self):
+        """The statements return one row, or one per region plus national."""
+        with self.app.app_context():
+            self.assertEqual(len(db.session.execute(perc_statement('CENTRAL')).all()), 1)
+            self.assertEqual(len(db.session.execute(perc_breakdown_statement()).all()), 3)
+
+    def test_snapshot_matches_database(self):
+        """The snapshot backend gives the same answers."""
+        snapshot = create_seeded_app(SnapshotConfig, rows=rows_with_newer_central()).test_client()
+        for url in ('/nex-score/percentage', '/nex-score/percentage?region=WEST',
+                    '/nex-score/percentage?breakdown=region', '/nex-score/percentage?breakdown=region&region=CENTRAL'):
+            self.assertEqual(snapshot.get(url).json, self.client.get(url).json)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.response_cache import CachedResponse, MemoryCache, SQLiteCache
+from sqlite_app import SQLiteConfig, create_seeded_app
+
+
+class TestCacheBackends(unittest.TestCase):
+    def setUp(self):
+        """Set up a temporary file for the SQLite backend."""
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+
+    def tearDown(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def _backends(self, max_bytes=10, ttl=60):
+        return [MemoryCache(max_bytes, ttl), SQLiteCache(self.path, max_bytes, ttl)]
+
+    def test_get_and_set(self):
+        """A stored entry is returned as-is and counted as a hit."""
+        for cache in self._backends():
+            entry = CachedResponse(200, [('Content-Type', 'application/json')], b'{}')
+            self.assertIsNone(cache.get('a'))
+            cache.set('a', entry)
+            self.assertEqual(cache.get('a'), entry)
+            self.assertEqual((cache.stats.hits, cache.stats.misses), (1, 1), cache.name)
+
+    def test_least_recently_used_is_evicted_by_bytes(self):
+        """Going over max_bytes drops the least recently read entries."""
+        for cache in self._backends(max_bytes=10):
+            cache.set('a', CachedResponse(200, [], b'aaaa'))
+            cache.set('b', CachedResponse(200, [], b'bbbb'))
+            cache.get('a')
+            cache.set('c', CachedResponse(200, [], b'cccc'))
+
+            self.assertIsNotNone(cache.get('a'), cache.name)
+            self.assertIsNone(cache.get('b'), cache.name)
+            self.assertEqual(cache.stats.evictions, 1)
+            self.assertEqual(cache.info()['bytes'], 8)
+
+    def test_expired_entries_are_misses(self):
+        """Entries past their TTL are dropped on read."""
+        for cache in self._backends(ttl=0):
+            cache.set('a', CachedResponse(200, [], b'a'))
+            self.assertIsNone(cache.get('a'), cache.name)
+            self.assertEqual(cache.stats.hits, 0)
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        """Set up a seeded SQLite app."""
+        self.app = create_seeded_app()
+        self.client = self.app.test_client()
+
+    def test_repeated_request_is_served_from_cache(self):
+        """The second identical request does not reach the controller."""
+        first = self.client.get('/nex-score/?region=WEST&type=detractor')
+        with patch('app.routes.nex_score_routes.get_nex_score_data') as view:
+            second = self.client.get('/nex-score/?type=detractor&region=WEST&market=')
+        view.assert_not_called()
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json, first.json)
+        self.assertEqual(second.headers['ETag'], first.headers['ETag'])
+
+        stats = self.client.get('/ops/cache').json
+        self.assertEqual(stats['backend'], 'memory')
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+
+    def test_errors_are_not_cached(self):
+        """Only 200 responses are stored."""
+        self.client.get('/nex-score/trends?market=SEATTLE&region=WEST&timeframe=bogus')
+        self.assertEqual(self.client.get('/ops/cache').json['entries'], 0)
+
+    def test_disabled(self):
+        """NEX_SCORE_RESPONSE_CACHE=none turns the cache off."""
+        class NoCacheConfig(SQLiteConfig):
+            NEX_SCORE_RESPONSE_CACHE = 'none'
+
+        client = create_seeded_app(NoCacheConfig).test_client()
+        self.assertEqual(client.get('/market-region/').status_code, 200)
+        self.assertEqual(client.get('/ops/cache').json, {'backend': None})
+
+
+if __name__ == '__main__':
+    unittest.main()
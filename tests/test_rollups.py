@@ -0,0 +1,92 @@
+import unittest
+from datetime import date
+
+from app import db
+from app.models.nex_score import NexScore
+from app.models.nex_score_rollup import NexScoreRollup
+from app.rollups import check_rollups, rebuild_rollups, refresh_rollups, period_bounds, TIMEFRAMES
+from sqlite_app import SQLiteConfig, create_seeded_app
+
+
+class RollupConfig(SQLiteConfig):
+    NEX_SCORE_TREND_SOURCE = 'rollup'
+
+
+class TestTrendRollups(unittest.TestCase):
+    def setUp(self):
+        """Seed the same history into a pandas-backed and a rollup-backed app."""
+        self.pandas_app = create_seeded_app()
+        self.app = create_seeded_app(RollupConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        rebuild_rollups()
+        db.session.commit()
+
+    def tearDown(self):
+        """Remove the app context."""
+        self.app_context.pop()
+
+    def test_period_bounds(self):
+        """Periods are half-open month, quarter and year ranges."""
+        self.assertEqual(period_bounds('monthly', date(2024, 12, 5)), (date(2024, 12, 1), date(2025, 1, 1)))
+        self.assertEqual(period_bounds('quarterly', date(2024, 5, 5)), (date(2024, 4, 1), date(2024, 7, 1)))
+        self.assertEqual(period_bounds('yearly', date(2024, 5, 5)), (date(2024, 1, 1), date(2025, 1, 1)))
+
+    def test_trends_match_pandas(self):
+        """GET /nex-score/trends from rollups matches the pandas computation."""
+        pandas_client = self.pandas_app.test_client()
+        for query in ('', 'region=CENTRAL', 'market=SEATTLE', 'region=CENTRAL&market=ARKANSAS'):
+            for timeframe in TIMEFRAMES:
+                url = f'/nex-score/trends?{query}&timeframe={timeframe}'
+                expected = pandas_client.get(url)
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json, expected.json)
+
+    def test_check_rollups_is_clean(self):
+        """The consistency check finds no drift after a rebuild."""
+        for timeframe in TIMEFRAMES:
+            self.assertEqual(check_rollups(None, None, timeframe), [])
+            self.assertEqual(check_rollups('CENTRAL', None, timeframe), [])
+
+    def test_incremental_refresh(self):
+        """Loading a new update_date only needs its periods recomputed."""
+        db.session.add(NexScore(
+            market='SEATTLE', region='WEST',
+            influencer_count=1, detractor_count=1, neutral_count=1, total=3,
+            influencer_perc=10.0, detractor_perc=20.0, neutral_perc=70.0,
+            update_date=date(2024, 4, 30)
+        ))
+        db.session.commit()
+        self.assertNotEqual(check_rollups('WEST', None, 'monthly'), [])
+
+        refresh_rollups(date(2024, 4, 30))
+        db.session.commit()
+
+        for timeframe in TIMEFRAMES:
+            self.assertEqual(check_rollups('WEST', 'SEATTLE', timeframe), [])
+        april = NexScoreRollup.query.filter_by(
+            timeframe='monthly', level='market', market='SEATTLE', period_start=date(2024, 4, 1)
+        ).one()
+        self.assertEqual(april.row_count, 2)
+
+    def test_refresh_into_empty_table_rebuilds(self):
+        """A batch refresh of a never-built table fills every period, not just the batch's."""
+        db.session.query(NexScoreRollup).delete()
+        db.session.commit()
+
+        self.assertEqual(refresh_rollups(date(2024, 4, 23)), 6)
+        db.session.commit()
+        for timeframe in TIMEFRAMES:
+            self.assertEqual(check_rollups(None, None, timeframe), [])
+        self.assertEqual(len(self.client.get('/nex-score/trends?timeframe=monthly').json['data']), 3)
+
+    def test_no_data(self):
+        """Unknown filters return the usual 404."""
+        response = self.client.get('/nex-score/trends?market=NOWHERE')
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
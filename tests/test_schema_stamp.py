@@ -0,0 +1,83 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app import create_app, db
+from app.schema_stamp import schema_version
+from config import LocalConfig
+
+
+class TestSchemaStamp(unittest.TestCase):
+    def setUp(self):
+        """Set up a SQLite file and an empty stamp directory."""
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, 'nex_score.sqlite3')
+
+        class StampConfig(LocalConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+            NEX_SCORE_CREATE_TABLES = 'stamp'
+            NEX_SCORE_SCHEMA_STAMP_DIR = os.path.join(self.directory, 'stamps')
+            NEX_SCORE_SWAGGER = False
+
+        self.config = StampConfig
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _create_all_calls(self):
+        with patch.object(db, 'create_all', wraps=db.create_all) as create_all:
+            app = create_app(self.config)
+        with app.app_context():
+            db.engine.dispose()
+        return create_all.call_count
+
+    def test_create_all_runs_once_per_schema_version(self):
+        """The second start finds a matching stamp and skips create_all."""
+        self.assertEqual(self._create_all_calls(), 1)
+        self.assertEqual(self._create_all_calls(), 0)
+
+        # A model change alters the fingerprint, so the next start creates again
+        with patch('app.schema_stamp.schema_version', return_value='changed'):
+            self.assertEqual(self._create_all_calls(), 1)
+
+    def test_never(self):
+        """NEX_SCORE_CREATE_TABLES=never leaves the schema alone."""
+        self.config.NEX_SCORE_CREATE_TABLES = 'never'
+        self.assertEqual(self._create_all_calls(), 0)
+
+    def test_fingerprint_covers_constraints(self):
+        """The unique key the ingest upsert relies on is part of the version."""
+        version = schema_version()
+        table = db.metadata.tables['nex_score']
+        constraint = next(c for c in table.constraints if c.name == 'uq_nex_score_market_region_date')
+        table.constraints.discard(constraint)
+        try:
+            self.assertNotEqual(schema_version(), version)
+        finally:
+            table.constraints.add(constraint)
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_create_app_does_not_import_heavy_modules(self):
+        """pandas, flasgger and marshmallow stay unloaded until a request needs them."""
+        code = (
+            'import sys\n'
+            'from app import create_app\n'
+            'from config import ServerlessConfig, LocalConfig\n'
+            'class Config(LocalConfig):\n'
+            '    SQLALCHEMY_DATABASE_URI = "sqlite://"\n'
+            '    NEX_SCORE_SWAGGER = ServerlessConfig.NEX_SCORE_SWAGGER\n'
+            'create_app(Config)\n'
+            'print(",".join(m for m in ("pandas", "numpy", "flasgger", "marshmallow_sqlalchemy") if m in sys.modules))\n'
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
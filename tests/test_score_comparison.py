@@ -0,0 +1,143 @@
+import unittest
+from datetime import date
+
+from sqlalchemy.dialects import postgresql
+
+from app.controller.nex_score_controller import parse_month, score_statement
+from app.controller.score_batch_controller import batch_statement
+from app.models.nex_score import NexScore
+from sqlite_app import create_seeded_app, seed_rows
+
+
+class TestScoreComparison(unittest.TestCase):
+    def setUp(self):
+        """Seed February to April 2024 plus an older row that must not be read."""
+        rows = seed_rows()
+        rows.append(NexScore(
+            market='ARKANSAS', region='CENTRAL',
+            influencer_count=1, detractor_count=1, neutral_count=1, total=3,
+            influencer_perc=90.0, detractor_perc=5.0, neutral_perc=5.0,
+            update_date=date(2023, 2, 23)
+        ))
+        self.app = create_seeded_app(rows=rows)
+        self.client = self.app.test_client()
+
+    def get(self, month, market='ARKANSAS'):
+        return self.client.get(f'/nex-score/score-comparison?region=CENTRAL&market={market}&month={month}')
+
+    def test_compares_with_the_calendar_month_before(self):
+        """MAR'24 is compared with FEB'24, not with the next label in string order."""
+        response = self.get("MAR'24")
+        self.assertEqual(response.status_code, 200)
+        data = response.json['data']
+        self.assertEqual(data['current_month'], {
+            'timeframe': "MAR'24",
+            'influencer_perc': 5.3, 'detractor_perc': 20.3, 'neutral_perc': 74.4,
+            'influencer_count': 3000, 'detractor_count': 4003, 'neutral_count': 14997
+        })
+        self.assertEqual(data['differences'], {
+            'timeframe': "MAR'24",
+            'influencer_perc_diff': 0.1, 'detractor_perc_diff': 0.1, 'neutral_perc_diff': -0.2
+        })
+
+    def test_first_month_has_no_differences(self):
+        """A month without data in the month before has differences None."""
+        response = self.get("feb'24")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['data']['current_month']['timeframe'], "FEB'24")
+        self.assertIsNone(response.json['data']['differences'])
+
+    def test_missing_month_and_market(self):
+        """404 messages tell a missing month apart from a market without rows."""
+        self.assertEqual(self.get("JAN'24").json, {'message': 'Month not found in data'})
+        response = self.get("MAR'24", market='NOWHERE')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json, {'message': 'No data found'})
+
+    def test_invalid_month(self):
+        """A month that is not MMM'YY is a 400."""
+        response = self.get('2024-03')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json, {'error': 'Invalid month parameter'})
+
+    def test_statement_reads_two_months(self):
+        """The statement is bounded to the month and the one before it."""
+        statement = score_statement('CENTRAL', 'ARKANSAS', parse_month("JAN'24"))
+        params = statement.compile().params
+        self.assertIn(date(2023, 12, 1), params.values())
+        self.assertIn(date(2024, 2, 1), params.values())
+
+    def test_groups_by_subquery_column(self):
+        """The CASE with its bound month is not repeated in the GROUP BY."""
+        statement = score_statement('CENTRAL', 'ARKANSAS', parse_month("JAN'24"))
+        compiled = str(statement.compile(dialect=postgresql.dialect()))
+        self.assertTrue(compiled.endswith('GROUP BY anon_1.month'), compiled)
+        self.assertEqual(compiled.count('CASE'), 1)
+
+
+class TestScoreComparisonBatch(unittest.TestCase):
+    def setUp(self):
+        """Seed February to April 2024; SEATTLE has no March row."""
+        rows = [row for row in seed_rows() if not (row.market == 'SEATTLE' and row.update_date.month == 3)]
+        self.app = create_seeded_app(rows=rows)
+        self.client = self.app.test_client()
+
+    def test_matches_single_comparisons(self):
+        """Every batch entry equals the single-market response for that month."""
+        response = self.client.get("/nex-score/score-comparison/batch?start=FEB'24&end=APR'24")
+        self.assertEqual(response.status_code, 200)
+        entries = response.json['data']
+        self.assertEqual(
+            [(entry['market'], entry['current_month']['timeframe']) for entry in entries],
+            [('ARKANSAS', "FEB'24"), ('ARKANSAS', "MAR'24"), ('ARKANSAS', "APR'24"),
+             ('CINCINNATI', "FEB'24"), ('CINCINNATI', "MAR'24"), ('CINCINNATI', "APR'24"),
+             ('SEATTLE', "FEB'24"), ('SEATTLE', "APR'24")]
+        )
+        for entry in entries:
+            single = self.client.get(
+                f"/nex-score/score-comparison?region={entry['region']}&market={entry['market']}"
+                f"&month={entry['current_month']['timeframe']}"
+            ).json['data']
+            self.assertEqual({key: entry[key] for key in ('current_month', 'differences')}, single)
+
+    def test_gap_has_no_differences(self):
+        """APR'24 of SEATTLE has no March to compare with."""
+        response = self.client.get("/nex-score/score-comparison/batch?region=WEST&start=APR'24")
+        self.assertEqual(len(response.json['data']), 1)
+        self.assertIsNone(response.json['data'][0]['differences'])
+
+    def test_lists_filter(self):
+        """Comma lists of regions and markets narrow the combinations."""
+        response = self.client.get("/nex-score/score-comparison/batch?region=CENTRAL,WEST&market=ARKANSAS, SEATTLE&start=MAR'24&end=APR'24")
+        self.assertEqual(
+            [(entry['market'], entry['current_month']['timeframe']) for entry in response.json['data']],
+            [('ARKANSAS', "MAR'24"), ('ARKANSAS', "APR'24"), ('SEATTLE', "APR'24")]
+        )
+
+    def test_invalid_parameters(self):
+        """start is required, months must parse and end cannot precede start."""
+        cases = [
+            ('', 'Start is required'),
+            ("?start=2024-01", 'Invalid month parameter'),
+            ("?start=APR'24&end=FEB'24", 'Invalid month range')
+        ]
+        for query, error in cases:
+            response = self.client.get(f'/nex-score/score-comparison/batch{query}')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json, {'error': error})
+
+    def test_no_data(self):
+        """Months without rows give 404, even when the month before has some."""
+        response = self.client.get("/nex-score/score-comparison/batch?start=MAY'24")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json, {'message': 'No data found'})
+
+    def test_groups_by_subquery_columns(self):
+        """Months are bucketed in a subquery and grouped by its column."""
+        statement = batch_statement(['CENTRAL'], [], parse_month("FEB'24"), parse_month("APR'24"))
+        compiled = str(statement.compile(dialect=postgresql.dialect()))
+        self.assertTrue(compiled.endswith('GROUP BY anon_1.region, anon_1.market, anon_1.month'), compiled)
+
+
+if __name__ == '__main__':
+    unittest.main()
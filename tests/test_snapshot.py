@@ -0,0 +1,85 @@
+import unittest
+from datetime import date
+
+from app import db
+from app.models.nex_score import NexScore
+from sqlite_app import SQLiteConfig, create_seeded_app
+
+
+class SnapshotConfig(SQLiteConfig):
+    NEX_SCORE_BACKEND = 'snapshot'
+
+
+class TestSnapshotBackend(unittest.TestCase):
+    def setUp(self):
+        """Create a database-backed and a snapshot-backed app over the same rows."""
+        self.apps = {
+            'database': create_seeded_app(SQLiteConfig),
+            'snapshot': create_seeded_app(SnapshotConfig)
+        }
+
+    def get_both(self, url):
+        return [self.apps[name].test_client().get(url) for name in ('database', 'snapshot')]
+
+    def assert_same_response(self, url):
+        database, snapshot = self.get_both(url)
+        self.assertEqual(database.status_code, snapshot.status_code)
+        self.assertEqual(database.json, snapshot.json)
+        return snapshot
+
+    def test_nex_score_matches_database(self):
+        """GET /nex-score/ returns the same latest values from the snapshot."""
+        for type_param in ('influencer', 'detractor', 'neutral'):
+            database, snapshot = self.get_both(f'/nex-score/?type={type_param}')
+            self.assertEqual(snapshot.status_code, 200)
+            normalize = lambda data: sorted(
+                (group['label'], sorted(group['children'], key=lambda entry: entry['label'])) for group in data
+            )
+            self.assertEqual(normalize(database.json['data']), normalize(snapshot.json['data']))
+
+        response = self.apps['snapshot'].test_client().get('/nex-score/?region=WEST')
+        self.assertEqual([group['label'] for group in response.json['data']], ['WEST'])
+        self.assertEqual(response.json['data'][0]['children'][0]['value'], 7.4)
+
+    def test_trends_match_database(self):
+        """GET /nex-score/trends aggregates identically for every timeframe."""
+        for timeframe in ('monthly', 'quarterly', 'yearly'):
+            self.assert_same_response(f'/nex-score/trends?region=CENTRAL&timeframe={timeframe}')
+        self.assert_same_response('/nex-score/trends?market=NOWHERE')
+
+    def test_percentage_and_score_comparison_match_database(self):
+        """GET /nex-score/percentage and /score-comparison match the database path."""
+        response = self.assert_same_response('/nex-score/percentage?region=CENTRAL')
+        self.assertEqual(response.json['update_date'], '2024-04-23')
+        self.assert_same_response("/nex-score/score-comparison?region=CENTRAL&market=ARKANSAS&month=MAR'24")
+        self.assert_same_response("/nex-score/score-comparison?region=CENTRAL&market=ARKANSAS&month=JAN'24")
+        self.assert_same_response("/nex-score/score-comparison/batch?region=CENTRAL&start=FEB'24&end=APR'24")
+
+    def test_market_region_from_snapshot(self):
+        """GET /market-region/ lists the distinct pairs held in the snapshot."""
+        database, snapshot = self.get_both('/market-region/')
+        key = lambda entry: (entry['market'], entry['region'])
+        self.assertEqual(sorted(database.json['data'], key=key), sorted(snapshot.json['data'], key=key))
+
+    def test_snapshot_reloads_when_version_changes(self):
+        """A new update_date batch is picked up once the version check runs."""
+        app = self.apps['snapshot']
+        app.config['NEX_SCORE_SNAPSHOT_CHECK_INTERVAL'] = 0
+        app.config['NEX_SCORE_VERSION_CHECK_INTERVAL'] = 0
+        client = app.test_client()
+        self.assertEqual(client.get('/nex-score/percentage').json['update_date'], '2024-04-23')
+
+        with app.app_context():
+            db.session.add(NexScore(
+                market='SEATTLE', region='WEST',
+                influencer_count=1, detractor_count=1, neutral_count=1, total=3,
+                influencer_perc=33.3, detractor_perc=33.3, neutral_perc=33.4,
+                update_date=date(2024, 5, 23)
+            ))
+            db.session.commit()
+
+        self.assertEqual(client.get('/nex-score/percentage').json['update_date'], '2024-05-23')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
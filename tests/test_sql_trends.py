@@ -0,0 +1,65 @@
+import unittest
+from datetime import date
+
+from sqlalchemy import Date, column, select
+from sqlalchemy.dialects import mysql, postgresql
+
+from app import db
+from app.models.nex_score import NexScore
+from app.sql_functions import period_start
+from sqlite_app import SQLiteConfig, create_seeded_app, seed_rows
+
+
+class SQLTrendConfig(SQLiteConfig):
+    NEX_SCORE_TREND_SOURCE = 'sql'
+
+
+def rows_across_years():
+    rows = seed_rows()
+    for update_date in (date(2023, 11, 23), date(2023, 12, 23), date(2024, 7, 1)):
+        rows.append(NexScore(
+            market='SEATTLE', region='WEST',
+            influencer_count=1, detractor_count=1, neutral_count=1, total=3,
+            influencer_perc=12.34, detractor_perc=20.0, neutral_perc=67.66,
+            update_date=update_date
+        ))
+    return rows
+
+
+class TestSQLTrends(unittest.TestCase):
+    def setUp(self):
+        """Seed the same rows into a pandas-backed and an SQL-backed app."""
+        self.pandas_client = create_seeded_app(rows=rows_across_years()).test_client()
+        self.app = create_seeded_app(SQLTrendConfig, rows=rows_across_years())
+        self.client = self.app.test_client()
+
+    def test_trends_match_pandas(self):
+        """GET /nex-score/trends pushed down to SQL returns the pandas output."""
+        for query in ('', 'region=CENTRAL', 'region=WEST&market=SEATTLE'):
+            for timeframe in ('monthly', 'quarterly', 'yearly'):
+                url = f'/nex-score/trends?{query}&timeframe={timeframe}'
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json, self.pandas_client.get(url).json)
+
+        labels = [entry['label'] for entry in self.client.get('/nex-score/trends?timeframe=quarterly').json['data']]
+        self.assertEqual(labels, ["Q4'23", "Q1'24", "Q2'24", "Q3'24"])
+
+    def test_period_start_on_sqlite(self):
+        """Quarter buckets start on the first month of the quarter."""
+        with self.app.app_context():
+            for day, expected in ((date(2024, 1, 31), '2024-01-01'), (date(2024, 6, 30), '2024-04-01'),
+                                  (date(2024, 11, 2), '2024-10-01')):
+                self.assertEqual(db.session.scalar(select(period_start(db.literal(day, Date), 'quarterly'))), expected)
+
+    def test_period_start_dialects(self):
+        """MySQL and PostgreSQL get their native bucketing functions."""
+        update_date = column('update_date', Date)
+        compiled = lambda timeframe, dialect: str(select(period_start(update_date, timeframe)).compile(dialect=dialect))
+        self.assertIn('date_format(update_date', compiled('monthly', mysql.dialect()))
+        self.assertIn('quarter(update_date)', compiled('quarterly', mysql.dialect()))
+        self.assertIn("date_trunc(%(date_trunc_1)s, update_date)", compiled('quarterly', postgresql.dialect()))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)